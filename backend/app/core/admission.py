@@ -0,0 +1,305 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CRITICAL, CLINICAL, STANDARD, BACKGROUND = 0, 1, 2, 3
+PRIORITY_NAMES = {CRITICAL: "critical", CLINICAL: "clinical", STANDARD: "standard", BACKGROUND: "background"}
+
+# Share of the concurrency limit each class may fill: background work is turned away
+# while half the limit is still free for clinical traffic
+CLASS_SHARE = {CRITICAL: 1.0, CLINICAL: 0.9, STANDARD: 0.75, BACKGROUND: 0.5}
+# Fraction of ADMISSION_MAX_WAIT_SECONDS each class may queue before being shed
+WAIT_FRACTION = {CRITICAL: 1.0, CLINICAL: 0.5, STANDARD: 0.2, BACKGROUND: 0.0}
+
+# Pre-assessment risk level of a triage submission -> admission class
+ACUITY_PRIORITY = {"critical": CRITICAL, "high": CRITICAL, "moderate": CLINICAL, "low": STANDARD}
+
+TRIAGE_ANALYZE_PATH = "/api/v1/triage/analyze"
+ROUTE_PRIORITIES: List[Tuple[str, int]] = [
+    ("/api/v1/doctor", CLINICAL),
+    ("/api/v1/admin", BACKGROUND),
+]
+# Never queued or shed: probes, docs and the admission report itself
+EXEMPT_PATHS = ("/health", "/api/docs", "/api/redoc", "/openapi.json", "/api/v1/admin/admission")
+
+MAX_CLASSIFY_BODY = 64 * 1024
+MAX_TRACKED_ROUTES = 1000
+
+class AdmissionController:
+    """Adaptive concurrency limit with priority classes.
+
+    A request is admitted while in-flight work is below its class's share
+    of the limit; otherwise it waits in a priority queue (bounded in size
+    and, per class, in time) or is shed. A full queue evicts its
+    lowest-priority waiter in favour of a more urgent arrival.
+
+    The limit adapts to latency: each route keeps a slow-moving latency
+    baseline, and a short average of ``latency / baseline`` above
+    ``latency_tolerance`` cuts the limit multiplicatively, while a
+    well-utilised limit with healthy latency grows by ~sqrt(limit). The
+    limit therefore backs off when Gemini or Mongo slow down, instead of
+    letting requests pile up in the event loop.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float,
+        queue_size: int,
+        max_wait_seconds: float,
+        retry_after_seconds: int,
+        adjust_interval: float = 1.0
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.queue_size = queue_size
+        self.max_wait_seconds = max_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.adjust_interval = adjust_interval
+        self.inflight = 0
+        # Heap of [priority, sequence, future]; futures of timed-out waiters are skipped lazily
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._baselines: Dict[str, float] = {}
+        self._latency_ratio = 1.0
+        self._last_adjust = 0.0
+        self._admitted = Counter()
+        self._queued = Counter()
+        self._shed = Counter()
+        self.limit_decreases = 0
+        self.limit_increases = 0
+
+    def _capacity(self, priority: int) -> int:
+        return max(1, int(self.limit * CLASS_SHARE[priority]))
+
+    def _waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter[2].done())
+
+    def retry_after(self, priority: int) -> int:
+        # Lower classes are told to come back later, so retries do not arrive in one wave
+        return self.retry_after_seconds * (priority + 1)
+
+    async def acquire(self, priority: int) -> bool:
+        """Wait for a slot; False means the request should be shed."""
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        # Arrivals never overtake queued requests of the same or a more urgent class
+        ahead = bool(self._waiters) and self._waiters[0][0] <= priority
+        if not ahead and self.inflight < self._capacity(priority):
+            self.inflight += 1
+            self._admitted[priority] += 1
+            return True
+
+        max_wait = self.max_wait_seconds * WAIT_FRACTION[priority]
+        if max_wait <= 0:
+            self._shed[priority] += 1
+            return False
+        if self._waiting() >= self.queue_size and not self._evict_below(priority):
+            self._shed[priority] += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._sequence), future])
+        self._queued[priority] += 1
+        try:
+            admitted = await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            admitted = False
+        except asyncio.CancelledError:
+            # Client went away after being handed a slot: give it back
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            raise
+        if admitted:
+            self._admitted[priority] += 1
+        else:
+            self._shed[priority] += 1
+        return admitted
+
+    def _evict_below(self, priority: int) -> bool:
+        """Shed the newest waiter of the lowest class below ``priority``; False if there is none."""
+        live = [waiter for waiter in self._waiters if not waiter[2].done() and waiter[0] > priority]
+        if not live:
+            return False
+        victim = max(live, key=lambda waiter: (waiter[0], waiter[1]))
+        victim[2].set_result(False)
+        return True
+
+    def _wake(self):
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.inflight >= self._capacity(priority):
+                return
+            heapq.heappop(self._waiters)
+            self.inflight += 1
+            future.set_result(True)
+
+    def release(self, route: Optional[str] = None, latency: Optional[float] = None):
+        self.inflight -= 1
+        if route is not None and latency is not None:
+            self._observe(route, latency)
+        self._wake()
+
+    def _observe(self, route: str, latency: float):
+        baseline = self._baselines.get(route)
+        if baseline is None:
+            if len(self._baselines) < MAX_TRACKED_ROUTES:
+                self._baselines[route] = latency
+            return
+        self._latency_ratio = 0.8 * self._latency_ratio + 0.2 * latency / max(baseline, 1e-3)
+        # The baseline follows improvements quickly but degradations slowly, so sustained
+        # overload keeps registering as slow instead of becoming the new normal
+        self._baselines[route] = baseline + (0.01 if latency > baseline else 0.1) * (latency - baseline)
+
+        now = time.monotonic()
+        if now - self._last_adjust < self.adjust_interval:
+            return
+        self._last_adjust = now
+        if self._latency_ratio > self.latency_tolerance:
+            self.limit = max(self.min_limit, self.limit * 0.8)
+            self.limit_decreases += 1
+            logger.warning(f"Admission limit lowered to {self.limit:.0f} (latency {self._latency_ratio:.1f}x baseline)")
+        elif self.inflight + self._waiting() >= 0.75 * self.limit and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + math.sqrt(self.limit))
+            self.limit_increases += 1
+            self._wake()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 1),
+            "inflight": self.inflight,
+            "waiting": self._waiting(),
+            "latency_ratio": round(self._latency_ratio, 2),
+            "limit_decreases": self.limit_decreases,
+            "limit_increases": self.limit_increases,
+            "classes": {
+                name: {
+                    "capacity": self._capacity(priority),
+                    "admitted": self._admitted[priority],
+                    "queued": self._queued[priority],
+                    "shed": self._shed[priority]
+                }
+                for priority, name in PRIORITY_NAMES.items()
+            }
+        }
+
+class AdmissionMiddleware:
+    """Puts every request (or only triage submissions) through the admission controller.
+
+    Triage submissions are classed by a cheap acuity estimate of their body,
+    doctor routes as clinical and admin routes as background. Shed requests
+    get an immediate 503 with ``Retry-After``.
+    """
+
+    def __init__(self, app, controller: AdmissionController, acuity: Callable[..., Optional[str]], all_routes: bool):
+        self.app = app
+        self.controller = controller
+        self.acuity = acuity
+        self.all_routes = all_routes
+
+    def _route_priority(self, path: str) -> int:
+        for prefix, priority in ROUTE_PRIORITIES:
+            if path.startswith(prefix):
+                return priority
+        return STANDARD
+
+    def _triage_priority(self, body: bytes) -> int:
+        try:
+            payload = json.loads(body)
+            level = self.acuity(
+                payload.get("symptoms") or {},
+                payload.get("vitals") or {},
+                payload.get("vital_signs"),
+                payload.get("medical_history")
+            )
+        except Exception:
+            # Malformed bodies are rejected by validation later; don't let them jump the queue
+            return CLINICAL
+        return ACUITY_PRIORITY.get(level, CLINICAL)
+
+    async def _buffer_body(self, receive) -> Tuple[bytes, Callable]:
+        """Read the request body for classification and return a receive that replays it."""
+        messages = []
+        body = b""
+        while len(body) <= MAX_CLASSIFY_BODY:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        complete = messages and messages[-1]["type"] == "http.request" and not messages[-1].get("more_body", False)
+        return (body if complete else b""), replay
+
+    async def _reject(self, send, priority: int):
+        body = json.dumps({"detail": "Server is busy; please retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.controller.retry_after(priority)).encode()),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] == TRIAGE_ANALYZE_PATH and scope["method"] == "POST":
+            body, receive = await self._buffer_body(receive)
+            priority = self._triage_priority(body) if body else CLINICAL
+        elif self.all_routes:
+            priority = self._route_priority(scope["path"])
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(priority):
+            await self._reject(send, priority)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = scope.get("route")
+            route_key = f"{scope['method']} {getattr(route, 'path', None) or scope['path']}"
+            self.controller.release(route_key, time.perf_counter() - started)
+
+admission_controller = AdmissionController(
+    initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+    min_limit=settings.ADMISSION_MIN_LIMIT,
+    max_limit=settings.ADMISSION_MAX_LIMIT,
+    latency_tolerance=settings.ADMISSION_LATENCY_TOLERANCE,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    max_wait_seconds=settings.ADMISSION_MAX_WAIT_SECONDS,
+    retry_after_seconds=settings.ADMISSION_RETRY_AFTER_SECONDS
+)
@@ -0,0 +1,125 @@
+import functools
+import gzip
+import logging
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def _available_encoders() -> Dict[str, Callable[[bytes], bytes]]:
+    encoders: Dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL)
+        encoders["zstd"] = compressor.compress
+    if brotli is not None:
+        encoders["br"] = functools.partial(brotli.compress, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    encoders["gzip"] = functools.partial(
+        gzip.compress, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0
+    )
+    return encoders
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+class CompressionMiddleware:
+    """Compresses complete (non-streaming) responses with zstd, brotli or gzip.
+
+    The encoding is the first entry of ``preference`` the client accepts.
+    Bodies under ``minimum_size``, already-encoded responses, excluded path
+    prefixes and streaming responses (sent in several body messages, e.g.
+    exports and SSE) are passed through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int, preference: List[str], excluded_paths: List[str]):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = _available_encoders()
+        self.preference = [name for name in preference if name in self.encoders]
+        self.excluded_paths = tuple(excluded_paths)
+        logger.info(f"Response compression enabled: {', '.join(self.preference)}")
+
+    def _choose_encoding(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accepted = _accepted_encodings(value.decode("latin-1"))
+                wildcard = accepted.get("*", 0.0)
+                for encoding in self.preference:
+                    if accepted.get(encoding, wildcard) > 0:
+                        return encoding
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            headers = dict(start_message.get("headers", []))
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or b"content-encoding" in headers
+                or start_message["status"] in (204, 304)
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self.encoders[encoding](body)
+            response_headers = [
+                (name, value) for name, value in start_message.get("headers", [])
+                if name not in (b"content-length", b"vary")
+            ]
+            vary = headers.get(b"vary")
+            response_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
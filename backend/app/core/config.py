@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "AI Smart Patient Triage"
@@ -8,6 +8,7 @@ class Settings(BaseSettings):
     
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB_NAME: str = "triage_db"
+    DEFAULT_FACILITY_ID: str = "default"
     REDIS_URL: str = "redis://localhost:6379"
     
     SECRET_KEY: str
@@ -17,12 +18,114 @@ class Settings(BaseSettings):
     
     GEMINI_API_KEY: str
     GEMINI_MODEL: str = "gemini-pro"
+    GEMINI_FAST_MODEL: str = ""
+    AI_ESCALATION_MIN_CONFIDENCE: float = 0.75
+    AI_ESCALATION_RISK_LEVELS: List[str] = ["critical", "high"]
+    PROMPT_TOKEN_BUDGET: int = 1200
+    PROMPT_HISTORY_MAX_TOKENS: int = 400
+    # Prior-visit summary (risk trend, vitals baselines, recurring concerns) added to prompts
+    PATIENT_SUMMARY_ENABLED: bool = True
+    PROMPT_CONTEXT_MAX_TOKENS: int = 120
+    AI_BATCH_ENABLED: bool = True
+    AI_BATCH_WINDOW_MS: int = 5
+    AI_BATCH_MAX_SIZE: int = 8
+    AI_HEDGE_ENABLED: bool = True
+    AI_HEDGE_PERCENTILE: float = 95.0
+    AI_HEDGE_MIN_DELAY_MS: int = 200
+    AI_HEDGE_BUDGET_PERCENT: float = 10.0
+    # AI usage accounting: model -> [USD per 1M input tokens, USD per 1M output tokens]
+    AI_MODEL_PRICES: Dict[str, List[float]] = {}
+    AI_DEFAULT_PRICE_PER_MTOK: List[float] = [0.0, 0.0]
+    AI_USAGE_FLUSH_SECONDS: int = 30
+    # Spend budgets across all workers (0 = unlimited); above the economy share escalation and hedging stop
+    AI_BUDGET_HOURLY_USD: float = 0.0
+    AI_BUDGET_DAILY_USD: float = 0.0
+    AI_BUDGET_ECONOMY_PERCENT: float = 80.0
+    # Serves first visits only while PATIENT_SUMMARY_ENABLED: prompts with a prior-visit summary bypass it
+    SIMILARITY_CACHE_ENABLED: bool = True
+    SIMILARITY_CACHE_SIZE: int = 5000
+    SIMILARITY_THRESHOLD: float = 0.92
+    SIMILARITY_CACHE_TTL_MINUTES: int = 60
+    SIMILARITY_CONFIDENCE_FACTOR: float = 0.8
+    # Local model (train-local-model.py): Gemini outage fallback and provisional queue score
+    LOCAL_MODEL_PATH: str = "models/triage_model.npz"
+    LOCAL_MODEL_PROVISIONAL: bool = True
     
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:3001", "http://localhost:5173"]
     
     RATE_LIMIT_PER_MINUTE: int = 60
     
+    # Admission control: adaptive concurrency limit per worker with priority-aware load shedding
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_ALL_ROUTES: bool = True
+    ADMISSION_INITIAL_LIMIT: int = 64
+    ADMISSION_MIN_LIMIT: int = 8
+    ADMISSION_MAX_LIMIT: int = 512
+    ADMISSION_LATENCY_TOLERANCE: float = 2.0
+    ADMISSION_QUEUE_SIZE: int = 256
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 2
+    
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_PREFERENCE: List[str] = ["zstd", "br", "gzip"]
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_EXCLUDED_PATHS: List[str] = ["/api/v1/admin/export"]
+    
+    # Case dispatcher: aging adds priority points per minute waited
+    DISPATCH_ENABLED: bool = True
+    DISPATCH_INTERVAL_SECONDS: float = 2.0
+    DISPATCH_AGING_PER_MINUTE: float = 0.1
+    DISPATCH_SPECIALTY_BONUS: float = 2.0
+    DISPATCH_MAX_ACTIVE_CASES: int = 3
+    DISPATCH_LEASE_SECONDS: int = 15
+    DISPATCH_RESYNC_SECONDS: int = 300
+    
+    # Transactional outbox: events stored with triage records, relayed by the lease holder
+    OUTBOX_POLL_INTERVAL_MS: int = 500
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_LEASE_SECONDS: int = 15
+    OUTBOX_WEBHOOK_URL: str = ""
+    
+    # On-demand request profiling (pyinstrument); the middleware is only installed when enabled
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_MS: float = 1.0
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_MAX_STORED: int = 100
+    
+    # Distributed tracing: spans exported as OTLP/JSON lines (and to an OTLP/HTTP collector if set)
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 0.1
+    TRACING_SERVICE_NAME: str = "triage-api"
+    TRACING_EXPORT_FILE: str = "traces/spans.jsonl"
+    TRACING_OTLP_ENDPOINT: str = ""
+    TRACING_MAX_FILE_MB: int = 100
+    
+    # Slow-query detection and index advice (pymongo command monitoring + periodic explain)
+    QUERY_ADVISOR_ENABLED: bool = True
+    QUERY_SLOW_MS: float = 100.0
+    QUERY_EXPLAIN_TOP: int = 5
+    QUERY_EXPLAIN_INTERVAL_SECONDS: int = 300
+    
     LOG_LEVEL: str = "INFO"
+    AUDIT_RETENTION_DAYS: int = 365
+    # Upper bound on records loaded into memory by /admin/vitals-analytics (most recent first)
+    VITALS_ANALYTICS_MAX_RECORDS: int = 200000
+    
+    # Production launcher (serve.py); SERVER_WORKERS=0 means one worker per CPU core
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_BACKLOG: int = 2048
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_WORKER_TIMEOUT: int = 60
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_PIDFILE: str = ""
     
     class Config:
         env_file = ".env"
@@ -1,6 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 from app.core.config import settings
+from app.core.tracing import mongo_command_tracer
+from app.services.query_advisor import query_advisor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,7 +15,12 @@ db = Database()
 async def connect_to_mongo():
     """Connect to MongoDB"""
     try:
-        db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+        event_listeners = []
+        if settings.TRACING_ENABLED:
+            event_listeners.append(mongo_command_tracer)
+        if settings.QUERY_ADVISOR_ENABLED:
+            event_listeners.append(query_advisor)
+        db.client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=event_listeners)
         # Test connection
         await db.client.admin.command('ping')
         logger.info("Successfully connected to MongoDB")
@@ -0,0 +1,15 @@
+from app.core.config import settings
+
+# Shard key for triage_records: every query is routed to a single facility's chunks
+FACILITY_FIELD = "facility_id"
+TRIAGE_SHARD_KEY = {FACILITY_FIELD: 1, "created_at": 1}
+
+def user_facility(user: dict) -> str:
+    """Facility a user belongs to; users created before facilities existed use the default."""
+    return user.get(FACILITY_FIELD) or settings.DEFAULT_FACILITY_ID
+
+def scoped(facility_id: str, query: dict) -> dict:
+    """Prefix a triage query with the facility key so it targets one shard and uses facility-prefixed indexes."""
+    if not facility_id:
+        raise ValueError("Triage queries must be scoped to a facility")
+    return {FACILITY_FIELD: facility_id, **query}
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer, SpeedscopeRenderer
+    from pyinstrument.session import Session
+except ImportError:
+    Profiler = None
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_PATTERN = re.compile(r"^\d+-[0-9a-f]{8}$")
+
+def profiling_available() -> bool:
+    return Profiler is not None
+
+class ProfileStore:
+    """Request profiles on local disk, shared by every worker on the host.
+
+    Each profile is a pyinstrument session (``<id>.pyisession``) plus a small
+    JSON summary (``<id>.json``); ids sort chronologically. Only the newest
+    ``max_profiles`` are kept.
+    """
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            (name[:-5] for name in os.listdir(self.directory) if name.endswith(".json")),
+            reverse=True
+        )
+
+    def save(self, session, summary: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        session.save(self._path(summary["id"], "pyisession"))
+        with open(self._path(summary["id"], "json"), "w") as f:
+            json.dump(summary, f)
+        for profile_id in self._ids()[self.max_profiles:]:
+            for extension in ("json", "pyisession"):
+                try:
+                    os.remove(self._path(profile_id, extension))
+                except FileNotFoundError:
+                    pass
+
+    def list(self, limit: int) -> List[Dict[str, Any]]:
+        summaries = []
+        for profile_id in self._ids()[:limit]:
+            try:
+                with open(self._path(profile_id, "json")) as f:
+                    summaries.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue
+        return summaries
+
+    def render(self, profile_id: str, output_format: str) -> Optional[str]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self._path(profile_id, "pyisession")
+        if not os.path.exists(path):
+            return None
+        session = Session.load(path)
+        if output_format == "html":
+            return HTMLRenderer().render(session)
+        if output_format == "speedscope":
+            return SpeedscopeRenderer().render(session)
+        return ConsoleRenderer(unicode=True, color=False).render(session)
+
+profile_store = ProfileStore(settings.PROFILING_OUTPUT_DIR, settings.PROFILING_MAX_STORED)
+
+class ProfilingMiddleware:
+    """Runs pyinstrument's sampling profiler around selected requests.
+
+    A request is profiled when it carries ``X-Profile: 1`` with an admin
+    access token, or is picked by ``sample_rate``. Sampled requests are
+    skipped while another request in this worker is being profiled. The
+    profile id is returned in ``X-Profile-Id``; see ``/api/v1/admin/profiles``.
+    Only installed when ``PROFILING_ENABLED`` is set, so there is no cost
+    otherwise.
+    """
+
+    def __init__(self, app, sample_rate: float, interval_ms: float, store: ProfileStore):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.store = store
+        self._active = 0
+        logger.info(f"Request profiling enabled (sample rate {sample_rate})")
+
+    @staticmethod
+    def _admin_requested(scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        if headers.get(PROFILE_HEADER, b"").lower() not in (b"1", b"true"):
+            return False
+        scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        try:
+            payload = decode_token(token)
+        except Exception:
+            return False
+        return payload.get("type") == "access" and payload.get("role") == "admin"
+
+    def _should_profile(self, scope) -> bool:
+        if self._admin_requested(scope):
+            return True
+        return self.sample_rate > 0 and self._active == 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        self._active += 1
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session = profiler.stop()
+            self._active -= 1
+            summary = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "samples": session.sample_count,
+                "created_at": datetime.utcnow().isoformat()
+            }
+            try:
+                await asyncio.to_thread(self.store.save, session, summary)
+            except Exception as e:
+                logger.error(f"Failed to store profile {profile_id}: {str(e)}")
@@ -0,0 +1,51 @@
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class StartupTimer:
+    """Records import and initialization phases of application startup.
+
+    Created as the first thing ``app.main`` imports, so ``time_to_ready_ms``
+    covers module imports plus the lifespan startup work.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.started_wall = datetime.utcnow()
+        self.imports: Dict[str, float] = {}
+        self.phases: Dict[str, float] = {}
+        self.ready_at: Optional[float] = None
+
+    @contextmanager
+    def measure_import(self, module: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.imports[module] = time.perf_counter() - started
+
+    async def measure_phase(self, name: str, awaitable):
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def mark_ready(self):
+        self.ready_at = time.perf_counter()
+        report = self.get_report()
+        logger.info(f"Startup report: {report}")
+
+    def get_report(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_wall.isoformat(),
+            "imports_ms": {module: round(seconds * 1000, 1) for module, seconds in self.imports.items()},
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "time_to_ready_ms": round((self.ready_at - self.started_at) * 1000, 1) if self.ready_at else None
+        }
+
+startup_timer = StartupTimer()
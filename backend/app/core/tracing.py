@@ -0,0 +1,361 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_ERROR = 2
+
+TRACEPARENT_PATTERN = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+def _random_id(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """W3C traceparent -> (trace_id, parent span_id, sampled), or None if absent or invalid."""
+    if not header:
+        return None
+    match = TRACEPARENT_PATTERN.match(header.strip().lower())
+    if not match:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or (version == "00" and len(header.strip()) != 55):
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], kind: int, attributes: Optional[Dict[str, Any]]):
+        self.trace_id = trace_id
+        self.span_id = _random_id(8)
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException):
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()]
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.error:
+            span["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return span
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class SpanExporter:
+    """Batches finished spans on a background thread and writes them as OTLP/JSON.
+
+    Each line of ``path`` is one ExportTraceServiceRequest, so the file can be
+    replayed into a collector (e.g. the otlpjsonfile receiver). When
+    ``endpoint`` is set, batches are also POSTed to an OTLP/HTTP collector
+    (``http://collector:4318/v1/traces``). Spans are dropped, never blocked on,
+    when the queue is full.
+    """
+
+    def __init__(self, path: str, endpoint: str, service_name: str, max_file_mb: int,
+                 batch_size: int = 512, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.path = path
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.max_file_bytes = max_file_mb * 1024 * 1024
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self._write(batch)
+                    self.exported += len(batch)
+                except Exception as e:
+                    logger.error(f"Span export failed: {str(e)}")
+            if stop:
+                return
+
+    def _write(self, batch: List[Span]):
+        payload = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in batch]}]
+            }]
+        })
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_file_bytes:
+                os.replace(self.path, f"{self.path}.1")
+            with open(self.path, "a") as f:
+                f.write(payload + "\n")
+        if self.endpoint:
+            request = urllib.request.Request(
+                self.endpoint, data=payload.encode(), headers={"Content-Type": "application/json"}, method="POST"
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+
+class _SpanScope:
+    __slots__ = ("tracer", "span", "token")
+
+    def __init__(self, tracer: "Tracer", span: Span):
+        self.tracer = tracer
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.span.record_error(exc)
+        _current_span.reset(self.token)
+        self.tracer.end(self.span)
+        return False
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SCOPE = _NoopScope()
+
+class Tracer:
+    """Minimal W3C-compatible tracer.
+
+    A trace is started (and sampled) only by ``TracingMiddleware``; every
+    other span is created as a child of the current one, so with tracing
+    disabled or the request not sampled ``span()`` costs one ContextVar
+    lookup and returns a shared no-op scope.
+    """
+
+    def __init__(self, enabled: bool, sample_rate: float, exporter: SpanExporter):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    def start_trace(self, name: str, traceparent: Optional[str], attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Server span for an incoming request; honours the caller's sampling decision."""
+        if not self.enabled:
+            return None
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_span_id, sampled = parent
+        else:
+            trace_id, parent_span_id = _random_id(16), None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return None
+        return Span(name, trace_id, parent_span_id, SPAN_KIND_SERVER, attributes)
+
+    def start_child(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: int = SPAN_KIND_INTERNAL):
+        """``with tracer.span("stage") as span:`` -- span is None when the request is not traced."""
+        child = self.start_child(name, kind, attributes)
+        if child is None:
+            return _NOOP_SCOPE
+        return _SpanScope(self, child)
+
+    def activate(self, span: Span) -> _SpanScope:
+        return _SpanScope(self, span)
+
+    def end(self, span: Span):
+        span.end_ns = time.time_ns()
+        self.exporter.export(span)
+
+    @staticmethod
+    def current_traceparent() -> Optional[str]:
+        span = _current_span.get()
+        return span.traceparent if span else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "exported_spans": self.exporter.exported,
+            "dropped_spans": self.exporter.dropped
+        }
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """Client span per MongoDB command, parented to the span active when the command was issued.
+
+    Motor copies the caller's context into its executor threads, so the
+    current span is visible here. Command documents are never recorded
+    (they contain patient data); only the command name and collection.
+    """
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._spans: Dict[Tuple[Any, int], Span] = {}
+
+    def started(self, event):
+        span = self.tracer.start_child(f"mongodb.{event.command_name}", SPAN_KIND_CLIENT)
+        if span is None:
+            return
+        span.attributes["db.system"] = "mongodb"
+        span.attributes["db.name"] = event.database_name
+        span.attributes["db.operation"] = event.command_name
+        collection = event.command.get(event.command_name)
+        if isinstance(collection, str):
+            span.attributes["db.mongodb.collection"] = collection
+        if isinstance(event.connection_id, tuple):
+            span.attributes["net.peer.name"], span.attributes["net.peer.port"] = event.connection_id[0], event.connection_id[1]
+        self._spans[(event.connection_id, event.request_id)] = span
+
+    def succeeded(self, event):
+        span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            self.tracer.end(span)
+
+    def failed(self, event):
+        span = self._spans.pop((event.connection_id, event.request_id), None)
+        if span is not None:
+            span.error = str(event.failure.get("errmsg", "command failed"))
+            self.tracer.end(span)
+
+class TracingMiddleware:
+    """Starts the server span for each sampled HTTP request.
+
+    Continues an incoming W3C ``traceparent`` when present and returns the
+    server span's context in ``traceresponse``.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope.get("headers", []):
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        span = self.tracer.start_trace(
+            f"{scope['method']} {scope['path']}", traceparent,
+            {"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        if span is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["http.status_code"] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"traceresponse", span.traceparent.encode())]}
+            await send(message)
+
+        with self.tracer.activate(span):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Name the span after the route template once routing has matched
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    span.name = f"{scope['method']} {route.path}"
+                    span.attributes["http.route"] = route.path
+
+tracer = Tracer(
+    enabled=settings.TRACING_ENABLED,
+    sample_rate=settings.TRACING_SAMPLE_RATE,
+    exporter=SpanExporter(
+        path=settings.TRACING_EXPORT_FILE,
+        endpoint=settings.TRACING_OTLP_ENDPOINT,
+        service_name=settings.TRACING_SERVICE_NAME,
+        max_file_mb=settings.TRACING_MAX_FILE_MB
+    )
+)
+mongo_command_tracer = MongoCommandTracer(tracer)
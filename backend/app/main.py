@@ -1,15 +1,39 @@
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from app.core.startup import startup_timer
+
+from contextlib import asynccontextmanager
+import asyncio
 import time
 import logging
 
-from app.core.config import settings
-from app.core.database import connect_to_mongo, close_mongo_connection
-from app.modules.auth.routes import router as auth_router
-from app.modules.triage.routes import router as triage_router
-from app.modules.doctor.routes import router as doctor_router
-from app.modules.admin.routes import router as admin_router
+with startup_timer.measure_import("fastapi"):
+    from fastapi import FastAPI, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse
+
+with startup_timer.measure_import("app.core"):
+    from app.core.config import settings
+    from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+    from app.core.compression import CompressionMiddleware
+    from app.core.profiling import ProfilingMiddleware, profiling_available, profile_store
+    from app.core.tracing import TracingMiddleware, tracer
+    from app.core.admission import AdmissionMiddleware, admission_controller
+with startup_timer.measure_import("app.modules.auth"):
+    from app.modules.auth.routes import router as auth_router
+with startup_timer.measure_import("app.modules.triage"):
+    from app.modules.triage.routes import router as triage_router
+    from app.services.gemini_ai_service import gemini_service
+    from app.services.local_triage_model import local_triage_model
+    from app.services.ai_usage import ai_usage
+    from app.services.acuity import estimate_acuity
+with startup_timer.measure_import("app.modules.doctor"):
+    from app.modules.doctor.routes import router as doctor_router
+    from app.modules.doctor.dispatcher import case_dispatcher
+with startup_timer.measure_import("app.modules.admin"):
+    from app.modules.admin.routes import router as admin_router
+    from app.services.wait_time_analytics import wait_time_analytics
+    from app.services.audit_service import audit_service
+    from app.services.query_advisor import query_advisor
+    from app.services.outbox import outbox_relay
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,13 +41,68 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def _connect_database():
+    await connect_to_mongo()
+    await audit_service.ensure_storage(get_database())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.TRACING_ENABLED:
+        tracer.exporter.start()
+    # Mongo ping, Gemini client construction and local model load are independent; run them concurrently
+    await asyncio.gather(
+        startup_timer.measure_phase("mongo_connect", _connect_database()),
+        startup_timer.measure_phase("ai_client_warm_up", gemini_service.warm_up()),
+        startup_timer.measure_phase("local_model_load", asyncio.to_thread(local_triage_model.load))
+    )
+    startup_timer.mark_ready()
+    logger.info("Application startup complete")
+    
+    # Reloading wait-time sketches scans recent records; don't hold up readiness for it
+    rebuild_task = asyncio.create_task(wait_time_analytics.rebuild(get_database()))
+    dispatch_task = asyncio.create_task(case_dispatcher.run(get_database())) if settings.DISPATCH_ENABLED else None
+    explain_task = asyncio.create_task(query_advisor.run(get_database())) if settings.QUERY_ADVISOR_ENABLED else None
+    outbox_task = asyncio.create_task(outbox_relay.run(get_database()))
+    usage_task = asyncio.create_task(ai_usage.run(get_database()))
+    
+    yield
+    
+    rebuild_task.cancel()
+    if explain_task:
+        explain_task.cancel()
+    if dispatch_task:
+        dispatch_task.cancel()
+        await case_dispatcher.release_lease(get_database())
+    outbox_task.cancel()
+    await outbox_relay.release_lease(get_database())
+    usage_task.cancel()
+    try:
+        # Write out the last partial interval of AI usage
+        await ai_usage.flush(get_database())
+    except Exception as e:
+        logger.error(f"Final AI usage flush failed: {str(e)}")
+    await close_mongo_connection()
+    if settings.TRACING_ENABLED:
+        await asyncio.to_thread(tracer.exporter.shutdown)
+    logger.info("Application shutdown complete")
+
 app = FastAPI(
     title="AI Smart Patient Triage API",
     version="1.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    lifespan=lifespan
 )
 
+if settings.ADMISSION_ENABLED:
+    # Added before CORS so shed responses still carry CORS headers for the browser
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission_controller,
+        acuity=estimate_acuity,
+        all_routes=settings.ADMISSION_ALL_ROUTES
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
@@ -32,15 +111,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_db_client():
-    await connect_to_mongo()
-    logger.info("Application startup complete")
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        preference=settings.COMPRESSION_PREFERENCE,
+        excluded_paths=settings.COMPRESSION_EXCLUDED_PATHS
+    )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    await close_mongo_connection()
-    logger.info("Application shutdown complete")
+if settings.PROFILING_ENABLED:
+    if profiling_available():
+        # Added after compression so the profile also covers response encoding
+        app.add_middleware(
+            ProfilingMiddleware,
+            sample_rate=settings.PROFILING_SAMPLE_RATE,
+            interval_ms=settings.PROFILING_INTERVAL_MS,
+            store=profile_store
+        )
+    else:
+        logger.warning("PROFILING_ENABLED is set but pyinstrument is not installed; profiling disabled")
+
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, tracer=tracer)
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -1,6 +1,7 @@
-from app.models.user import User
+from app.models.user import User, PatientProfile
 from app.models.patient import Patient
-from app.models.triage_record import TriageRecord
+from app.models.triage_record import TriageRecord, TriageStatus
 from app.models.audit_log import AuditLog
+from app.models.vitals import VitalSigns
 
-__all__ = ["User", "Patient", "TriageRecord", "AuditLog"]
+__all__ = ["User", "PatientProfile", "Patient", "TriageRecord", "TriageStatus", "AuditLog", "VitalSigns"]
@@ -1,9 +1,23 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Union
 from datetime import datetime
 from bson import ObjectId
 from app.models.user import PyObjectId
 
+# Compact codes stored in audit_logs.action; unknown actions are stored as their name
+AUDIT_ACTION_CODES = {
+    "USER_REGISTERED": 1,
+    "USER_LOGIN": 2,
+    "TRIAGE_ANALYSIS": 3,
+}
+AUDIT_ACTION_NAMES = {code: name for name, code in AUDIT_ACTION_CODES.items()}
+
+def encode_action(action: str) -> Union[int, str]:
+    return AUDIT_ACTION_CODES.get(action, action)
+
+def decode_action(action: Union[int, str]) -> str:
+    return AUDIT_ACTION_NAMES.get(action, action) if isinstance(action, int) else action
+
 class AuditLog(BaseModel):
     id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
     user_id: Optional[PyObjectId] = None
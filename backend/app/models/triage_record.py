@@ -1,21 +1,45 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set
 from datetime import datetime
+from enum import Enum
 from bson import ObjectId
 from app.models.user import PyObjectId
+from app.models.vitals import VitalSigns
+
+class TriageStatus(str, Enum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+# Allowed status transitions; completed and cancelled are terminal
+TRIAGE_STATUS_TRANSITIONS: Dict[TriageStatus, Set[TriageStatus]] = {
+    TriageStatus.PENDING: {TriageStatus.IN_PROGRESS, TriageStatus.CANCELLED},
+    TriageStatus.IN_PROGRESS: {TriageStatus.COMPLETED, TriageStatus.PENDING, TriageStatus.CANCELLED},
+    TriageStatus.COMPLETED: set(),
+    TriageStatus.CANCELLED: set(),
+}
 
 class TriageRecord(BaseModel):
     id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
+    facility_id: str = "default"
     patient_id: PyObjectId
     symptoms: Dict[str, Any]
     vitals: Dict[str, Any]
+    # Typed copy of vitals parsed at ingestion (numeric, Celsius); absent on legacy records
+    vital_signs: Optional[VitalSigns] = None
     risk_level: str
     ai_confidence: Optional[float] = None
     priority_score: Optional[int] = None
     recommendations: Optional[str] = None
+    # "ai", "similarity_cache" (reused assessment of a near-identical case), "local_model"
+    # (AI unavailable), "provisional" (local score until the AI assessment lands) or "fallback"
+    assessment_source: str = "ai"
     doctor_assigned: Optional[PyObjectId] = None
-    status: str = "pending"
+    status: TriageStatus = TriageStatus.PENDING
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
+    status_changed_at: Dict[str, datetime] = Field(default_factory=dict)
     
     class Config:
         populate_by_name = True
@@ -26,6 +50,7 @@ class TriageRecord(BaseModel):
                 "patient_id": "507f1f77bcf86cd799439011",
                 "symptoms": {"chest_pain": True, "shortness_of_breath": True},
                 "vitals": {"heart_rate": 110, "blood_pressure": "160/95"},
+                "vital_signs": {"heart_rate": 110, "systolic": 160, "diastolic": 95},
                 "risk_level": "high",
                 "ai_confidence": 0.87,
                 "priority_score": 8,
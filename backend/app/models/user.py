@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List
 from datetime import datetime
 from enum import Enum
 from bson import ObjectId
@@ -32,12 +32,31 @@ class UserRole(str, Enum):
     DOCTOR = "doctor"
     ADMIN = "admin"
 
+class PatientProfile(BaseModel):
+    """Patient data embedded in the user document so the triage path needs no extra lookup."""
+    patient_id: PyObjectId = Field(default_factory=PyObjectId)
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    medical_history: Optional[str] = None
+    # Folded forward on every triage record (app.services.patient_summary); used as prompt context
+    triage_summary: Optional[Dict[str, Any]] = None
+    
+    class Config:
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+
 class User(BaseModel):
     id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
     name: str
     email: EmailStr
     password_hash: str
     role: UserRole = UserRole.PATIENT
+    facility_id: str = "default"
+    patient_profile: Optional[PatientProfile] = None
+    # Doctors only: opt-in to automatic case dispatch
+    dispatch_available: bool = False
+    specialties: List[str] = Field(default_factory=list)
+    max_active_cases: Optional[int] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
     class Config:
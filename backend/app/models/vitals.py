@@ -0,0 +1,122 @@
+import re
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Accepted input keys per typed field (compared after lower-casing and joining words with "_")
+VITAL_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "heart_rate": ("heart_rate", "hr", "pulse"),
+    "systolic": ("systolic", "systolic_bp"),
+    "diastolic": ("diastolic", "diastolic_bp"),
+    "oxygen_saturation": ("oxygen_saturation", "spo2", "o2_sat"),
+    "temperature": ("temperature", "temp"),
+    "respiratory_rate": ("respiratory_rate", "rr", "resp_rate"),
+}
+VITAL_NAMES = list(VITAL_ALIASES)
+
+# Adult reference ranges used for abnormal-rate analytics
+NORMAL_RANGES: Dict[str, Tuple[float, float]] = {
+    "heart_rate": (60, 100),
+    "systolic": (90, 139),
+    "diastolic": (60, 89),
+    "oxygen_saturation": (95, 100),
+    "temperature": (36.1, 37.9),
+    "respiratory_rate": (12, 20),
+}
+
+# Limits of what a measurement can be, not of what is normal: arrest (heart rate 0),
+# profound hypoxia and severe hypothermia must still be stored
+VITAL_LIMITS: Dict[str, Tuple[float, float]] = {
+    "heart_rate": (0, 350),
+    "systolic": (0, 350),
+    "diastolic": (0, 250),
+    "oxygen_saturation": (0, 100),
+    "temperature": (10.0, 46.0),
+    "respiratory_rate": (0, 100),
+}
+
+FAHRENHEIT_THRESHOLD = 45.0
+
+class VitalSigns(BaseModel):
+    """Normalized vitals stored on each triage record as ``vital_signs``.
+
+    Temperature is always Celsius; blood pressure is split into systolic
+    and diastolic mmHg; SpO2 is a percentage. Bounds are VITAL_LIMITS;
+    ingestion drops readings outside them (e.g. SpO2 of 980) instead of
+    rejecting the submission, and the raw vitals are always kept.
+    """
+    heart_rate: Optional[float] = Field(None, ge=0, le=350, description="Beats per minute")
+    systolic: Optional[float] = Field(None, ge=0, le=350, description="mmHg")
+    diastolic: Optional[float] = Field(None, ge=0, le=250, description="mmHg")
+    oxygen_saturation: Optional[float] = Field(None, ge=0, le=100, description="SpO2 %")
+    temperature: Optional[float] = Field(None, ge=10.0, le=46.0, description="Degrees Celsius")
+    respiratory_rate: Optional[float] = Field(None, ge=0, le=100, description="Breaths per minute")
+
+    class Config:
+        json_schema_extra = {
+            "example": {"heart_rate": 110, "systolic": 160, "diastolic": 95, "oxygen_saturation": 94, "temperature": 38.4}
+        }
+
+def _key(name: str) -> str:
+    return "_".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(\.\d+)?", value)
+        return float(match.group()) if match else None
+    return None
+
+def _celsius(value: Any, unit: Optional[str]) -> Optional[float]:
+    number = _number(value)
+    if number is None:
+        return None
+    unit = unit.strip().lower() if isinstance(unit, str) else ""
+    if not unit and isinstance(value, str):
+        # "101.3F", "38.5 °C"
+        match = re.search(r"°?\s*([cf])\b", value.lower())
+        unit = match.group(1) if match else ""
+    if unit.startswith("f") or (not unit.startswith("c") and number > FAHRENHEIT_THRESHOLD):
+        return round((number - 32) * 5 / 9, 1)
+    return number
+
+def vital_readings(vitals: Dict[str, Any]) -> Dict[str, float]:
+    """Numeric readings found in a free-form vitals dict, keyed by VitalSigns field."""
+    normalized = {_key(key): value for key, value in vitals.items()}
+    readings = {}
+    for name, aliases in VITAL_ALIASES.items():
+        for alias in aliases:
+            if name == "temperature":
+                number = _celsius(normalized.get(alias), normalized.get(f"{alias}_unit"))
+            else:
+                number = _number(normalized.get(alias))
+            if number is not None:
+                readings[name] = number
+                break
+    blood_pressure = normalized.get("blood_pressure") or normalized.get("bp")
+    if isinstance(blood_pressure, str) and "/" in blood_pressure:
+        systolic, _, diastolic = blood_pressure.partition("/")
+        if _number(systolic) is not None and _number(diastolic) is not None:
+            readings.setdefault("systolic", _number(systolic))
+            readings.setdefault("diastolic", _number(diastolic))
+    return readings
+
+def plausible_readings(readings: Dict[str, Any]) -> Tuple[Dict[str, float], List[str]]:
+    """Split readings into numeric values within VITAL_LIMITS and the names of those left out."""
+    kept, dropped = {}, []
+    for name, value in readings.items():
+        if name not in VITAL_LIMITS:
+            continue
+        number = _number(value)
+        low, high = VITAL_LIMITS[name]
+        if number is not None and low <= number <= high:
+            kept[name] = number
+        else:
+            dropped.append(name)
+    return kept, dropped
+
+def parse_vitals(vitals: Dict[str, Any]) -> VitalSigns:
+    """Parse free-form vitals into VitalSigns; unusable readings are left out."""
+    return VitalSigns(**plausible_readings(vital_readings(vitals))[0])
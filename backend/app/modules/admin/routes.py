@@ -1,56 +1,350 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse, HTMLResponse, PlainTextResponse, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime, timedelta
+from typing import Callable, Optional, List, Tuple
+from bson import ObjectId
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.startup import startup_timer
+from app.core.facility import FACILITY_FIELD
+from app.core.profiling import profile_store, profiling_available
+from app.core.tracing import tracer
+from app.core.admission import admission_controller
+from app.services.export_service import export_service
+from app.services.audit_service import audit_service, AUDIT_COLLECTION
+from app.services.wait_time_analytics import wait_time_analytics
+from app.services.vitals_analytics import vitals_analytics
+from app.services.prompt_builder import prompt_builder
+from app.services.gemini_ai_service import gemini_service
+from app.services.ai_usage import ai_usage
+from app.services.local_triage_model import local_triage_model
+from app.services.patient_summary import patient_summary_service
+from app.services.query_advisor import query_advisor
+from app.services.outbox import outbox_relay
+from app.modules.doctor.dispatcher import case_dispatcher
 
 router = APIRouter()
 
+TRIAGE_EXPORT_FIELDS = [
+    "facility_id", "patient_id", "symptoms", "vitals", "vital_signs", "risk_level", "ai_confidence", "priority_score",
+    "recommendations", "doctor_assigned", "status", "created_at", "updated_at"
+]
+AUDIT_EXPORT_FIELDS = ["user_id", "action", "details", "ip_address", "timestamp"]
+
 @router.get("/analytics")
 async def get_analytics(
+    facility_id: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Total triages
-    total_triages = await db.triage_records.count_documents({})
-    
-    # Risk distribution
+    # One pass per facility: totals, risk distribution and last-24h counts together.
+    # With a facility_id the match targets a single shard.
+    last_24h = datetime.utcnow() - timedelta(hours=24)
     pipeline = [
-        {"$group": {"_id": "$risk_level", "count": {"$sum": 1}}}
+        {"$match": {FACILITY_FIELD: facility_id} if facility_id else {}},
+        {"$group": {
+            "_id": {"facility_id": f"${FACILITY_FIELD}", "risk_level": "$risk_level"},
+            "count": {"$sum": 1},
+            "recent": {"$sum": {"$cond": [{"$gte": ["$created_at", last_24h]}, 1, 0]}}
+        }}
     ]
-    risk_dist_cursor = db.triage_records.aggregate(pipeline)
-    risk_distribution = {doc["_id"]: doc["count"] async for doc in risk_dist_cursor}
     
-    # Recent triages (last 24 hours)
-    last_24h = datetime.utcnow() - timedelta(hours=24)
-    recent_triages = await db.triage_records.count_documents({"created_at": {"$gte": last_24h}})
+    facilities = {}
+    risk_distribution = {}
+    total_triages = 0
+    recent_triages = 0
+    async for doc in db.triage_records.aggregate(pipeline):
+        facility = doc["_id"].get("facility_id") or "unassigned"
+        risk_level = doc["_id"].get("risk_level")
+        summary = facilities.setdefault(facility, {"total_triages": 0, "risk_distribution": {}, "recent_triages_24h": 0})
+        summary["total_triages"] += doc["count"]
+        summary["risk_distribution"][risk_level] = doc["count"]
+        summary["recent_triages_24h"] += doc["recent"]
+        risk_distribution[risk_level] = risk_distribution.get(risk_level, 0) + doc["count"]
+        total_triages += doc["count"]
+        recent_triages += doc["recent"]
     
     return {
         "total_triages": total_triages,
         "risk_distribution": risk_distribution,
-        "recent_triages_24h": recent_triages
+        "recent_triages_24h": recent_triages,
+        "facilities": facilities
+    }
+
+@router.get("/wait-times")
+async def get_wait_times(
+    window_hours: int = Query(24, ge=1, le=168),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Picks up transitions made through any worker since the last report
+    await wait_time_analytics.sync(db)
+    return {
+        "window_hours": window_hours,
+        **wait_time_analytics.get_wait_times(window_hours)
+    }
+
+@router.get("/vitals-analytics")
+async def get_vitals_analytics(
+    days: int = Query(7, ge=1, le=365),
+    facility_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    since = datetime.utcnow() - timedelta(days=days)
+    return {
+        "days": days,
+        "facility_id": facility_id,
+        **await vitals_analytics.get_report(db, since, facility_id)
     }
 
 @router.get("/system-logs")
 async def get_system_logs(
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    action: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if user_id and not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid user id")
+    
+    return await audit_service.query_logs(db, start=start, end=end, user_id=user_id, action=action, limit=limit)
+
+@router.get("/ai-metrics")
+async def get_ai_metrics(
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return {
+        "prompts": prompt_builder.get_stats(),
+        "batching": gemini_service.batcher.get_stats() if gemini_service.batcher else None,
+        "routing": gemini_service.router.get_stats() if gemini_service.router else None,
+        "hedging": gemini_service.hedger.get_stats() if gemini_service.hedger else None,
+        "similarity_cache": gemini_service.similarity_cache.get_stats() if gemini_service.similarity_cache else None,
+        "local_model": local_triage_model.get_stats(),
+        "patient_summaries": patient_summary_service.get_stats()
+    }
+
+@router.get("/ai-usage")
+async def get_ai_usage(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    bucket_minutes: int = Query(60, ge=1, le=1440),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Flushed usage from all workers (up to AI_USAGE_FLUSH_SECONDS behind) plus this worker's live view
+    since = datetime.utcnow() - timedelta(hours=hours)
+    summary, top_patients = await asyncio.gather(
+        ai_usage.summarize(db, since, bucket_minutes),
+        ai_usage.top_patients(db, since)
+    )
+    return {
+        "window_hours": hours,
+        **summary,
+        "top_patients": top_patients,
+        "budget": ai_usage.get_stats()
+    }
+
+@router.get("/admission")
+async def get_admission_status(
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Exempt from admission control itself so it stays reachable under overload; per worker
+    return {"enabled": settings.ADMISSION_ENABLED, **admission_controller.get_stats()}
+
+@router.get("/dispatch")
+async def get_dispatch_status(
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Queue state lives in the worker holding the dispatch lease; others report leader=false
+    return case_dispatcher.get_stats()
+
+@router.get("/outbox")
+async def get_outbox_status(
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    cursor = db.audit_logs.find().sort("timestamp", -1).limit(limit)
-    logs = await cursor.to_list(length=limit)
+    # Delivery counters live in the worker holding the relay lease; the backlog is global
+    pending_records = await db.triage_records.count_documents({"outbox_pending": True})
+    dead_letters = await db.outbox_dead_letters.estimated_document_count()
+    return {"pending_records": pending_records, "dead_letters": dead_letters, **outbox_relay.get_stats()}
+
+@router.get("/profiles")
+async def list_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return await asyncio.to_thread(profile_store.list, limit)
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("html", pattern="^(html|text|speedscope)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if not profiling_available():
+        raise HTTPException(status_code=503, detail="Profiling is not available (pyinstrument not installed)")
+    
+    rendered = await asyncio.to_thread(profile_store.render, profile_id, format)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "html":
+        return HTMLResponse(rendered)
+    if format == "speedscope":
+        # Open in https://www.speedscope.app for a flame graph
+        return Response(rendered, media_type="application/json")
+    return PlainTextResponse(rendered)
+
+@router.get("/tracing")
+async def get_tracing_stats(
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return tracer.get_stats()
+
+@router.get("/query-report")
+async def get_query_report(
+    limit: int = Query(20, ge=1, le=200),
+    refresh: bool = False,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Stats are per worker; refresh explains this worker's top offenders now instead of on the next pass
+    if refresh:
+        await query_advisor.explain_top_offenders(db)
+    return query_advisor.get_report(limit)
+
+@router.get("/startup-report")
+async def get_startup_report(
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return startup_timer.get_report()
+
+def _export_fields(fields: Optional[str], allowed: List[str]) -> List[str]:
+    if not fields:
+        return allowed
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown export fields: {', '.join(unknown)}")
+    return requested
+
+def _export_response(collection, time_field: str, allowed_fields: List[str], name: str,
+                     format: str, start: Optional[datetime], end: Optional[datetime],
+                     fields: Optional[str], after: Optional[str], batch_size: int,
+                     extra_query: Optional[dict] = None, after_time: Optional[datetime] = None,
+                     sort_fields: Tuple[str, ...] = ("_id",), projection: Optional[dict] = None,
+                     transform: Optional[Callable[[dict], dict]] = None) -> StreamingResponse:
+    if after and not ObjectId.is_valid(after):
+        raise HTTPException(status_code=400, detail="Invalid resume cursor")
+    
+    query = {**(extra_query or {}), **export_service.build_query(time_field, start, end, after, after_time)}
+    chunks = export_service.stream(
+        collection, query, _export_fields(fields, allowed_fields), format, batch_size,
+        sort_fields=sort_fields, projection=projection, transform=transform
+    )
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    extension = "csv" if format == "csv" else "ndjson"
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+    )
+
+@router.get("/export/triage-records")
+async def export_triage_records(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    facility_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated field names"),
+    after: Optional[str] = Query(None, description="Resume after this _id (last _id received)"),
+    batch_size: int = Query(500, ge=1, le=5000),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return _export_response(
+        db.triage_records, "created_at", TRIAGE_EXPORT_FIELDS, "triage_records",
+        format, start, end, fields, after, batch_size,
+        extra_query={FACILITY_FIELD: facility_id} if facility_id else None
+    )
+
+@router.get("/export/audit-logs")
+async def export_audit_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated field names"),
+    after: Optional[str] = Query(None, description="Resume after this _id (last _id received)"),
+    after_timestamp: Optional[datetime] = Query(None, description="Timestamp of the last row received"),
+    batch_size: int = Query(500, ge=1, le=5000),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    # Convert ObjectId to string
-    for log in logs:
-        log["_id"] = str(log["_id"])
-        if log.get("user_id"):
-            log["user_id"] = str(log["user_id"])
+    # Time-series _ids do not follow timestamps, so audit exports are ordered and resumed by both
+    if bool(after) != bool(after_timestamp):
+        raise HTTPException(status_code=400, detail="Resuming audit logs needs both after and after_timestamp")
     
-    return logs
+    return _export_response(
+        db[AUDIT_COLLECTION], "timestamp", AUDIT_EXPORT_FIELDS, "audit_logs",
+        format, start, end, fields, after, batch_size,
+        after_time=after_timestamp,
+        sort_fields=("timestamp", "_id"),
+        projection={"timestamp": 1, "meta": 1, "action": 1, "details": 1, "ip_address": 1},
+        transform=audit_service.from_document
+    )
@@ -4,7 +4,6 @@ from bson import ObjectId
 from datetime import datetime
 
 from app.models.user import User, UserRole
-from app.models.patient import Patient
 
 class AuthRepository:
     @staticmethod
@@ -24,6 +23,7 @@ class AuthRepository:
         email: str,
         password_hash: str,
         role: str,
+        facility_id: str,
         age: Optional[int] = None,
         gender: Optional[str] = None,
         medical_history: Optional[str] = None
@@ -33,21 +33,21 @@ class AuthRepository:
             "email": email,
             "password_hash": password_hash,
             "role": role,
+            "facility_id": facility_id,
             "created_at": datetime.utcnow()
         }
         
-        result = await db.users.insert_one(user_data)
-        user_data["_id"] = result.inserted_id
-        
-        # Create patient profile if role is patient
+        # Patient profile is embedded in the user document (single insert)
         if role == "patient":
-            patient_data = {
-                "user_id": result.inserted_id,
+            user_data["patient_profile"] = {
+                "patient_id": ObjectId(),
                 "age": age,
                 "gender": gender,
                 "medical_history": medical_history
             }
-            await db.patients.insert_one(patient_data)
+        
+        result = await db.users.insert_one(user_data)
+        user_data["_id"] = result.inserted_id
         
         return user_data
 
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, Request
+from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.database import get_db
+from app.core.facility import user_facility
 from app.modules.auth.schema import UserRegister, UserLogin, TokenResponse, RefreshTokenRequest, UserResponse
 from app.modules.auth.service import auth_service
 from app.services.audit_service import audit_service
 
 router = APIRouter()
 
+def _patient_id(user: dict) -> Optional[str]:
+    profile = user.get("patient_profile")
+    return str(profile["patient_id"]) if profile else None
+
 @router.post("/register", response_model=TokenResponse)
 async def register(user_data: UserRegister, request: Request, db: AsyncIOMotorDatabase = Depends(get_db)):
     user = await auth_service.register_user(db, user_data)
@@ -33,6 +39,8 @@ async def register(user_data: UserRegister, request: Request, db: AsyncIOMotorDa
         name=user["name"],
         email=user["email"],
         role=user["role"],
+        facility_id=user_facility(user),
+        patient_id=_patient_id(user),
         created_at=user["created_at"]
     )
     
@@ -60,6 +68,8 @@ async def login(login_data: UserLogin, request: Request, db: AsyncIOMotorDatabas
         name=tokens["user"]["name"],
         email=tokens["user"]["email"],
         role=tokens["user"]["role"],
+        facility_id=user_facility(tokens["user"]),
+        patient_id=_patient_id(tokens["user"]),
         created_at=tokens["user"]["created_at"]
     )
     
@@ -10,6 +10,7 @@ class UserRegister(BaseModel):
     age: Optional[int] = Field(None, ge=0, le=150)
     gender: Optional[str] = None
     medical_history: Optional[str] = None
+    facility_id: Optional[str] = Field(None, min_length=1, max_length=64, pattern="^[A-Za-z0-9_-]+$")
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -26,6 +27,8 @@ class UserResponse(BaseModel):
     name: str
     email: str
     role: str
+    facility_id: Optional[str] = None
+    patient_id: Optional[str] = None
     created_at: datetime
     
     class Config:
@@ -3,6 +3,7 @@ from fastapi import HTTPException, status
 from typing import Dict
 from bson import ObjectId
 
+from app.core.config import settings
 from app.modules.auth.repository import auth_repository
 from app.modules.auth.schema import UserRegister, UserLogin
 from app.core.security import (
@@ -31,6 +32,7 @@ class AuthService:
             email=user_data.email,
             password_hash=password_hash,
             role=user_data.role,
+            facility_id=user_data.facility_id or settings.DEFAULT_FACILITY_ID,
             age=user_data.age,
             gender=user_data.gender,
             medical_history=user_data.medical_history
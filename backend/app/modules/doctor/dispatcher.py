@@ -0,0 +1,331 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.models.triage_record import TriageStatus
+from app.modules.doctor.repository import doctor_repository
+
+logger = logging.getLogger(__name__)
+
+LEASE_ID = "case_dispatcher"
+GENERAL_QUEUE = "general"
+# Records changed within this many seconds before the last watermark are re-read, so
+# writes that commit out of timestamp order are not missed (applying a record twice is harmless)
+SYNC_OVERLAP_SECONDS = 5
+
+# Symptom keys / description keywords that tag a case for a specialty
+SPECIALTY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "cardiology": ("chest_pain", "chest pain", "palpitation", "arrhythmia"),
+    "pulmonology": ("shortness_of_breath", "shortness of breath", "breathing", "cough", "wheez"),
+    "neurology": ("headache", "seizure", "dizziness", "confusion", "numbness", "stroke"),
+    "orthopedics": ("fracture", "sprain", "ankle", "wrist", "swelling", "joint"),
+    "pediatrics": ("infant", "child", "toddler"),
+}
+
+CASE_PROJECTION = {
+    "facility_id": 1, "status": 1, "priority_score": 1, "created_at": 1, "updated_at": 1,
+    "doctor_assigned": 1, "symptoms": 1
+}
+
+def case_specialties(symptoms: Dict[str, Any]) -> List[str]:
+    text = " ".join(
+        [key.lower() for key, value in symptoms.items() if value is True]
+        + [value.lower() for value in symptoms.values() if isinstance(value, str)]
+    )
+    return [specialty for specialty, keywords in SPECIALTY_KEYWORDS.items() if any(keyword in text for keyword in keywords)]
+
+class CaseDispatcher:
+    """Assigns pending triage records to available doctors.
+
+    Each facility keeps one heap of every pending case plus a heap per
+    specialty tag. Wait-time aging is folded into a static key
+    (``aging * created_minutes - priority``): every case ages at the same
+    rate, so the order never changes as time passes and push/pop stay
+    O(log n) without re-heapifying. Cases leaving the queue another way
+    (manual claim, cancellation) are dropped lazily when they reach the top.
+
+    Doctors opt in via ``dispatch_available`` and are filled least-loaded
+    first up to their active-case limit. Only the worker holding the Mongo
+    lease dispatches; claims go through the same atomic transition as the
+    manual endpoint, so a case can never be assigned twice.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        aging_per_minute: float,
+        specialty_bonus: float,
+        max_active_cases: int,
+        lease_seconds: int,
+        resync_seconds: int
+    ):
+        self.interval_seconds = interval_seconds
+        self.aging_per_minute = aging_per_minute
+        self.specialty_bonus = specialty_bonus
+        self.max_active_cases = max_active_cases
+        self.lease_seconds = lease_seconds
+        self.resync_seconds = resync_seconds
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._sequence = itertools.count()
+        self._reset()
+        self._stats = Counter()
+        self._last_tick_ms = 0.0
+
+    def _reset(self):
+        # facility -> queue name -> heap of (key, sequence, case_id)
+        self._heaps: Dict[str, Dict[str, list]] = {}
+        # Cases currently queued: case_id -> (facility_id, key, specialties)
+        self._queued: Dict[ObjectId, Tuple[str, float, List[str]]] = {}
+        self._created_at: Dict[ObjectId, datetime] = {}
+        self._active: Dict[ObjectId, ObjectId] = {}
+        self._load: Counter = Counter()
+        self._doctors: List[dict] = []
+        self._watermark: Optional[datetime] = None
+        self._resynced_at = 0.0
+
+    def _key(self, record: dict) -> float:
+        created_minutes = record["created_at"].timestamp() / 60
+        return self.aging_per_minute * created_minutes - (record.get("priority_score") or 0)
+
+    def _enqueue(self, record: dict):
+        key = self._key(record)
+        queued = self._queued.get(record["_id"])
+        if queued is not None and queued[1] == key:
+            return
+        # New case, or its priority changed (provisional score replaced); older entries go stale
+        facility_id = record.get("facility_id") or settings.DEFAULT_FACILITY_ID
+        specialties = case_specialties(record.get("symptoms") or {})
+        self._push(record["_id"], (facility_id, key, specialties), record["created_at"])
+
+    def _push(self, case_id: ObjectId, queued: Tuple[str, float, List[str]], created_at: datetime):
+        facility_id, key, specialties = queued
+        heaps = self._heaps.setdefault(facility_id, {})
+        entry = (key, next(self._sequence), case_id)
+        for name in [GENERAL_QUEUE, *specialties]:
+            heapq.heappush(heaps.setdefault(name, []), entry)
+        self._queued[case_id] = queued
+        self._created_at[case_id] = created_at
+
+    def _dequeue(self, case_id: ObjectId):
+        self._queued.pop(case_id, None)
+        self._created_at.pop(case_id, None)
+
+    def _release(self, case_id: ObjectId):
+        doctor_id = self._active.pop(case_id, None)
+        if doctor_id is not None:
+            self._load[doctor_id] -= 1
+            if self._load[doctor_id] <= 0:
+                del self._load[doctor_id]
+
+    def _apply(self, record: dict):
+        """Bring in-memory state in line with one record's current status."""
+        status = record.get("status")
+        if status == TriageStatus.PENDING.value:
+            self._release(record["_id"])
+            self._enqueue(record)
+            return
+        self._dequeue(record["_id"])
+        if status == TriageStatus.IN_PROGRESS.value and record.get("doctor_assigned"):
+            if self._active.get(record["_id"]) != record["doctor_assigned"]:
+                self._release(record["_id"])
+                self._active[record["_id"]] = record["doctor_assigned"]
+                self._load[record["doctor_assigned"]] += 1
+        else:
+            self._release(record["_id"])
+
+    def _is_current(self, entry: tuple) -> bool:
+        queued = self._queued.get(entry[2])
+        return queued is not None and queued[1] == entry[0]
+
+    def _peek(self, heap: list) -> Optional[tuple]:
+        # Lazy deletion: entries for cases that left the queue or were re-keyed are discarded here
+        while heap and not self._is_current(heap[0]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _next_case(self, facility_id: str, specialties: List[str]) -> Optional[ObjectId]:
+        heaps = self._heaps.get(facility_id)
+        if not heaps:
+            return None
+        best, best_heap, best_score = None, None, None
+        for name in [GENERAL_QUEUE, *specialties]:
+            heap = heaps.get(name)
+            entry = self._peek(heap) if heap else None
+            if entry is None:
+                continue
+            score = entry[0] - (self.specialty_bonus if name != GENERAL_QUEUE else 0.0)
+            if best_score is None or score < best_score:
+                best, best_heap, best_score = entry, heap, score
+        if best is None:
+            return None
+        heapq.heappop(best_heap)
+        return best[2]
+
+    async def _acquire_lease(self, db: AsyncIOMotorDatabase) -> bool:
+        now = datetime.utcnow()
+        try:
+            await db.dispatcher_leases.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"owner": self.owner_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner_id, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            return False
+
+    async def release_lease(self, db: AsyncIOMotorDatabase):
+        if self.is_leader:
+            await db.dispatcher_leases.update_one(
+                {"_id": LEASE_ID, "owner": self.owner_id}, {"$set": {"expires_at": datetime.utcnow()}}
+            )
+            self.is_leader = False
+
+    async def _resync(self, db: AsyncIOMotorDatabase):
+        """Rebuild the queues and doctor loads from all open records."""
+        self._reset()
+        self._watermark = datetime.utcnow()
+        cursor = db.triage_records.find(
+            {"status": {"$in": [TriageStatus.PENDING.value, TriageStatus.IN_PROGRESS.value]}},
+            CASE_PROJECTION
+        ).batch_size(1000)
+        async for record in cursor:
+            self._apply(record)
+        self._resynced_at = time.monotonic()
+        logger.info(f"Case dispatcher resynced: {len(self._queued)} queued, {len(self._active)} active")
+
+    async def _sync(self, db: AsyncIOMotorDatabase):
+        """Apply records created or changed since the last sync (by any worker)."""
+        since = self._watermark - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        cursor = db.triage_records.find(
+            {"$or": [{"created_at": {"$gt": since}}, {"updated_at": {"$gt": since}}]},
+            CASE_PROJECTION
+        ).batch_size(1000)
+        async for record in cursor:
+            self._apply(record)
+            changed_at = max(filter(None, (record.get("created_at"), record.get("updated_at"))))
+            if changed_at > self._watermark:
+                self._watermark = changed_at
+
+        self._doctors = await doctor_repository.get_available_doctors(db)
+
+    async def dispatch(self, db: AsyncIOMotorDatabase) -> int:
+        """Fill every available doctor up to their limit; returns the number of assignments."""
+        by_facility: Dict[str, List[dict]] = {}
+        for doctor in self._doctors:
+            by_facility.setdefault(doctor.get("facility_id") or settings.DEFAULT_FACILITY_ID, []).append(doctor)
+
+        assigned = 0
+        for facility_id, doctors in by_facility.items():
+            # Least-loaded doctor first; ties go to whoever has waited longest for a case
+            ready = []
+            for doctor in doctors:
+                capacity = doctor.get("max_active_cases") or self.max_active_cases
+                if self._load[doctor["_id"]] < capacity:
+                    ready.append((self._load[doctor["_id"]], next(self._sequence), doctor, capacity))
+            heapq.heapify(ready)
+
+            while ready:
+                load, _, doctor, capacity = heapq.heappop(ready)
+                record = None
+                while record is None:
+                    case_id = self._next_case(facility_id, doctor.get("specialties") or [])
+                    if case_id is None:
+                        break
+                    queued, created_at = self._queued[case_id], self._created_at[case_id]
+                    self._dequeue(case_id)
+                    try:
+                        record = await doctor_repository.transition_status(
+                            db, facility_id, case_id, doctor["_id"], TriageStatus.IN_PROGRESS
+                        )
+                    except Exception:
+                        # The claim may not have happened; keep the case queued for the next tick
+                        self._push(case_id, queued, created_at)
+                        raise
+                    if record is None:
+                        # Claimed manually or cancelled since the last sync
+                        self._stats["conflicts"] += 1
+                if record is None:
+                    continue
+
+                self._active[record["_id"]] = doctor["_id"]
+                self._load[doctor["_id"]] += 1
+                self._stats["assigned"] += 1
+                assigned += 1
+                if load + 1 < capacity:
+                    heapq.heappush(ready, (load + 1, next(self._sequence), doctor, capacity))
+        return assigned
+
+    async def tick(self, db: AsyncIOMotorDatabase):
+        started = time.perf_counter()
+        if not await self._acquire_lease(db):
+            if self.is_leader:
+                logger.info("Case dispatcher lease lost")
+                self._reset()
+            self.is_leader = False
+            return
+
+        if not self.is_leader or time.monotonic() - self._resynced_at >= self.resync_seconds:
+            await self._resync(db)
+        self.is_leader = True
+        await self._sync(db)
+        assigned = await self.dispatch(db)
+        self._last_tick_ms = (time.perf_counter() - started) * 1000
+        if assigned:
+            logger.info(f"Dispatched {assigned} cases in {self._last_tick_ms:.1f}ms")
+
+    async def run(self, db: AsyncIOMotorDatabase):
+        logger.info(f"Case dispatcher started ({self.owner_id})")
+        while True:
+            try:
+                await self.tick(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Case dispatch failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        queued_by_facility = Counter(facility_id for facility_id, _, _ in self._queued.values())
+        oldest = min(self._created_at.values(), default=None)
+        return {
+            "leader": self.is_leader,
+            "owner": self.owner_id,
+            "queued": len(self._queued),
+            "queued_by_facility": dict(queued_by_facility),
+            "oldest_wait_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+            "active_assignments": len(self._active),
+            "available_doctors": len(self._doctors),
+            "doctors_at_capacity": sum(
+                1 for doctor in self._doctors
+                if self._load[doctor["_id"]] >= (doctor.get("max_active_cases") or self.max_active_cases)
+            ),
+            "assigned_total": self._stats["assigned"],
+            "conflicts": self._stats["conflicts"],
+            "last_tick_ms": round(self._last_tick_ms, 2)
+        }
+
+case_dispatcher = CaseDispatcher(
+    interval_seconds=settings.DISPATCH_INTERVAL_SECONDS,
+    aging_per_minute=settings.DISPATCH_AGING_PER_MINUTE,
+    specialty_bonus=settings.DISPATCH_SPECIALTY_BONUS,
+    max_active_cases=settings.DISPATCH_MAX_ACTIVE_CASES,
+    lease_seconds=settings.DISPATCH_LEASE_SECONDS,
+    resync_seconds=settings.DISPATCH_RESYNC_SECONDS
+)
@@ -0,0 +1,152 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from datetime import datetime
+
+from app.core.facility import scoped
+from app.models.triage_record import TriageStatus, TRIAGE_STATUS_TRANSITIONS
+
+# Undelivered outbox events (ObjectIds, datetimes) are relay state, not part of a case
+CASE_EXCLUDED_FIELDS = {"outbox": 0, "outbox_pending": 0}
+
+class DoctorRepository:
+    @staticmethod
+    def _transition_filter(doctor_id: ObjectId, target: TriageStatus) -> dict:
+        # A record may move to `target` only from a status that allows it; cases
+        # already in progress can only be moved on by the doctor who claimed them.
+        clauses = []
+        for source, targets in TRIAGE_STATUS_TRANSITIONS.items():
+            if target not in targets:
+                continue
+            clause = {"status": source.value}
+            if source == TriageStatus.IN_PROGRESS:
+                clause["doctor_assigned"] = doctor_id
+            clauses.append(clause)
+        return {"$or": clauses}
+
+    @staticmethod
+    def _transition_update(doctor_id: ObjectId, target: TriageStatus, transition_id: ObjectId) -> dict:
+        now = datetime.utcnow()
+        update = {
+            "$set": {
+                "status": target.value,
+                "updated_at": now,
+                f"status_changed_at.{target.value}": now,
+                "last_transition_id": transition_id
+            }
+        }
+        if target == TriageStatus.IN_PROGRESS:
+            update["$set"]["doctor_assigned"] = doctor_id
+        elif target == TriageStatus.PENDING:
+            update["$unset"] = {"doctor_assigned": ""}
+        return update
+
+    @staticmethod
+    async def get_pending_cases(db: AsyncIOMotorDatabase, facility_id: str, limit: int = 100) -> List[dict]:
+        cursor = db.triage_records.find(
+            scoped(facility_id, {"status": TriageStatus.PENDING.value}),
+            CASE_EXCLUDED_FIELDS
+        ).sort("priority_score", -1)
+        return await cursor.to_list(length=limit)
+
+    @staticmethod
+    async def transition_status(
+        db: AsyncIOMotorDatabase,
+        facility_id: str,
+        triage_id: ObjectId,
+        doctor_id: ObjectId,
+        target: TriageStatus
+    ) -> Optional[dict]:
+        """Atomically apply a status transition; returns the updated record, or None if it was not allowed."""
+        query = scoped(facility_id, {"_id": triage_id, **DoctorRepository._transition_filter(doctor_id, target)})
+        return await db.triage_records.find_one_and_update(
+            query,
+            DoctorRepository._transition_update(doctor_id, target, ObjectId()),
+            projection=CASE_EXCLUDED_FIELDS,
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    async def bulk_transition_status(
+        db: AsyncIOMotorDatabase,
+        facility_id: str,
+        triage_ids: List[ObjectId],
+        doctor_id: ObjectId,
+        target: TriageStatus
+    ) -> List[dict]:
+        """Apply a transition to many records in two round trips; returns the updated records' timing fields."""
+        transition_id = ObjectId()
+        query = scoped(facility_id, {"_id": {"$in": triage_ids}, **DoctorRepository._transition_filter(doctor_id, target)})
+        result = await db.triage_records.update_many(
+            query,
+            DoctorRepository._transition_update(doctor_id, target, transition_id)
+        )
+        if result.modified_count == 0:
+            return []
+
+        cursor = db.triage_records.find(
+            scoped(facility_id, {"last_transition_id": transition_id}),
+            {"_id": 1, "status": 1, "risk_level": 1, "created_at": 1, "status_changed_at": 1}
+        )
+        return await cursor.to_list(length=len(triage_ids))
+
+    @staticmethod
+    async def get_queue_validator(db: AsyncIOMotorDatabase, facility_id: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Queue version: a facility's pending queue only changes when one of its records is created or transitions.
+
+        Returns the latest created_at and updated_at, each a single index lookup.
+        """
+        latest_created, latest_updated = await asyncio.gather(
+            db.triage_records.find_one(scoped(facility_id, {}), {"_id": 0, "created_at": 1}, sort=[("created_at", -1)]),
+            db.triage_records.find_one(
+                scoped(facility_id, {"updated_at": {"$exists": True}}), {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)]
+            )
+        )
+        return (
+            latest_created["created_at"] if latest_created else None,
+            latest_updated["updated_at"] if latest_updated else None
+        )
+
+    @staticmethod
+    async def get_assigned_cases(db: AsyncIOMotorDatabase, facility_id: str, doctor_id: ObjectId) -> List[dict]:
+        cursor = db.triage_records.find(
+            scoped(facility_id, {"doctor_assigned": doctor_id, "status": TriageStatus.IN_PROGRESS.value}),
+            CASE_EXCLUDED_FIELDS
+        ).sort("priority_score", -1)
+        return await cursor.to_list(length=100)
+
+    @staticmethod
+    async def set_availability(
+        db: AsyncIOMotorDatabase,
+        doctor_id: ObjectId,
+        available: bool,
+        specialties: Optional[List[str]] = None,
+        max_active_cases: Optional[int] = None
+    ) -> Optional[dict]:
+        update = {"dispatch_available": available}
+        if specialties is not None:
+            update["specialties"] = specialties
+        if max_active_cases is not None:
+            update["max_active_cases"] = max_active_cases
+        return await db.users.find_one_and_update(
+            {"_id": doctor_id, "role": "doctor"},
+            {"$set": update},
+            {"_id": 0, "dispatch_available": 1, "specialties": 1, "max_active_cases": 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    async def get_available_doctors(db: AsyncIOMotorDatabase) -> List[dict]:
+        cursor = db.users.find(
+            {"role": "doctor", "dispatch_available": True},
+            {"facility_id": 1, "specialties": 1, "max_active_cases": 1}
+        )
+        return await cursor.to_list(length=None)
+
+    @staticmethod
+    async def triage_exists(db: AsyncIOMotorDatabase, facility_id: str, triage_id: ObjectId) -> bool:
+        return await db.triage_records.count_documents(scoped(facility_id, {"_id": triage_id}), limit=1) > 0
+
+doctor_repository = DoctorRepository()
@@ -1,54 +1,148 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List
 from bson import ObjectId
 
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.config import settings
+from app.core.facility import user_facility
+from app.models.triage_record import TriageStatus
+from app.modules.doctor.repository import doctor_repository
+from app.modules.doctor.schema import (
+    BulkStatusUpdateRequest,
+    BulkStatusUpdateResponse,
+    AvailabilityRequest,
+    AvailabilityResponse
+)
+from app.utils.http_cache import make_etag, is_not_modified, not_modified, set_validators
 
 router = APIRouter()
 
+def _serialize_case(case: dict) -> dict:
+    case["_id"] = str(case["_id"])
+    case["patient_id"] = str(case["patient_id"])
+    if case.get("doctor_assigned"):
+        case["doctor_assigned"] = str(case["doctor_assigned"])
+    if case.get("status_changed_at"):
+        case["status_changed_at"] = {status: changed_at.isoformat() for status, changed_at in case["status_changed_at"].items()}
+    if case.get("last_transition_id"):
+        case["last_transition_id"] = str(case["last_transition_id"])
+    return case
+
 @router.get("/pending-cases")
 async def get_pending_cases(
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     if current_user["role"] != "doctor":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    cursor = db.triage_records.find({"status": "pending"}).sort("priority_score", -1)
-    pending_cases = await cursor.to_list(length=100)
+    facility_id = user_facility(current_user)
+    latest_created, latest_updated = await doctor_repository.get_queue_validator(db, facility_id)
+    last_modified = max(filter(None, (latest_created, latest_updated)), default=None)
+    etag = make_etag("pending", facility_id, latest_created, latest_updated)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
     
-    # Convert ObjectId to string
-    for case in pending_cases:
-        case["_id"] = str(case["_id"])
-        case["patient_id"] = str(case["patient_id"])
-        if case.get("doctor_assigned"):
-            case["doctor_assigned"] = str(case["doctor_assigned"])
+    pending_cases = await doctor_repository.get_pending_cases(db, facility_id)
     
-    return pending_cases
+    # Convert ObjectId to string
+    return [_serialize_case(case) for case in pending_cases]
 
 @router.patch("/update-status/{triage_id}")
 async def update_triage_status(
     triage_id: str,
-    status: str,
+    status: TriageStatus,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     if current_user["role"] != "doctor":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    triage_record = await db.triage_records.find_one({"_id": ObjectId(triage_id)})
+    if not ObjectId.is_valid(triage_id):
+        raise HTTPException(status_code=400, detail="Invalid triage id")
+    
+    facility_id = user_facility(current_user)
+    triage_record = await doctor_repository.transition_status(
+        db, facility_id, ObjectId(triage_id), current_user["_id"], status
+    )
     
     if not triage_record:
-        raise HTTPException(status_code=404, detail="Triage record not found")
-    
-    await db.triage_records.update_one(
-        {"_id": ObjectId(triage_id)},
-        {"$set": {
-            "status": status,
-            "doctor_assigned": current_user["_id"]
-        }}
+        # Only the failure path pays for a second lookup, to tell 404 from 409
+        if not await doctor_repository.triage_exists(db, facility_id, ObjectId(triage_id)):
+            raise HTTPException(status_code=404, detail="Triage record not found")
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot move triage record to '{status.value}' from its current status"
+        )
+    
+    return {
+        "message": "Status updated successfully",
+        "triage_id": triage_id,
+        "record": _serialize_case(triage_record)
+    }
+
+@router.patch("/bulk-update-status", response_model=BulkStatusUpdateResponse)
+async def bulk_update_triage_status(
+    update_data: BulkStatusUpdateRequest,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    invalid_ids = [triage_id for triage_id in update_data.triage_ids if not ObjectId.is_valid(triage_id)]
+    if invalid_ids:
+        raise HTTPException(status_code=400, detail=f"Invalid triage ids: {', '.join(invalid_ids)}")
+    
+    requested = list(dict.fromkeys(update_data.triage_ids))
+    updated_records = await doctor_repository.bulk_transition_status(
+        db, user_facility(current_user), [ObjectId(triage_id) for triage_id in requested], current_user["_id"], update_data.status
     )
+    updated = {str(record["_id"]) for record in updated_records}
     
-    return {"message": "Status updated successfully", "triage_id": triage_id}
+    return BulkStatusUpdateResponse(
+        status=update_data.status,
+        updated=[triage_id for triage_id in requested if triage_id in updated],
+        rejected=[triage_id for triage_id in requested if triage_id not in updated]
+    )
+
+@router.get("/assigned-cases")
+async def get_assigned_cases(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    assigned_cases = await doctor_repository.get_assigned_cases(db, user_facility(current_user), current_user["_id"])
+    return [_serialize_case(case) for case in assigned_cases]
+
+@router.put("/availability", response_model=AvailabilityResponse)
+async def set_availability(
+    availability: AvailabilityRequest,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    if current_user["role"] != "doctor":
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    specialties = None
+    if availability.specialties is not None:
+        specialties = sorted({specialty.strip().lower() for specialty in availability.specialties if specialty.strip()})
+    
+    doctor = await doctor_repository.set_availability(
+        db, current_user["_id"], availability.available, specialties, availability.max_active_cases
+    )
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    
+    return AvailabilityResponse(
+        available=doctor["dispatch_available"],
+        specialties=doctor.get("specialties", []),
+        max_active_cases=doctor.get("max_active_cases") or settings.DISPATCH_MAX_ACTIVE_CASES
+    )
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from app.models.triage_record import TriageStatus
+
+class BulkStatusUpdateRequest(BaseModel):
+    triage_ids: List[str] = Field(..., min_length=1, max_length=100)
+    status: TriageStatus
+
+class BulkStatusUpdateResponse(BaseModel):
+    status: TriageStatus
+    updated: List[str]
+    rejected: List[str]
+
+class AvailabilityRequest(BaseModel):
+    available: bool
+    specialties: Optional[List[str]] = Field(None, max_length=10)
+    max_active_cases: Optional[int] = Field(None, ge=1, le=20)
+
+class AvailabilityResponse(BaseModel):
+    available: bool
+    specialties: List[str] = []
+    max_active_cases: int
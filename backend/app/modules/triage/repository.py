@@ -1,51 +1,123 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
+from pymongo import ReturnDocument
+from typing import List, Optional, Tuple
+from datetime import datetime
 from bson import ObjectId
 
+from app.core.facility import scoped
+
 class TriageRepository:
     @staticmethod
     async def create_triage_record(
         db: AsyncIOMotorDatabase,
+        facility_id: str,
         patient_id: str,
         symptoms: dict,
         vitals: dict,
         risk_level: str,
         ai_confidence: float,
         priority_score: int,
-        recommendations: str
+        recommendations: str,
+        assessment_source: str = "ai",
+        vital_signs: Optional[dict] = None,
+        outbox_event: Optional[dict] = None,
+        ai_usage: Optional[dict] = None
     ) -> dict:
-        from datetime import datetime
-        
         triage_data = {
+            "facility_id": facility_id,
             "patient_id": ObjectId(patient_id),
             "symptoms": symptoms,
             "vitals": vitals,
+            "vital_signs": vital_signs or {},
             "risk_level": risk_level,
             "ai_confidence": ai_confidence,
             "priority_score": priority_score,
             "recommendations": recommendations,
+            "assessment_source": assessment_source,
             "status": "pending",
             "created_at": datetime.utcnow()
         }
+        if ai_usage:
+            triage_data["ai_usage"] = ai_usage
+        if outbox_event:
+            # Stored with the record in the same insert; delivered by the outbox relay
+            triage_data["outbox"] = [outbox_event]
+            triage_data["outbox_pending"] = True
         
         result = await db.triage_records.insert_one(triage_data)
         triage_data["_id"] = result.inserted_id
         return triage_data
     
+    @staticmethod
+    async def update_assessment(
+        db: AsyncIOMotorDatabase,
+        facility_id: str,
+        triage_id: ObjectId,
+        risk_level: str,
+        ai_confidence: float,
+        priority_score: int,
+        recommendations: str,
+        assessment_source: str,
+        outbox_event: Optional[dict] = None,
+        ai_usage: Optional[dict] = None
+    ) -> Optional[dict]:
+        """Replace a provisional assessment; the record keeps its status and any doctor claim."""
+        update = {"$set": {
+            "risk_level": risk_level,
+            "ai_confidence": ai_confidence,
+            "priority_score": priority_score,
+            "recommendations": recommendations,
+            "assessment_source": assessment_source,
+            "updated_at": datetime.utcnow()
+        }}
+        if ai_usage:
+            update["$set"]["ai_usage"] = ai_usage
+        if outbox_event:
+            update["$set"]["outbox_pending"] = True
+            update["$push"] = {"outbox": outbox_event}
+        return await db.triage_records.find_one_and_update(
+            scoped(facility_id, {"_id": triage_id}),
+            update,
+            return_document=ReturnDocument.AFTER
+        )
+    
     @staticmethod
     async def get_patient_by_user_id(db: AsyncIOMotorDatabase, user_id: str) -> Optional[dict]:
         patient = await db.patients.find_one({"user_id": ObjectId(user_id)})
         return patient
     
     @staticmethod
-    async def get_triage_history(db: AsyncIOMotorDatabase, patient_id: str) -> List[dict]:
-        cursor = db.triage_records.find({"patient_id": ObjectId(patient_id)}).sort("created_at", -1)
+    async def get_triage_history(db: AsyncIOMotorDatabase, facility_id: str, patient_id: str) -> List[dict]:
+        cursor = db.triage_records.find(scoped(facility_id, {"patient_id": ObjectId(patient_id)})).sort("created_at", -1)
         records = await cursor.to_list(length=100)
         return records
     
     @staticmethod
-    async def get_triage_by_id(db: AsyncIOMotorDatabase, triage_id: str) -> Optional[dict]:
-        triage = await db.triage_records.find_one({"_id": ObjectId(triage_id)})
+    async def get_history_validator(
+        db: AsyncIOMotorDatabase,
+        facility_id: str,
+        patient_id: str
+    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Latest created_at and updated_at for a patient; both are index lookups on (facility_id, patient_id, field)."""
+        latest_created, latest_updated = await asyncio.gather(
+            db.triage_records.find_one(
+                scoped(facility_id, {"patient_id": ObjectId(patient_id)}),
+                {"_id": 0, "created_at": 1}, sort=[("created_at", -1)]
+            ),
+            db.triage_records.find_one(
+                scoped(facility_id, {"patient_id": ObjectId(patient_id), "updated_at": {"$exists": True}}),
+                {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)]
+            )
+        )
+        return (
+            latest_created["created_at"] if latest_created else None,
+            latest_updated["updated_at"] if latest_updated else None
+        )
+    
+    @staticmethod
+    async def get_triage_by_id(db: AsyncIOMotorDatabase, facility_id: str, triage_id: str) -> Optional[dict]:
+        triage = await db.triage_records.find_one(scoped(facility_id, {"_id": ObjectId(triage_id)}))
         return triage
 
 triage_repository = TriageRepository()
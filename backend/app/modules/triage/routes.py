@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, Response, HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
+from typing import List, Optional
+from bson import ObjectId
 
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.facility import user_facility
 from app.modules.triage.schema import TriageRequest, TriageResponse, TriageHistoryResponse
 from app.modules.triage.service import triage_service
 from app.modules.triage.repository import triage_repository
-from app.services.audit_service import audit_service
+from app.utils.http_cache import make_etag, is_not_modified, not_modified, set_validators
 
 router = APIRouter()
 
@@ -21,14 +23,9 @@ async def analyze_triage(
     if current_user["role"] != "patient":
         raise HTTPException(status_code=403, detail="Only patients can submit triage requests")
     
-    triage_record = await triage_service.analyze_patient(db, current_user, triage_data)
-    
-    await audit_service.log_action(
-        db=db,
-        user_id=str(current_user["_id"]),
-        action="TRIAGE_ANALYSIS",
-        details=f"Risk level: {triage_record['risk_level']}, Priority: {triage_record['priority_score']}",
-        ip_address=request.client.host if request.client else None
+    # The TRIAGE_ANALYSIS audit entry is written from the record's outbox event
+    triage_record = await triage_service.analyze_patient(
+        db, current_user, triage_data, ip_address=request.client.host if request.client else None
     )
     
     # Convert to response model
@@ -38,6 +35,7 @@ async def analyze_triage(
         priority_score=triage_record["priority_score"],
         ai_confidence=triage_record["ai_confidence"],
         recommendations=triage_record["recommendations"],
+        assessment_source=triage_record["assessment_source"],
         status=triage_record["status"],
         created_at=triage_record["created_at"]
     )
@@ -45,15 +43,32 @@ async def analyze_triage(
 @router.get("/history/{patient_id}", response_model=List[TriageHistoryResponse])
 async def get_triage_history(
     patient_id: str,
+    request: Request,
+    response: Response,
+    facility_id: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    patient = await triage_repository.get_patient_by_user_id(db, str(current_user["_id"]))
+    # Only admins may read another facility's records
+    if current_user["role"] != "admin" or not facility_id:
+        facility_id = user_facility(current_user)
+    
+    if current_user["role"] == "patient":
+        patient = await triage_service.get_patient_profile(db, current_user)
+        if not patient or str(patient["patient_id"]) != patient_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+    
+    if not ObjectId.is_valid(patient_id):
+        raise HTTPException(status_code=400, detail="Invalid patient id")
     
-    if current_user["role"] == "patient" and str(patient["_id"]) != patient_id:
-        raise HTTPException(status_code=403, detail="Access denied")
+    latest_created, latest_updated = await triage_repository.get_history_validator(db, facility_id, patient_id)
+    last_modified = max(filter(None, (latest_created, latest_updated)), default=None)
+    etag = make_etag("history", facility_id, patient_id, latest_created, latest_updated)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
     
-    history = await triage_service.get_patient_history(db, patient_id)
+    history = await triage_service.get_patient_history(db, facility_id, patient_id)
     
     # Convert to response models
     return [
@@ -65,7 +80,8 @@ async def get_triage_history(
             doctor_assigned=str(record["doctor_assigned"]) if record.get("doctor_assigned") else None,
             created_at=record["created_at"],
             symptoms=record["symptoms"],
-            vitals=record["vitals"]
+            vitals=record["vitals"],
+            vital_signs=record.get("vital_signs")
         )
         for record in history
     ]
@@ -1,10 +1,28 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from app.models.vitals import VitalSigns, plausible_readings, vital_readings
+
 class TriageRequest(BaseModel):
     symptoms: Dict[str, Any] = Field(..., description="Patient symptoms data")
     vitals: Dict[str, Any] = Field(..., description="Patient vital signs")
+    vital_signs: Optional[VitalSigns] = Field(None, description="Typed vitals; parsed from vitals when omitted")
+    
+    @model_validator(mode="before")
+    @classmethod
+    def parse_vital_signs(cls, data: Any) -> Any:
+        # Parse the free-form vitals once at ingestion; explicitly typed values take precedence.
+        # Unparseable or impossible readings are dropped, never refused: the raw vitals are kept
+        if isinstance(data, dict) and isinstance(data.get("vitals"), dict):
+            typed = data.get("vital_signs") or {}
+            if isinstance(typed, VitalSigns):
+                typed = typed.model_dump(exclude_none=True)
+            if not isinstance(typed, dict):
+                typed = {}
+            vital_signs, _ = plausible_readings({**vital_readings(data["vitals"]), **typed})
+            data = {**data, "vital_signs": vital_signs}
+        return data
 
 class TriageResponse(BaseModel):
     id: str
@@ -14,6 +32,7 @@ class TriageResponse(BaseModel):
     recommendations: str
     primary_concerns: Optional[List[str]] = None
     reasoning: Optional[str] = None
+    assessment_source: str = "ai"
     status: str
     created_at: datetime
     
@@ -29,6 +48,7 @@ class TriageHistoryResponse(BaseModel):
     created_at: datetime
     symptoms: Dict[str, Any]
     vitals: Dict[str, Any]
+    vital_signs: Optional[VitalSigns] = None
     
     class Config:
         from_attributes = True
@@ -1,15 +1,45 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from fastapi import HTTPException, status
-from typing import List
+from typing import List, Optional
 
+from app.core.config import settings
+from app.core.facility import user_facility
+from app.core.tracing import tracer
 from app.modules.triage.repository import triage_repository
 from app.modules.triage.schema import TriageRequest
+from app.services.ai_usage import ai_usage
 from app.services.gemini_ai_service import gemini_service
+from app.services.local_triage_model import local_triage_model
+from app.services.outbox import outbox_event, outbox_relay, TRIAGE_ASSESSED
+from app.services.patient_summary import render_summary
 
 class TriageService:
     @staticmethod
-    async def analyze_patient(db: AsyncIOMotorDatabase, current_user: dict, triage_data: TriageRequest) -> dict:
+    async def get_patient_profile(db: AsyncIOMotorDatabase, current_user: dict) -> Optional[dict]:
+        profile = current_user.get("patient_profile")
+        if profile:
+            return profile
+        
+        # Users created before profiles were embedded; backfill with migrate-patient-profiles.py
         patient = await triage_repository.get_patient_by_user_id(db, str(current_user["_id"]))
+        if not patient:
+            return None
+        return {
+            "patient_id": patient["_id"],
+            "age": patient.get("age"),
+            "gender": patient.get("gender"),
+            "medical_history": patient.get("medical_history")
+        }
+    
+    @staticmethod
+    async def analyze_patient(
+        db: AsyncIOMotorDatabase,
+        current_user: dict,
+        triage_data: TriageRequest,
+        ip_address: Optional[str] = None
+    ) -> dict:
+        with tracer.span("triage.get_patient_profile"):
+            patient = await TriageService.get_patient_profile(db, current_user)
         
         if not patient:
             raise HTTPException(
@@ -17,27 +47,85 @@ class TriageService:
                 detail="Patient profile not found"
             )
         
-        ai_response = await gemini_service.analyze_patient(
-            symptoms=triage_data.symptoms,
-            vitals=triage_data.vitals,
-            medical_history=patient.get("medical_history")
-        )
+        facility_id = user_facility(current_user)
+        vital_signs = triage_data.vital_signs.model_dump(exclude_none=True) if triage_data.vital_signs else {}
+        provisional_record = None
+        if settings.LOCAL_MODEL_PROVISIONAL:
+            provisional = local_triage_model.predict(triage_data.symptoms, triage_data.vitals, patient.get("medical_history"))
+            if provisional is not None:
+                # Queue the case now with the local score; the AI assessment replaces it below
+                with tracer.span("triage.create_provisional_record"):
+                    provisional_record = await triage_repository.create_triage_record(
+                        db=db,
+                        facility_id=facility_id,
+                        patient_id=str(patient["patient_id"]),
+                        symptoms=triage_data.symptoms,
+                        vitals=triage_data.vitals,
+                        vital_signs=vital_signs,
+                        risk_level=provisional["risk_level"],
+                        ai_confidence=provisional["ai_confidence"],
+                        priority_score=provisional["priority_score"],
+                        recommendations=provisional["recommendations"],
+                        assessment_source="provisional"
+                    )
         
-        triage_record = await triage_repository.create_triage_record(
-            db=db,
-            patient_id=str(patient["_id"]),
-            symptoms=triage_data.symptoms,
-            vitals=triage_data.vitals,
-            risk_level=ai_response["risk_level"],
-            ai_confidence=ai_response["ai_confidence"],
-            priority_score=ai_response["priority_score"],
-            recommendations=ai_response["recommendations"]
-        )
+        summary = patient.get("triage_summary") if settings.PATIENT_SUMMARY_ENABLED else None
+        with ai_usage.scope() as usage:
+            ai_response = await gemini_service.analyze_patient(
+                symptoms=triage_data.symptoms,
+                vitals=triage_data.vitals,
+                medical_history=patient.get("medical_history"),
+                patient_context=render_summary(summary)
+            )
+        # Per-assessment token and cost share, for attributing AI spend to patients
+        record_usage = usage.to_dict() if usage.calls else None
+        # Audit entry and patient summary update are applied by the outbox relay, off the request path
+        event = outbox_event(TRIAGE_ASSESSED, {
+            "user_id": str(current_user["_id"]),
+            "ip_address": ip_address,
+            "risk_level": ai_response["risk_level"],
+            "priority_score": ai_response["priority_score"]
+        })
+        
+        if provisional_record is not None:
+            with tracer.span("triage.update_assessment"):
+                triage_record = await triage_repository.update_assessment(
+                    db=db,
+                    facility_id=facility_id,
+                    triage_id=provisional_record["_id"],
+                    risk_level=ai_response["risk_level"],
+                    ai_confidence=ai_response["ai_confidence"],
+                    priority_score=ai_response["priority_score"],
+                    recommendations=ai_response["recommendations"],
+                    assessment_source=ai_response.get("assessment_source", "ai"),
+                    outbox_event=event,
+                    ai_usage=record_usage
+                )
+            outbox_relay.notify()
+            return triage_record or provisional_record
+        
+        with tracer.span("triage.create_record"):
+            triage_record = await triage_repository.create_triage_record(
+                db=db,
+                facility_id=facility_id,
+                patient_id=str(patient["patient_id"]),
+                symptoms=triage_data.symptoms,
+                vitals=triage_data.vitals,
+                vital_signs=vital_signs,
+                risk_level=ai_response["risk_level"],
+                ai_confidence=ai_response["ai_confidence"],
+                priority_score=ai_response["priority_score"],
+                recommendations=ai_response["recommendations"],
+                assessment_source=ai_response.get("assessment_source", "ai"),
+                outbox_event=event,
+                ai_usage=record_usage
+            )
         
+        outbox_relay.notify()
         return triage_record
     
     @staticmethod
-    async def get_patient_history(db: AsyncIOMotorDatabase, patient_id: str) -> List[dict]:
-        return await triage_repository.get_triage_history(db, patient_id)
+    async def get_patient_history(db: AsyncIOMotorDatabase, facility_id: str, patient_id: str) -> List[dict]:
+        return await triage_repository.get_triage_history(db, facility_id, patient_id)
 
 triage_service = TriageService()
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Optional
+
+from app.models.vitals import vital_readings
+from app.services.local_triage_model import local_triage_model
+
+# Presentations that must never wait behind routine work, whatever a model says
+RED_FLAG_KEYWORDS = (
+    "chest pain", "chest_pain", "crushing", "shortness of breath", "shortness_of_breath", "can't breathe",
+    "cannot breathe", "not breathing", "unconscious", "unresponsive", "seizure", "stroke", "slurred",
+    "severe bleeding", "anaphyla", "overdose", "suicid",
+)
+
+def vital_red_flag(readings: Dict[str, float]) -> bool:
+    return (
+        readings.get("oxygen_saturation", 100) < 92
+        or not 90 <= readings.get("systolic", 120) < 180
+        or not 40 <= readings.get("heart_rate", 80) <= 130
+        or readings.get("respiratory_rate", 16) > 30
+        or readings.get("temperature", 37) >= 40
+    )
+
+def estimate_acuity(
+    symptoms: Dict[str, Any],
+    vitals: Dict[str, Any],
+    vital_signs: Optional[Dict[str, Any]] = None,
+    medical_history: Optional[str] = None
+) -> Optional[str]:
+    """Cheap pre-assessment risk level used to order work before the AI has seen the case.
+
+    Red-flag keywords or vitals give "critical"; otherwise the local model's
+    risk level when one is loaded, else None (unknown).
+    """
+    readings = vital_readings(vitals)
+    readings.update({
+        name: value for name, value in (vital_signs or {}).items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    })
+    text = " ".join(
+        [key.lower() for key, value in symptoms.items() if value is True]
+        + [value.lower() for value in symptoms.values() if isinstance(value, str)]
+    )
+    if vital_red_flag(readings) or any(keyword in text for keyword in RED_FLAG_KEYWORDS):
+        return "critical"
+    prediction = local_triage_model.predict(symptoms, vitals, medical_history)
+    return prediction["risk_level"] if prediction else None
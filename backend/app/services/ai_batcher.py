@@ -0,0 +1,149 @@
+import asyncio
+import time
+import logging
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List
+
+from app.services.ai_usage import ai_usage, UsageScope
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingAssessment:
+    symptoms: Dict[str, Any]
+    vitals: Dict[str, Any]
+    medical_history: Optional[str]
+    patient_context: Optional[str]
+    future: asyncio.Future
+    enqueued_at: float
+    usage: Optional[UsageScope] = None
+
+
+class AIMicroBatcher:
+    """Coalesces concurrent assessments into single multi-patient model requests.
+
+    Requests are collected for up to ``window_ms`` (or until ``max_size`` are
+    waiting), sent as one structured prompt, and the per-case results are
+    routed back to each waiter. Cases missing from, or invalid in, the batched
+    response are retried individually.
+    """
+
+    def __init__(self, ai_service, window_ms: int, max_size: int):
+        self.ai_service = ai_service
+        self.window = window_ms / 1000
+        self.max_size = max(1, max_size)
+        self._pending: List[_PendingAssessment] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        self.batches_sent = 0
+        self.items_batched = 0
+        self.max_batch_size = 0
+        self.total_queue_delay = 0.0
+        self.max_queue_delay = 0.0
+        self.single_fallbacks = 0
+
+    async def submit(
+        self,
+        symptoms: Dict[str, Any],
+        vitals: Dict[str, Any],
+        medical_history: Optional[str] = None,
+        patient_context: Optional[str] = None
+    ) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        item = _PendingAssessment(
+            symptoms, vitals, medical_history, patient_context, loop.create_future(), time.perf_counter(),
+            ai_usage.current()
+        )
+        self._pending.append(item)
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        return await item.future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[_PendingAssessment]):
+        dispatched_at = time.perf_counter()
+        for item in batch:
+            delay = dispatched_at - item.enqueued_at
+            self.total_queue_delay += delay
+            self.max_queue_delay = max(self.max_queue_delay, delay)
+        self.batches_sent += 1
+        self.items_batched += len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+
+        # Waiters whose request was cancelled no longer need a result
+        live = [item for item in batch if not item.future.done()]
+        if not live:
+            return
+
+        results: Dict[int, Dict[str, Any]] = {}
+        if len(live) > 1:
+            # The task inherited one submitter's usage scope; the batch call is shared by every case instead
+            with ai_usage.scope() as batch_usage:
+                try:
+                    results = await self.ai_service._analyze_batch([
+                        {
+                            "symptoms": item.symptoms, "vitals": item.vitals,
+                            "medical_history": item.medical_history, "patient_context": item.patient_context
+                        }
+                        for item in live
+                    ])
+                except Exception as e:
+                    logger.error(f"Batched AI request failed for {len(live)} cases: {str(e)}")
+            for item in live:
+                if item.usage is not None:
+                    item.usage.merge(batch_usage, 1 / len(live))
+
+        missing = [i for i in range(len(live)) if i not in results]
+        if missing and len(live) > 1:
+            self.single_fallbacks += len(missing)
+            logger.warning(f"Falling back to single AI calls for {len(missing)}/{len(live)} batched cases")
+
+        singles = await asyncio.gather(*[self._analyze_single(live[i]) for i in missing], return_exceptions=True)
+        for i, result in zip(missing, singles):
+            results[i] = result
+
+        for i, item in enumerate(live):
+            if item.future.done():
+                continue
+            result = results[i]
+            if isinstance(result, BaseException):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+
+    async def _analyze_single(self, item: _PendingAssessment) -> Dict[str, Any]:
+        with ai_usage.attach(item.usage):
+            return await self.ai_service._analyze_single(
+                self.ai_service._build_medical_prompt(item.symptoms, item.vitals, item.medical_history, item.patient_context)
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "batches_sent": self.batches_sent,
+            "items_batched": self.items_batched,
+            "avg_batch_size": (self.items_batched / self.batches_sent) if self.batches_sent else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_queue_delay_ms": (self.total_queue_delay / self.items_batched * 1000) if self.items_batched else 0.0,
+            "max_queue_delay_ms": self.max_queue_delay * 1000,
+            "single_fallbacks": self.single_fallbacks,
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size
+        }
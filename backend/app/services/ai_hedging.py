@@ -0,0 +1,101 @@
+import asyncio
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Callable, Awaitable, Deque, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RequestHedger:
+    """Issues a second, identical request when the first one runs past a latency percentile.
+
+    The hedge delay is the ``percentile`` of recently observed latencies for the
+    same model (never below ``min_delay_ms``). Whichever request finishes first
+    wins and the other is cancelled. Hedges are capped at ``budget_percent`` of
+    primary requests so hedging can never add more than that much extra load.
+    """
+
+    MIN_SAMPLES = 20
+    WINDOW_SIZE = 200
+
+    def __init__(self, percentile: float, min_delay_ms: int, budget_percent: float):
+        self.percentile = percentile
+        self.min_delay = min_delay_ms / 1000
+        self.budget_ratio = budget_percent / 100
+        self._latencies: Dict[str, Deque[float]] = {}
+
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.hedges_denied = 0
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        samples = self._latencies.get(key)
+        if not samples or len(samples) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    def _observe(self, key: str, seconds: float):
+        if key not in self._latencies:
+            self._latencies[key] = deque(maxlen=self.WINDOW_SIZE)
+        self._latencies[key].append(seconds)
+
+    def _budget_allows(self) -> bool:
+        return self.hedges_sent + 1 <= self.requests * self.budget_ratio
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        self.requests += 1
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(call())
+        hedge = None
+
+        try:
+            delay = self.hedge_delay(key)
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done:
+                    if self._budget_allows():
+                        self.hedges_sent += 1
+                        logger.info(f"Hedging AI request to {key} after {delay * 1000:.0f}ms")
+                        hedge_started = time.perf_counter()
+                        hedge = asyncio.ensure_future(call())
+                    else:
+                        self.hedges_denied += 1
+
+            pending = {primary} if hedge is None else {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                            self._observe(key, time.perf_counter() - hedge_started)
+                        else:
+                            self._observe(key, time.perf_counter() - started)
+                        return task.result()
+
+            # Every attempt failed; surface the primary request's error
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedges_sent": self.hedges_sent,
+            "hedge_rate": (self.hedges_sent / self.requests) if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "hedges_denied_by_budget": self.hedges_denied,
+            "budget_percent": self.budget_ratio * 100,
+            "hedge_delay_ms": {
+                key: (delay * 1000 if delay is not None else None)
+                for key, delay in ((key, self.hedge_delay(key)) for key in self._latencies)
+            }
+        }
@@ -0,0 +1,73 @@
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRouter:
+    """Decides when a fast-tier assessment must be escalated to the strong model.
+
+    A fast-tier result is accepted only when its ``ai_confidence`` reaches
+    ``min_confidence`` and its ``risk_level`` is not one of ``escalate_risk_levels``.
+    """
+
+    def __init__(self, fast_model: str, strong_model: str, min_confidence: float, escalate_risk_levels: List[str]):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.min_confidence = min_confidence
+        self.escalate_risk_levels = set(escalate_risk_levels)
+
+        self.assessments = 0
+        self.escalations = 0
+        self.budget_skips = 0
+        self.fallbacks = 0
+        self.escalation_reasons: Dict[str, int] = {"low_confidence": 0, "high_risk": 0}
+        self.tier_calls: Dict[str, int] = {"fast": 0, "strong": 0}
+        self.tier_latency_total: Dict[str, float] = {"fast": 0.0, "strong": 0.0}
+        self.tier_latency_max: Dict[str, float] = {"fast": 0.0, "strong": 0.0}
+
+    def escalation_reason(self, result: Dict[str, Any]) -> Optional[str]:
+        if result.get("ai_confidence", 0.0) < self.min_confidence:
+            return "low_confidence"
+        if result.get("risk_level") in self.escalate_risk_levels:
+            return "high_risk"
+        return None
+
+    def record_assessment(self, escalation_reason: Optional[str]):
+        self.assessments += 1
+        if escalation_reason:
+            self.escalations += 1
+            self.escalation_reasons[escalation_reason] += 1
+
+    def record_budget_skip(self):
+        self.budget_skips += 1
+
+    def record_fallback(self):
+        self.fallbacks += 1
+
+    def record_latency(self, tier: str, seconds: float):
+        self.tier_calls[tier] += 1
+        self.tier_latency_total[tier] += seconds
+        self.tier_latency_max[tier] = max(self.tier_latency_max[tier], seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "fast_model": self.fast_model,
+            "strong_model": self.strong_model,
+            "min_confidence": self.min_confidence,
+            "escalate_risk_levels": sorted(self.escalate_risk_levels),
+            "assessments": self.assessments,
+            "escalations": self.escalations,
+            "escalation_rate": (self.escalations / self.assessments) if self.assessments else 0.0,
+            "escalation_reasons": dict(self.escalation_reasons),
+            "escalations_skipped_for_budget": self.budget_skips,
+            "fast_tier_fallbacks": self.fallbacks,
+            "tiers": {
+                tier: {
+                    "calls": self.tier_calls[tier],
+                    "avg_latency_ms": (self.tier_latency_total[tier] / self.tier_calls[tier] * 1000) if self.tier_calls[tier] else 0.0,
+                    "max_latency_ms": self.tier_latency_max[tier] * 1000
+                }
+                for tier in ("fast", "strong")
+            }
+        }
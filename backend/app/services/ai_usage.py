@@ -0,0 +1,323 @@
+import asyncio
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.services.quantile_sketch import TDigest
+
+logger = logging.getLogger(__name__)
+
+USAGE_COLLECTION = "ai_usage"
+COUNTERS = ("calls", "retries", "errors", "cancelled", "invalid", "input_tokens", "output_tokens", "latency_ms")
+
+NORMAL, ECONOMY, EXHAUSTED = "normal", "economy", "exhausted"
+
+class UsageScope:
+    """Usage of the AI calls made for one assessment; batch calls are shared equally among their cases."""
+
+    def __init__(self):
+        self.calls = 0.0
+        self.input_tokens = 0.0
+        self.output_tokens = 0.0
+        self.cost = 0.0
+        self.latency_ms = 0.0
+
+    def add(self, input_tokens: int, output_tokens: int, cost: float, latency_ms: float, share: float = 1.0):
+        self.calls += share
+        self.input_tokens += input_tokens * share
+        self.output_tokens += output_tokens * share
+        self.cost += cost * share
+        self.latency_ms += latency_ms
+
+    def merge(self, other: "UsageScope", share: float):
+        self.calls += other.calls * share
+        self.input_tokens += other.input_tokens * share
+        self.output_tokens += other.output_tokens * share
+        self.cost += other.cost * share
+        self.latency_ms += other.latency_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": round(self.calls, 2),
+            "input_tokens": round(self.input_tokens),
+            "output_tokens": round(self.output_tokens),
+            "cost": round(self.cost, 6),
+            "latency_ms": round(self.latency_ms, 1)
+        }
+
+_current_scope: ContextVar[Optional[UsageScope]] = ContextVar("ai_usage_scope", default=None)
+
+class AIUsageTracker:
+    """Per-call Gemini token, latency and cost accounting with spend budgets.
+
+    Calls are aggregated in memory into per-minute buckets keyed by model
+    and purpose (single, escalation, batch) and flushed to ``ai_usage`` in
+    one bulk upsert every ``flush_seconds``; buckets from every worker merge
+    through ``$inc``. After each flush the rolling hourly and daily spend of
+    all workers is read back and compared with the budgets: above
+    ``economy_percent`` of a budget the service stops escalating and
+    hedging, and at 100% new assessments use the fallback path instead of
+    Gemini until spend drops back.
+    """
+
+    def __init__(
+        self,
+        prices: Dict[str, List[float]],
+        default_price: List[float],
+        hourly_budget: float,
+        daily_budget: float,
+        economy_percent: float,
+        flush_seconds: int
+    ):
+        self.prices = prices
+        self.default_price = default_price
+        self.hourly_budget = hourly_budget
+        self.daily_budget = daily_budget
+        self.economy_ratio = economy_percent / 100
+        self.flush_seconds = flush_seconds
+        # (minute, model, purpose) -> counters and cost not yet written to Mongo
+        self._buckets: Dict[Tuple[datetime, str, str], Counter] = {}
+        self._latency_max: Dict[Tuple[datetime, str, str], float] = {}
+        self._digests: Dict[str, TDigest] = {}
+        self._unflushed_cost = 0.0
+        self._flushed_spend = {"hour": 0.0, "day": 0.0}
+        self._mode = NORMAL
+        self._totals = Counter()
+        self.flushes = 0
+        self.flush_failures = 0
+
+    def cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        input_price, output_price = self.prices.get(model, self.default_price)
+        return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    @contextmanager
+    def scope(self):
+        """Collect the usage of every AI call made inside the block (including hedges and batch shares)."""
+        usage = UsageScope()
+        token = _current_scope.set(usage)
+        try:
+            yield usage
+        finally:
+            _current_scope.reset(token)
+
+    @contextmanager
+    def attach(self, usage: Optional[UsageScope]):
+        """Attribute calls inside the block to an existing scope (or to none)."""
+        token = _current_scope.set(usage)
+        try:
+            yield usage
+        finally:
+            _current_scope.reset(token)
+
+    def current(self) -> Optional[UsageScope]:
+        return _current_scope.get()
+
+    def record(
+        self,
+        model: str,
+        purpose: str,
+        attempt: int,
+        outcome: str,
+        latency: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0
+    ):
+        """Record one generate_content call; outcome is "ok", "error" or "cancelled" (a losing hedge)."""
+        key = (datetime.utcnow().replace(second=0, microsecond=0), model, purpose)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = Counter()
+        latency_ms = latency * 1000
+        cost = self.cost(model, input_tokens, output_tokens)
+        bucket["calls"] += 1
+        bucket["retries"] += attempt > 1
+        bucket["errors"] += outcome == "error"
+        bucket["cancelled"] += outcome == "cancelled"
+        bucket["input_tokens"] += input_tokens
+        bucket["output_tokens"] += output_tokens
+        bucket["latency_ms"] += latency_ms
+        bucket["cost"] += cost
+        self._latency_max[key] = max(self._latency_max.get(key, 0.0), latency_ms)
+        self._unflushed_cost += cost
+        self._totals.update({"calls": 1, "input_tokens": input_tokens, "output_tokens": output_tokens})
+        self._totals["cost"] += cost
+        if outcome == "ok":
+            if model not in self._digests:
+                self._digests[model] = TDigest()
+            self._digests[model].add(latency_ms)
+
+        usage = _current_scope.get()
+        if usage is not None:
+            usage.add(input_tokens, output_tokens, cost, latency_ms)
+        self._update_mode()
+
+    def record_invalid(self, model: str, purpose: str):
+        """A call succeeded but its response could not be parsed or validated."""
+        key = (datetime.utcnow().replace(second=0, microsecond=0), model, purpose)
+        self._buckets.setdefault(key, Counter())["invalid"] += 1
+
+    def _spend_ratio(self) -> float:
+        ratios = [0.0]
+        if self.hourly_budget > 0:
+            ratios.append((self._flushed_spend["hour"] + self._unflushed_cost) / self.hourly_budget)
+        if self.daily_budget > 0:
+            ratios.append((self._flushed_spend["day"] + self._unflushed_cost) / self.daily_budget)
+        return max(ratios)
+
+    def _update_mode(self):
+        ratio = self._spend_ratio()
+        mode = EXHAUSTED if ratio >= 1 else ECONOMY if ratio >= self.economy_ratio else NORMAL
+        if mode != self._mode:
+            logger.warning(f"AI budget mode changed from {self._mode} to {mode} ({ratio:.0%} of budget spent)")
+            self._mode = mode
+
+    def budget_mode(self) -> str:
+        return self._mode
+
+    async def flush(self, db: AsyncIOMotorDatabase):
+        buckets, self._buckets = self._buckets, {}
+        latency_max, self._latency_max = self._latency_max, {}
+        unflushed_cost, self._unflushed_cost = self._unflushed_cost, 0.0
+        if buckets:
+            operations = [
+                UpdateOne(
+                    {"minute": minute, "model": model, "purpose": purpose},
+                    {
+                        "$inc": {field: value for field, value in counters.items() if value},
+                        "$max": {"latency_ms_max": latency_max.get((minute, model, purpose), 0.0)}
+                    },
+                    upsert=True
+                )
+                for (minute, model, purpose), counters in buckets.items()
+            ]
+            try:
+                await db[USAGE_COLLECTION].bulk_write(operations, ordered=False)
+            except Exception:
+                # Keep the counts for the next flush
+                for key, counters in buckets.items():
+                    self._buckets.setdefault(key, Counter()).update(counters)
+                    self._latency_max[key] = max(self._latency_max.get(key, 0.0), latency_max.get(key, 0.0))
+                self._unflushed_cost += unflushed_cost
+                self.flush_failures += 1
+                raise
+            self.flushes += 1
+        await self._refresh_spend(db)
+
+    async def _refresh_spend(self, db: AsyncIOMotorDatabase):
+        """Read back the rolling spend of all workers (calls flushed so far)."""
+        now = datetime.utcnow()
+        hour_ago = now - timedelta(hours=1)
+        cursor = db[USAGE_COLLECTION].aggregate([
+            {"$match": {"minute": {"$gte": now - timedelta(days=1)}}},
+            {"$group": {
+                "_id": None,
+                "day": {"$sum": "$cost"},
+                "hour": {"$sum": {"$cond": [{"$gte": ["$minute", hour_ago]}, "$cost", 0]}}
+            }}
+        ])
+        result = await cursor.to_list(length=1)
+        self._flushed_spend = {"hour": result[0]["hour"], "day": result[0]["day"]} if result else {"hour": 0.0, "day": 0.0}
+        self._update_mode()
+
+    async def run(self, db: AsyncIOMotorDatabase):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"AI usage flush failed: {str(e)}")
+
+    @staticmethod
+    async def summarize(db: AsyncIOMotorDatabase, since: datetime, bucket_minutes: int) -> Dict[str, Any]:
+        """Flushed usage since ``since``: totals, per model/purpose, and a time series."""
+        sums = {field: {"$sum": f"${field}"} for field in (*COUNTERS, "cost")}
+
+        def shape(row: dict) -> dict:
+            calls = row.get("calls") or 0
+            summary = {field: row.get(field, 0) for field in COUNTERS if field != "latency_ms"}
+            summary["cost"] = round(row.get("cost", 0.0), 6)
+            summary["avg_latency_ms"] = round(row["latency_ms"] / calls, 1) if calls else None
+            if "latency_ms_max" in row:
+                summary["max_latency_ms"] = round(row["latency_ms_max"], 1)
+            return summary
+
+        pipeline = [
+            {"$match": {"minute": {"$gte": since}}},
+            {"$facet": {
+                "total": [{"$group": {"_id": None, **sums, "latency_ms_max": {"$max": "$latency_ms_max"}}}],
+                "by_model": [{"$group": {"_id": {"model": "$model", "purpose": "$purpose"}, **sums,
+                                         "latency_ms_max": {"$max": "$latency_ms_max"}}},
+                             {"$sort": {"cost": -1, "calls": -1}}],
+                "series": [{"$group": {
+                    "_id": {"$dateTrunc": {"date": "$minute", "unit": "minute", "binSize": bucket_minutes}}, **sums
+                }}, {"$sort": {"_id": 1}}]
+            }}
+        ]
+        result = (await db[USAGE_COLLECTION].aggregate(pipeline).to_list(length=1))[0]
+        return {
+            "total": shape(result["total"][0]) if result["total"] else shape({}),
+            "by_model": [{**row["_id"], **shape(row)} for row in result["by_model"]],
+            "series": [{"start": row["_id"], **shape(row)} for row in result["series"]]
+        }
+
+    @staticmethod
+    async def top_patients(db: AsyncIOMotorDatabase, since: datetime, limit: int = 10) -> List[dict]:
+        """Patients whose assessments cost the most since ``since`` (from per-record ai_usage)."""
+        cursor = db.triage_records.aggregate([
+            {"$match": {"created_at": {"$gte": since}, "ai_usage.cost": {"$gt": 0}}},
+            {"$group": {
+                "_id": "$patient_id",
+                "assessments": {"$sum": 1},
+                "calls": {"$sum": "$ai_usage.calls"},
+                "input_tokens": {"$sum": "$ai_usage.input_tokens"},
+                "output_tokens": {"$sum": "$ai_usage.output_tokens"},
+                "cost": {"$sum": "$ai_usage.cost"}
+            }},
+            {"$sort": {"cost": -1}},
+            {"$limit": limit}
+        ])
+        return [
+            {"patient_id": str(row.pop("_id")), **row, "cost": round(row["cost"], 6)}
+            for row in await cursor.to_list(length=limit)
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "budget_mode": self._mode,
+            "hourly_budget": self.hourly_budget or None,
+            "daily_budget": self.daily_budget or None,
+            "spend": {
+                "hour": round(self._flushed_spend["hour"] + self._unflushed_cost, 6),
+                "day": round(self._flushed_spend["day"] + self._unflushed_cost, 6)
+            },
+            "worker_totals": {
+                "calls": self._totals["calls"],
+                "input_tokens": self._totals["input_tokens"],
+                "output_tokens": self._totals["output_tokens"],
+                "cost": round(self._totals["cost"], 6)
+            },
+            "latency_ms": {
+                model: {"p50": round(digest.quantile(0.5), 1), "p95": round(digest.quantile(0.95), 1)}
+                for model, digest in self._digests.items() if digest.count
+            },
+            "unflushed_buckets": len(self._buckets),
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures
+        }
+
+ai_usage = AIUsageTracker(
+    prices=settings.AI_MODEL_PRICES,
+    default_price=settings.AI_DEFAULT_PRICE_PER_MTOK,
+    hourly_budget=settings.AI_BUDGET_HOURLY_USD,
+    daily_budget=settings.AI_BUDGET_DAILY_USD,
+    economy_percent=settings.AI_BUDGET_ECONOMY_PERCENT,
+    flush_seconds=settings.AI_USAGE_FLUSH_SECONDS
+)
@@ -1,12 +1,105 @@
 import logging
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import Optional
+from pymongo.errors import CollectionInvalid
+from typing import Optional, List
 from datetime import datetime
 from bson import ObjectId
 
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.models.audit_log import encode_action, decode_action
+
 logger = logging.getLogger(__name__)
 
+AUDIT_COLLECTION = "audit_logs"
+
 class AuditService:
+    @staticmethod
+    async def ensure_storage(db: AsyncIOMotorDatabase):
+        """Create audit_logs as a time-series collection, bucketed per user, with automatic expiry."""
+        cursor = await db.list_collections(filter={"name": AUDIT_COLLECTION})
+        existing = await cursor.to_list(length=1)
+
+        if existing:
+            if existing[0].get("type") != "timeseries":
+                logger.warning(f"'{AUDIT_COLLECTION}' is not a time-series collection; run migrate-audit-logs.py")
+            return
+
+        try:
+            await db.create_collection(
+                AUDIT_COLLECTION,
+                timeseries={"timeField": "timestamp", "metaField": "meta", "granularity": "minutes"},
+                expireAfterSeconds=settings.AUDIT_RETENTION_DAYS * 86400
+            )
+            await db[AUDIT_COLLECTION].create_index([("meta.user_id", 1), ("timestamp", -1)])
+            logger.info(f"Created time-series collection '{AUDIT_COLLECTION}'")
+        except CollectionInvalid:
+            # Another worker created it first
+            pass
+
+    @staticmethod
+    def to_document(
+        user_id: Optional[str],
+        action: str,
+        details: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        timestamp: Optional[datetime] = None
+    ) -> dict:
+        return {
+            "timestamp": timestamp or datetime.utcnow(),
+            "meta": {"user_id": ObjectId(user_id) if user_id else None},
+            "action": encode_action(action),
+            "details": details,
+            "ip_address": ip_address
+        }
+
+    @staticmethod
+    def from_document(document: dict) -> dict:
+        """Decode a stored audit document to the public shape (string ids, action names)."""
+        user_id = (document.get("meta") or {}).get("user_id", document.get("user_id"))
+        return {
+            "_id": str(document["_id"]) if "_id" in document else None,
+            "user_id": str(user_id) if user_id else None,
+            "action": decode_action(document.get("action")),
+            "details": document.get("details"),
+            "ip_address": document.get("ip_address"),
+            "timestamp": document.get("timestamp")
+        }
+
+    @staticmethod
+    def build_query(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user_id: Optional[str] = None,
+        action: Optional[str] = None
+    ) -> dict:
+        query = {}
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = start
+            if end:
+                query["timestamp"]["$lt"] = end
+        if user_id:
+            query["meta.user_id"] = ObjectId(user_id)
+        if action:
+            query["action"] = encode_action(action)
+        return query
+
+    @staticmethod
+    async def query_logs(
+        db: AsyncIOMotorDatabase,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        user_id: Optional[str] = None,
+        action: Optional[str] = None,
+        limit: int = 100
+    ) -> List[dict]:
+        # Time-range and per-user filters prune whole buckets before any document is unpacked
+        query = AuditService.build_query(start, end, user_id, action)
+        cursor = db[AUDIT_COLLECTION].find(query).sort("timestamp", -1).limit(limit)
+        return [AuditService.from_document(document) for document in await cursor.to_list(length=limit)]
+
     @staticmethod
     async def log_action(
         db: AsyncIOMotorDatabase,
@@ -16,14 +109,9 @@ class AuditService:
         ip_address: Optional[str] = None
     ):
         try:
-            audit_log = {
-                "user_id": ObjectId(user_id) if user_id else None,
-                "action": action,
-                "details": details,
-                "ip_address": ip_address,
-                "timestamp": datetime.utcnow()
-            }
-            await db.audit_logs.insert_one(audit_log)
+            audit_log = AuditService.to_document(user_id, action, details, ip_address)
+            with tracer.span("audit.log_action", {"audit.action": action}):
+                await db[AUDIT_COLLECTION].insert_one(audit_log)
             logger.info(f"Audit log created: {action} by user {user_id}")
         except Exception as e:
             logger.error(f"Failed to create audit log: {str(e)}")
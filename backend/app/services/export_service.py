@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+logger = logging.getLogger(__name__)
+
+# Flush accumulated rows to the client once a chunk reaches this size
+CHUNK_SIZE_BYTES = 64 * 1024
+
+def _to_plain(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_plain(v) for v in value]
+    return value
+
+class ExportService:
+    @staticmethod
+    def build_query(
+        time_field: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[str] = None,
+        after_time: Optional[datetime] = None
+    ) -> dict:
+        query: Dict[str, Any] = {}
+        if after_time and (not start or after_time > start):
+            # Keeps the time-range bound on the index / bucket bounds; the exact cursor is below
+            start = after_time
+        if start or end:
+            query[time_field] = {}
+            if start:
+                query[time_field]["$gte"] = start
+            if end:
+                query[time_field]["$lt"] = end
+        # Resuming: exports are ordered by _id, so continue after the last _id received
+        if after and after_time is None:
+            query["_id"] = {"$gt": ObjectId(after)}
+        # ...or by (time_field, _id), so continue strictly after the last pair received
+        elif after:
+            query["$or"] = [
+                {time_field: {"$gt": after_time}},
+                {time_field: after_time, "_id": {"$gt": ObjectId(after)}}
+            ]
+        return query
+
+    @staticmethod
+    async def stream(
+        collection: AsyncIOMotorCollection,
+        query: dict,
+        fields: List[str],
+        export_format: str,
+        batch_size: int,
+        sort_fields: Tuple[str, ...] = ("_id",),
+        projection: Optional[dict] = None,
+        transform: Optional[Callable[[dict], dict]] = None
+    ) -> AsyncIterator[str]:
+        if projection is None:
+            projection = {field: 1 for field in fields}
+        # A sort beyond the natural order (e.g. time-series by timestamp then _id) may spill to disk
+        cursor = collection.find(query, projection, allow_disk_use=len(sort_fields) > 1)
+        cursor = cursor.sort([(field, 1) for field in sort_fields]).batch_size(batch_size)
+        columns = ["_id"] + [field for field in fields if field != "_id"]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == "csv" else None
+        if writer:
+            writer.writerow(columns)
+
+        rows = 0
+        try:
+            async for document in cursor:
+                if transform:
+                    document = transform(document)
+                    document = {key: document.get(key) for key in columns}
+                document = _to_plain(document)
+                if writer:
+                    writer.writerow([
+                        json.dumps(value, separators=(",", ":")) if isinstance(value, (dict, list)) else value
+                        for value in (document.get(column) for column in columns)
+                    ])
+                else:
+                    buffer.write(json.dumps(document, separators=(",", ":")))
+                    buffer.write("\n")
+                rows += 1
+
+                if buffer.tell() >= CHUNK_SIZE_BYTES:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+            if buffer.tell():
+                yield buffer.getvalue()
+        finally:
+            await cursor.close()
+            logger.info(f"Export of {collection.name} finished after {rows} rows")
+
+export_service = ExportService()
@@ -1,38 +1,81 @@
 import json
+import time
+import asyncio
+import functools
 import logging
-from typing import Dict, Any, Optional
-from google import genai
-from google.genai import types
+from typing import Dict, Any, Optional, List
 
 from app.core.config import settings
+from app.core.tracing import tracer, SPAN_KIND_CLIENT
+from app.services.prompt_builder import prompt_builder
+from app.services.ai_batcher import AIMicroBatcher
+from app.services.ai_router import ModelRouter
+from app.services.ai_hedging import RequestHedger
+from app.services.ai_usage import ai_usage, ECONOMY, EXHAUSTED
+from app.services.similarity_cache import SimilarityCache
+from app.services.local_triage_model import local_triage_model
 
 logger = logging.getLogger(__name__)
 
 class GeminiAIService:
     def __init__(self):
-        self.client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        # The genai SDK is slow to import and build; it is loaded on first use or by warm_up()
+        self._client = None
+        self._types = None
         self.model = settings.GEMINI_MODEL
+        self.router = ModelRouter(
+            fast_model=settings.GEMINI_FAST_MODEL,
+            strong_model=settings.GEMINI_MODEL,
+            min_confidence=settings.AI_ESCALATION_MIN_CONFIDENCE,
+            escalate_risk_levels=settings.AI_ESCALATION_RISK_LEVELS
+        ) if settings.GEMINI_FAST_MODEL else None
+        # First-tier model: the fast model when routing is enabled, otherwise the only model
+        self.entry_model = settings.GEMINI_FAST_MODEL or settings.GEMINI_MODEL
         self.max_retries = 3
+        self.max_batch_output_tokens = 8192
+        # Only single-case calls are hedged; duplicating a whole batch is too expensive
+        self.hedger = RequestHedger(
+            percentile=settings.AI_HEDGE_PERCENTILE,
+            min_delay_ms=settings.AI_HEDGE_MIN_DELAY_MS,
+            budget_percent=settings.AI_HEDGE_BUDGET_PERCENT
+        ) if settings.AI_HEDGE_ENABLED else None
+        self.batcher = AIMicroBatcher(
+            self,
+            window_ms=settings.AI_BATCH_WINDOW_MS,
+            max_size=settings.AI_BATCH_MAX_SIZE
+        ) if settings.AI_BATCH_ENABLED else None
+        self.similarity_cache = SimilarityCache(
+            capacity=settings.SIMILARITY_CACHE_SIZE,
+            threshold=settings.SIMILARITY_THRESHOLD,
+            ttl_minutes=settings.SIMILARITY_CACHE_TTL_MINUTES,
+            confidence_factor=settings.SIMILARITY_CONFIDENCE_FACTOR
+        ) if settings.SIMILARITY_CACHE_ENABLED else None
     
-    def _build_medical_prompt(self, symptoms: Dict[str, Any], vitals: Dict[str, Any], medical_history: Optional[str] = None) -> str:
-        prompt = f"""You are a medical AI assistant specialized in patient triage. Analyze the following patient data and provide a structured assessment.
-
-Patient Symptoms: {json.dumps(symptoms, indent=2)}
-Vital Signs: {json.dumps(vitals, indent=2)}
-Medical History: {medical_history or "None provided"}
-
-Provide your assessment in the following JSON format ONLY (no additional text):
-{{
-  "risk_level": "critical|high|moderate|low",
-  "priority_score": <integer 1-10>,
-  "ai_confidence": <float 0.0-1.0>,
-  "primary_concerns": ["concern1", "concern2"],
-  "recommendations": "Detailed medical recommendations",
-  "reasoning": "Brief explanation of the assessment"
-}}
-
-Ensure the response is valid JSON."""
-        return prompt
+    def _load_client(self):
+        if self._client is None:
+            from google import genai
+            from google.genai import types
+            
+            self._types = types
+            self._client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        return self._client
+    
+    @property
+    def client(self):
+        return self._load_client()
+    
+    async def warm_up(self):
+        """Import and construct the Gemini client off the event loop during startup."""
+        await asyncio.to_thread(self._load_client)
+    
+    def _build_medical_prompt(
+        self,
+        symptoms: Dict[str, Any],
+        vitals: Dict[str, Any],
+        medical_history: Optional[str] = None,
+        patient_context: Optional[str] = None
+    ) -> str:
+        return prompt_builder.build(symptoms, vitals, medical_history, patient_context)
     
     def _validate_response(self, response: Dict[str, Any]) -> bool:
         required_fields = ["risk_level", "priority_score", "ai_confidence", "recommendations"]
@@ -57,44 +100,84 @@ Ensure the response is valid JSON."""
         
         return True
     
-    async def analyze_patient(
-        self,
-        symptoms: Dict[str, Any],
-        vitals: Dict[str, Any],
-        medical_history: Optional[str] = None
-    ) -> Dict[str, Any]:
-        prompt = self._build_medical_prompt(symptoms, vitals, medical_history)
+    def _parse_response_text(self, response_text: str) -> Any:
+        response_text = response_text.strip()
         
-        for attempt in range(self.max_retries):
-            try:
-                logger.info(f"Calling Gemini AI (attempt {attempt + 1}/{self.max_retries})")
-                
-                response = self.client.models.generate_content(
-                    model=self.model,
+        if response_text.startswith("```json"):
+            response_text = response_text[7:]
+        if response_text.endswith("```"):
+            response_text = response_text[:-3]
+        response_text = response_text.strip()
+        
+        return json.loads(response_text)
+    
+    async def _generate(
+        self,
+        prompt: str,
+        model: str,
+        max_output_tokens: int = 1000,
+        purpose: str = "single",
+        attempt: int = 1
+    ) -> str:
+        client = self.client
+        started = time.perf_counter()
+        usage, outcome = None, "error"
+        try:
+            with tracer.span("gemini.generate_content", {"gen_ai.request.model": model}, kind=SPAN_KIND_CLIENT) as span:
+                # Propagate trace context to the API when this request is traced
+                http_options = self._types.HttpOptions(headers={"traceparent": span.traceparent}) if span else None
+                response = await client.aio.models.generate_content(
+                    model=model,
                     contents=prompt,
-                    config=types.GenerateContentConfig(
+                    config=self._types.GenerateContentConfig(
                         temperature=0.3,
-                        max_output_tokens=1000,
+                        max_output_tokens=max_output_tokens,
+                        http_options=http_options,
                     )
                 )
+                usage, outcome = response.usage_metadata, "ok"
+                if span:
+                    span.set_attribute("gen_ai.response.characters", len(response.text or ""))
+                    if usage:
+                        span.set_attribute("gen_ai.usage.input_tokens", usage.prompt_token_count or 0)
+                        span.set_attribute("gen_ai.usage.output_tokens", usage.candidates_token_count or 0)
+                return response.text
+        except asyncio.CancelledError:
+            # The losing request of a hedged pair
+            outcome = "cancelled"
+            raise
+        finally:
+            ai_usage.record(
+                model, purpose, attempt, outcome, time.perf_counter() - started,
+                input_tokens=(usage.prompt_token_count or 0) if usage else 0,
+                # Thinking tokens are billed as output
+                output_tokens=((usage.candidates_token_count or 0) + (getattr(usage, "thoughts_token_count", None) or 0)) if usage else 0
+            )
+    
+    async def _analyze_single(self, prompt: str, model: Optional[str] = None, purpose: str = "single") -> Dict[str, Any]:
+        model = model or self.entry_model
+        
+        for attempt in range(self.max_retries):
+            try:
+                logger.info(f"Calling Gemini AI {model} (attempt {attempt + 1}/{self.max_retries})")
                 
-                response_text = response.text.strip()
-                
-                if response_text.startswith("```json"):
-                    response_text = response_text[7:]
-                if response_text.endswith("```"):
-                    response_text = response_text[:-3]
-                response_text = response_text.strip()
-                
-                parsed_response = json.loads(response_text)
+                generate = functools.partial(self._generate, prompt, model, purpose=purpose, attempt=attempt + 1)
+                # Over the economy threshold a duplicate request is not worth its cost
+                if self.hedger is not None and ai_usage.budget_mode() != ECONOMY:
+                    response_text = await self.hedger.run(model, generate)
+                else:
+                    response_text = await generate()
+                parsed_response = self._parse_response_text(response_text)
                 
                 if self._validate_response(parsed_response):
                     logger.info("Successfully received and validated AI response")
                     return parsed_response
                 else:
+                    ai_usage.record_invalid(model, purpose)
                     logger.warning(f"Invalid response format on attempt {attempt + 1}")
                     
             except json.JSONDecodeError as e:
+                ai_usage.record_invalid(model, purpose)
                 logger.error(f"JSON decode error on attempt {attempt + 1}: {str(e)}")
             except Exception as e:
                 logger.error(f"AI service error on attempt {attempt + 1}: {str(e)}")
@@ -102,6 +185,123 @@ Ensure the response is valid JSON."""
         logger.error("All retry attempts failed, returning fallback response")
         return self._get_fallback_response()
     
+    async def _analyze_batch(self, cases: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Assess several cases in one request; returns valid results keyed by case index."""
+        prompt = prompt_builder.build_batch(cases)
+        logger.info(f"Calling Gemini AI for a batch of {len(cases)} cases")
+        
+        response_text = await self._generate(
+            prompt, self.entry_model, max_output_tokens=min(1000 * len(cases), self.max_batch_output_tokens), purpose="batch"
+        )
+        parsed_response = self._parse_response_text(response_text)
+        
+        results = {}
+        if not isinstance(parsed_response, list):
+            logger.warning("Batched AI response is not a JSON array")
+            return results
+        
+        for item in parsed_response:
+            if not isinstance(item, dict):
+                continue
+            case_id = item.pop("case_id", None)
+            if isinstance(case_id, int) and 0 <= case_id < len(cases) and case_id not in results and self._validate_response(item):
+                results[case_id] = item
+        
+        return results
+    
+    async def analyze_patient(
+        self,
+        symptoms: Dict[str, Any],
+        vitals: Dict[str, Any],
+        medical_history: Optional[str] = None,
+        patient_context: Optional[str] = None
+    ) -> Dict[str, Any]:
+        # Assessments made with prior-visit context are specific to that patient's history:
+        # never answer them from the cache, nor offer them to other patients
+        use_cache = self.similarity_cache is not None and not patient_context
+        if self.similarity_cache is not None and patient_context:
+            self.similarity_cache.record_bypass()
+        if use_cache:
+            with tracer.span("ai.similarity_lookup"):
+                cached = self.similarity_cache.lookup(symptoms, vitals, medical_history)
+            if cached is not None:
+                logger.info(f"Reusing assessment of a similar presentation (similarity {cached['similarity']})")
+                return cached
+        
+        if ai_usage.budget_mode() == EXHAUSTED:
+            logger.warning("AI spend budget exhausted; skipping Gemini")
+            result = self._get_fallback_response()
+        else:
+            result = await self._assess(symptoms, vitals, medical_history, patient_context)
+        
+        if result.get("assessment_source") == "fallback":
+            # Gemini unavailable: a trained local model beats the fixed fallback
+            local = local_triage_model.predict(symptoms, vitals, medical_history)
+            if local is not None:
+                logger.warning("AI service unavailable; using local triage model assessment")
+                return local
+            return result
+        
+        if use_cache:
+            self.similarity_cache.add(symptoms, vitals, medical_history, result)
+        return result
+    
+    async def _assess(
+        self,
+        symptoms: Dict[str, Any],
+        vitals: Dict[str, Any],
+        medical_history: Optional[str] = None,
+        patient_context: Optional[str] = None
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with tracer.span("ai.entry_tier", {"gen_ai.request.model": self.entry_model}):
+            result = await self._analyze_entry_tier(symptoms, vitals, medical_history, patient_context)
+        
+        if self.router is None:
+            return result
+        
+        self.router.record_latency("fast", time.perf_counter() - started)
+        if result.get("assessment_source") == "fallback":
+            # The fast tier exhausted its retries; the strong model is on the same API
+            self.router.record_fallback()
+            return result
+        reason = self.router.escalation_reason(result)
+        if reason is not None and ai_usage.budget_mode() == ECONOMY:
+            # Near the spend budget the fast-tier answer is kept
+            self.router.record_budget_skip()
+            reason = None
+        self.router.record_assessment(reason)
+        if reason is None:
+            return result
+        
+        logger.info(f"Escalating assessment to {self.model} ({reason})")
+        started = time.perf_counter()
+        with tracer.span("ai.escalation", {"gen_ai.request.model": self.model, "ai.escalation_reason": reason}):
+            escalated = await self._analyze_single(
+                self._build_medical_prompt(symptoms, vitals, medical_history, patient_context),
+                model=self.model,
+                purpose="escalation"
+            )
+        self.router.record_latency("strong", time.perf_counter() - started)
+        
+        # Keep the fast-tier answer if the strong model could not produce one
+        if escalated["ai_confidence"] == 0.0 and result["ai_confidence"] > 0.0:
+            return result
+        return escalated
+    
+    async def _analyze_entry_tier(
+        self,
+        symptoms: Dict[str, Any],
+        vitals: Dict[str, Any],
+        medical_history: Optional[str] = None,
+        patient_context: Optional[str] = None
+    ) -> Dict[str, Any]:
+        if self.batcher is not None:
+            return await self.batcher.submit(symptoms, vitals, medical_history, patient_context)
+        
+        prompt = self._build_medical_prompt(symptoms, vitals, medical_history, patient_context)
+        return await self._analyze_single(prompt)
+    
     def _get_fallback_response(self) -> Dict[str, Any]:
         return {
             "risk_level": "moderate",
@@ -109,7 +309,8 @@ Ensure the response is valid JSON."""
             "ai_confidence": 0.0,
             "primary_concerns": ["Unable to analyze - AI service unavailable"],
             "recommendations": "Manual assessment required. AI service temporarily unavailable.",
-            "reasoning": "Fallback response due to AI service failure"
+            "reasoning": "Fallback response due to AI service failure",
+            "assessment_source": "fallback"
         }
 
 gemini_service = GeminiAIService()
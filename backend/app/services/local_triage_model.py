@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.vitals import vital_readings, VITAL_NAMES
+from app.services.similarity_cache import feature_vector
+
+logger = logging.getLogger(__name__)
+
+RISK_LEVELS = ["low", "moderate", "high", "critical"]
+
+RECOMMENDATIONS = {
+    "critical": "Provisional local assessment: immediate clinical evaluation required.",
+    "high": "Provisional local assessment: prompt clinical evaluation recommended.",
+    "moderate": "Provisional local assessment: clinical review needed; monitor vital signs.",
+    "low": "Provisional local assessment: routine review.",
+}
+
+def featurize(symptoms: Dict[str, Any], vitals: Dict[str, Any], medical_history: Optional[str] = None) -> np.ndarray:
+    """Hashed symptom/history features followed by raw vitals and their missing-value flags."""
+    readings = vital_readings(vitals)
+    vital_values = [readings.get(name, 0.0) for name in VITAL_NAMES]
+    missing = [0.0 if name in readings else 1.0 for name in VITAL_NAMES]
+    return np.concatenate([
+        feature_vector(symptoms, medical_history),
+        np.array(vital_values + missing, dtype=np.float32)
+    ])
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+class LocalTriageModel:
+    """Multinomial logistic regression for risk level plus ridge regression for priority.
+
+    Trained offline by ``train-local-model.py`` on historical triage records
+    and stored as a single ``.npz`` file. Inference is one small
+    matrix-vector product on the CPU.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+        self.priority_weights: Optional[np.ndarray] = None
+        self.priority_bias = 0.0
+        self.mean: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self.metadata: Dict[str, Any] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.weights is not None
+
+    def _standardize(self, features: np.ndarray) -> np.ndarray:
+        return (features - self.mean) / self.scale
+
+    def fit(
+        self,
+        features: np.ndarray,
+        labels: np.ndarray,
+        priorities: np.ndarray,
+        sample_weights: Optional[np.ndarray] = None,
+        l2: float = 1e-3,
+        learning_rate: float = 0.5,
+        iterations: int = 500
+    ):
+        """Full-batch gradient descent with class-balanced weights (critical cases are rare)."""
+        samples, dims = features.shape
+        self.mean = features.mean(axis=0)
+        self.scale = features.std(axis=0)
+        self.scale[self.scale < 1e-6] = 1.0
+        x = self._standardize(features)
+
+        counts = np.bincount(labels, minlength=len(RISK_LEVELS)).astype(np.float64)
+        class_weights = samples / (len(RISK_LEVELS) * np.maximum(counts, 1))
+        weights = class_weights[labels] * (sample_weights if sample_weights is not None else 1.0)
+        weights = weights / weights.sum()
+        targets = np.eye(len(RISK_LEVELS))[labels]
+
+        self.weights = np.zeros((dims, len(RISK_LEVELS)))
+        self.bias = np.zeros(len(RISK_LEVELS))
+        for _ in range(iterations):
+            error = (_softmax(x @ self.weights + self.bias) - targets) * weights[:, None]
+            self.weights -= learning_rate * (x.T @ error + l2 * self.weights)
+            self.bias -= learning_rate * error.sum(axis=0)
+
+        # Ridge regression (closed form) for the 1-10 priority score
+        gram = x.T @ x + l2 * samples * np.eye(dims)
+        self.priority_bias = float(priorities.mean())
+        self.priority_weights = np.linalg.solve(gram, x.T @ (priorities - self.priority_bias))
+
+    def predict_batch(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        x = self._standardize(features)
+        probabilities = _softmax(x @ self.weights + self.bias)
+        priorities = np.clip(np.rint(x @ self.priority_weights + self.priority_bias), 1, 10).astype(int)
+        return {"probabilities": probabilities, "priorities": priorities}
+
+    def predict(self, symptoms: Dict[str, Any], vitals: Dict[str, Any], medical_history: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if not self.ready:
+            return None
+        prediction = self.predict_batch(featurize(symptoms, vitals, medical_history)[None, :])
+        probabilities = prediction["probabilities"][0]
+        risk_level = RISK_LEVELS[int(probabilities.argmax())]
+        return {
+            "risk_level": risk_level,
+            "priority_score": int(prediction["priorities"][0]),
+            "ai_confidence": round(float(probabilities.max()), 2),
+            "recommendations": RECOMMENDATIONS[risk_level],
+            "reasoning": f"Local model {self.metadata.get('version', '')}".strip(),
+            "assessment_source": "local_model"
+        }
+
+    def save(self, metadata: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.metadata = {**metadata, "version": datetime.utcnow().strftime("%Y%m%d%H%M%S")}
+        # np.savez appends .npz unless the path already ends with it
+        np.savez(
+            self.path,
+            weights=self.weights, bias=self.bias,
+            priority_weights=self.priority_weights, priority_bias=self.priority_bias,
+            mean=self.mean, scale=self.scale,
+            metadata=json.dumps(self.metadata)
+        )
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            logger.info(f"No local triage model at {self.path}; provisional scoring disabled")
+            return False
+        with np.load(self.path) as data:
+            expected = len(feature_vector({}, None)) + 2 * len(VITAL_NAMES)
+            if data["weights"].shape[0] != expected:
+                logger.warning(f"Local triage model at {self.path} has incompatible features; retrain it")
+                return False
+            self.weights = data["weights"]
+            self.bias = data["bias"]
+            self.priority_weights = data["priority_weights"]
+            self.priority_bias = float(data["priority_bias"])
+            self.mean = data["mean"]
+            self.scale = data["scale"]
+            self.metadata = json.loads(str(data["metadata"]))
+        logger.info(f"Local triage model {self.metadata.get('version')} loaded ({self.metadata.get('samples')} training samples)")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "path": self.path, **self.metadata}
+
+local_triage_model = LocalTriageModel(settings.LOCAL_MODEL_PATH)
@@ -0,0 +1,374 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.services.audit_service import audit_service, AUDIT_COLLECTION
+from app.services.patient_summary import patient_summary_service
+
+logger = logging.getLogger(__name__)
+
+LEASE_ID = "outbox_relay"
+DEAD_LETTER_COLLECTION = "outbox_dead_letters"
+TRIAGE_ASSESSED = "triage.assessed"
+MAX_BACKOFF_SECONDS = 60
+
+# Record fields handed to subscribers with each event
+RECORD_PROJECTION = {
+    "facility_id": 1, "created_at": 1, "patient_id": 1, "symptoms": 1, "vital_signs": 1, "risk_level": 1,
+    "priority_score": 1, "assessment_source": 1, "status": 1, "outbox": 1
+}
+
+Handler = Callable[[AsyncIOMotorDatabase, List[dict]], Awaitable[None]]
+
+def outbox_event(event_type: str, payload: Dict[str, Any]) -> dict:
+    """An event to store in the ``outbox`` array of the record it describes, in the same write."""
+    return {"event_id": ObjectId(), "type": event_type, "occurred_at": datetime.utcnow(), "payload": payload, "attempts": 0}
+
+class OutboxRelay:
+    """Delivers events stored with triage records to subscribers, at least once.
+
+    Events are embedded in the record they describe (``outbox`` plus an
+    ``outbox_pending`` flag) and written by the same insert or update, so a
+    stored record always carries its events and the request path makes a
+    single write. The worker holding the Mongo lease polls flagged records
+    in batches, hands each subscriber all matching events of the batch in
+    one call, then pulls delivered events off the records.
+
+    A failing subscriber does not hold back the others: events record which
+    subscribers already have them and are retried only for the rest. Each
+    subscriber backs off on its own; while one is backed off the batches
+    skip it (and records waiting only on it), so the others keep receiving
+    new events. After ``max_attempts`` failed deliveries an event moves to
+    ``outbox_dead_letters``.
+    Consumers must tolerate redelivery (``event_id`` is stable).
+    """
+
+    def __init__(self, poll_interval_ms: int, batch_size: int, max_attempts: int, lease_seconds: int):
+        self.poll_interval = poll_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._lease_renewed = 0.0
+        self._subscribers: Dict[str, Tuple[Optional[Tuple[str, ...]], Handler]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stats = Counter()
+        self._failures = Counter()
+        # Consecutive failed batches and next allowed attempt (monotonic) per subscriber
+        self._backoff = Counter()
+        self._retry_at: Dict[str, float] = {}
+        self._last_batch_ms = 0.0
+        self._last_lag_seconds = 0.0
+
+    def subscribe(self, name: str, handler: Handler, event_types: Optional[Tuple[str, ...]] = None):
+        """Register ``handler(db, events)``; it receives every event of the given types (all if None)."""
+        self._subscribers[name] = (event_types, handler)
+
+    def notify(self):
+        # Called after a write with events; the leader relays without waiting for the next poll
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _acquire_lease(self, db: AsyncIOMotorDatabase) -> bool:
+        now = datetime.utcnow()
+        try:
+            await db.dispatcher_leases.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"owner": self.owner_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner_id, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True
+        except DuplicateKeyError:
+            # Another worker holds an unexpired lease
+            return False
+
+    async def release_lease(self, db: AsyncIOMotorDatabase):
+        if self.is_leader:
+            await db.dispatcher_leases.update_one(
+                {"_id": LEASE_ID, "owner": self.owner_id}, {"$set": {"expires_at": datetime.utcnow()}}
+            )
+            self.is_leader = False
+
+    async def _hold_lease(self, db: AsyncIOMotorDatabase) -> bool:
+        # Polls are much more frequent than the lease; renew at a third of its length
+        if self.is_leader and time.monotonic() - self._lease_renewed < self.lease_seconds / 3:
+            return True
+        self.is_leader = await self._acquire_lease(db)
+        if self.is_leader:
+            self._lease_renewed = time.monotonic()
+        return self.is_leader
+
+    @staticmethod
+    def _events(records: List[dict]) -> List[dict]:
+        events = []
+        for record in records:
+            details = {key: value for key, value in record.items() if key != "outbox"}
+            for event in record.get("outbox") or []:
+                events.append({**event, "record_id": record["_id"], "record": details})
+        return events
+
+    def _wanted_by(self, event: dict) -> List[str]:
+        delivered = event.get("delivered") or []
+        return [
+            name for name, (event_types, _) in self._subscribers.items()
+            if name not in delivered and (event_types is None or event["type"] in event_types)
+        ]
+
+    def _undelivered_to(self, name: str) -> dict:
+        event_types, _ = self._subscribers[name]
+        match: Dict[str, Any] = {"delivered": {"$ne": name}}
+        if event_types is not None:
+            match["type"] = {"$in": list(event_types)}
+        return {"outbox": {"$elemMatch": match}}
+
+    def _record_failure(self, name: str):
+        self._failures[name] += 1
+        self._backoff[name] += 1
+        delay = min(MAX_BACKOFF_SECONDS, self.poll_interval * 2 ** self._backoff[name])
+        self._retry_at[name] = time.monotonic() + delay
+
+    def _record_success(self, name: str):
+        self._backoff.pop(name, None)
+        self._retry_at.pop(name, None)
+
+    async def relay_batch(self, db: AsyncIOMotorDatabase) -> Tuple[int, int]:
+        """Relay one batch of pending events; returns (events relayed, events still failing).
+
+        Events relayed to every active subscriber count, even while a backed-off one still waits for them.
+        """
+        started = time.perf_counter()
+        now = time.monotonic()
+        deferred = {name for name, retry_at in self._retry_at.items() if retry_at > now}
+        active = [name for name in self._subscribers if name not in deferred]
+        if not active:
+            return 0, 0
+        query: Dict[str, Any] = {"outbox_pending": True}
+        if deferred:
+            # Records waiting only on backed-off subscribers would otherwise fill every batch
+            query["$or"] = [self._undelivered_to(name) for name in active]
+        records = await db.triage_records.find(query, RECORD_PROJECTION).to_list(length=self.batch_size)
+        events = self._events(records)
+        if not events:
+            # Flag left behind by an emptied outbox
+            if records:
+                await self._acknowledge(db, records, {}, [], [])
+            return 0, 0
+
+        failed: Dict[str, bool] = {}
+        for name in active:
+            pending = [event for event in events if name in self._wanted_by(event)]
+            if not pending:
+                continue
+            try:
+                await self._subscribers[name][1](db, pending)
+                self._stats[f"{name}.delivered"] += len(pending)
+                self._record_success(name)
+            except Exception as e:
+                failed[name] = True
+                self._record_failure(name)
+                logger.error(f"Outbox subscriber '{name}' failed on {len(pending)} events: {str(e)}")
+
+        succeeded = {}
+        retry = []
+        waiting = []
+        for event in events:
+            wanted = self._wanted_by(event)
+            succeeded[event["event_id"]] = [name for name in wanted if name not in failed and name not in deferred]
+            if any(name in failed for name in wanted):
+                retry.append(event)
+            elif any(name in deferred for name in wanted):
+                # Not attempted for the backed-off subscribers; no attempt is counted
+                waiting.append(event)
+        await self._acknowledge(db, records, succeeded, retry, waiting)
+
+        self._last_batch_ms = (time.perf_counter() - started) * 1000
+        self._last_lag_seconds = (datetime.utcnow() - min(event["occurred_at"] for event in events)).total_seconds()
+        self._stats["delivered"] += len(events) - len(retry) - len(waiting)
+        self._stats["batches"] += 1
+        return len(events) - len(retry), len(retry)
+
+    async def _acknowledge(
+        self,
+        db: AsyncIOMotorDatabase,
+        records: List[dict],
+        succeeded: Dict[ObjectId, List[str]],
+        retry: List[dict],
+        waiting: List[dict]
+    ):
+        retry_ids = {event["event_id"] for event in retry}
+        dead = [event for event in retry if event.get("attempts", 0) + 1 >= self.max_attempts]
+        if dead:
+            await db[DEAD_LETTER_COLLECTION].insert_many([
+                {**{key: value for key, value in event.items() if key != "record"}, "failed_at": datetime.utcnow()}
+                for event in dead
+            ])
+            self._stats["dead_lettered"] += len(dead)
+            logger.error(f"Moved {len(dead)} outbox events to '{DEAD_LETTER_COLLECTION}' after {self.max_attempts} attempts")
+            retry_ids -= {event["event_id"] for event in dead}
+        kept_ids = retry_ids | {event["event_id"] for event in waiting}
+
+        operations = []
+        for record in records:
+            # Include the shard key so each update routes to a single shard
+            record_filter = {"_id": record["_id"], "facility_id": record.get("facility_id"), "created_at": record.get("created_at")}
+            finished = [event["event_id"] for event in record.get("outbox") or [] if event["event_id"] not in kept_ids]
+            if finished:
+                operations.append(UpdateOne(record_filter, {"$pull": {"outbox": {"event_id": {"$in": finished}}}}))
+            for event in record.get("outbox") or []:
+                if event["event_id"] not in kept_ids:
+                    continue
+                update = {}
+                if event["event_id"] in retry_ids:
+                    update["$inc"] = {"outbox.$[e].attempts": 1}
+                if succeeded.get(event["event_id"]):
+                    update["$addToSet"] = {"outbox.$[e].delivered": {"$each": succeeded[event["event_id"]]}}
+                if update:
+                    operations.append(UpdateOne(record_filter, update, array_filters=[{"e.event_id": event["event_id"]}]))
+            # Events pushed since the batch was read keep the flag set
+            operations.append(UpdateOne(
+                {**record_filter, "outbox": {"$size": 0}}, {"$unset": {"outbox": "", "outbox_pending": ""}}
+            ))
+        # Ordered: the flag is cleared only after the pulls above have been applied
+        await db.triage_records.bulk_write(operations, ordered=True)
+
+    async def run(self, db: AsyncIOMotorDatabase):
+        logger.info(f"Outbox relay started ({self.owner_id})")
+        self._wakeup = asyncio.Event()
+        while True:
+            delay = self.poll_interval
+            try:
+                if await self._hold_lease(db):
+                    relayed, _ = await self.relay_batch(db)
+                    if relayed >= self.batch_size:
+                        # Backlog: go again straight away
+                        delay = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox relay failed: {str(e)}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "leader": self.is_leader,
+            "owner": self.owner_id,
+            "subscribers": {
+                name: {
+                    "delivered": self._stats[f"{name}.delivered"],
+                    "failed_batches": self._failures[name],
+                    "retry_in_seconds": round(max(0.0, self._retry_at.get(name, 0.0) - time.monotonic()), 1)
+                }
+                for name in self._subscribers
+            },
+            "delivered_total": self._stats["delivered"],
+            "batches": self._stats["batches"],
+            "dead_lettered": self._stats["dead_lettered"],
+            "last_batch_ms": round(self._last_batch_ms, 2),
+            "last_lag_seconds": round(self._last_lag_seconds, 2)
+        }
+
+async def audit_triage_events(db: AsyncIOMotorDatabase, events: List[dict]):
+    # audit_logs is time-series and cannot have a unique index: skip events a previous delivery wrote
+    occurred = [event["occurred_at"] for event in events]
+    existing = set(await db[AUDIT_COLLECTION].distinct("event_id", {
+        "meta.user_id": {"$in": list({ObjectId(event["payload"]["user_id"]) for event in events})},
+        "timestamp": {"$gte": min(occurred), "$lte": max(occurred)},
+        "event_id": {"$in": [event["event_id"] for event in events]}
+    }))
+    documents = [
+        {
+            **audit_service.to_document(
+                event["payload"]["user_id"],
+                "TRIAGE_ANALYSIS",
+                f"Risk level: {event['payload']['risk_level']}, Priority: {event['payload']['priority_score']}",
+                event["payload"].get("ip_address"),
+                timestamp=event["occurred_at"]
+            ),
+            "event_id": event["event_id"]
+        }
+        for event in events
+        if event["event_id"] not in existing
+    ]
+    if documents:
+        await db[AUDIT_COLLECTION].insert_many(documents, ordered=False)
+
+async def update_patient_summaries(db: AsyncIOMotorDatabase, events: List[dict]):
+    user_ids = list({ObjectId(event["payload"]["user_id"]) for event in events})
+    # Legacy users without an embedded profile keep prompts history-only
+    users = await db.users.find(
+        {"_id": {"$in": user_ids}, "patient_profile.patient_id": {"$exists": True}},
+        {"patient_profile.triage_summary": 1}
+    ).to_list(length=len(user_ids))
+    summaries = {user["_id"]: user["patient_profile"].get("triage_summary") for user in users}
+
+    for event in sorted(events, key=lambda event: event["record"]["created_at"]):
+        user_id = ObjectId(event["payload"]["user_id"])
+        if user_id not in summaries:
+            continue
+        # A redelivered event is skipped by record_visit (last_record_id matches)
+        record = {"_id": event["record_id"], **event["record"]}
+        updated = await patient_summary_service.record_visit(db, user_id, summaries[user_id], record)
+        if updated is not None:
+            summaries[user_id] = updated
+
+class WebhookSink:
+    """POSTs each batch of events as JSON to an external endpoint (no symptoms or client addresses)."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    @staticmethod
+    def _serialize(event: dict) -> dict:
+        record = event["record"]
+        return {
+            "event_id": str(event["event_id"]),
+            "type": event["type"],
+            "occurred_at": event["occurred_at"].isoformat() + "Z",
+            "record_id": str(event["record_id"]),
+            "facility_id": record.get("facility_id"),
+            "patient_id": str(record["patient_id"]) if record.get("patient_id") else None,
+            "risk_level": record.get("risk_level"),
+            "priority_score": record.get("priority_score"),
+            "assessment_source": record.get("assessment_source"),
+            "status": record.get("status")
+        }
+
+    def _post(self, body: bytes):
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+        urllib.request.urlopen(request, timeout=self.timeout).close()
+
+    async def __call__(self, db: AsyncIOMotorDatabase, events: List[dict]):
+        body = json.dumps({"events": [self._serialize(event) for event in events]}).encode()
+        await asyncio.to_thread(self._post, body)
+
+outbox_relay = OutboxRelay(
+    poll_interval_ms=settings.OUTBOX_POLL_INTERVAL_MS,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    lease_seconds=settings.OUTBOX_LEASE_SECONDS
+)
+outbox_relay.subscribe("audit", audit_triage_events, (TRIAGE_ASSESSED,))
+if settings.PATIENT_SUMMARY_ENABLED:
+    outbox_relay.subscribe("patient_summary", update_patient_summaries, (TRIAGE_ASSESSED,))
+if settings.OUTBOX_WEBHOOK_URL:
+    outbox_relay.subscribe("webhook", WebhookSink(settings.OUTBOX_WEBHOOK_URL))
@@ -0,0 +1,146 @@
+import copy
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.models.vitals import VITAL_NAMES
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELD = "patient_profile.triage_summary"
+RECENT_VISITS = 5
+MAX_CONCERNS = 8
+# Weight of the newest reading in each vital baseline (exponential moving average)
+BASELINE_ALPHA = 0.3
+
+# Recurring-concern labels matched in free-text symptoms and symptom keys
+CONCERN_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "chest pain": ("chest pain", "chest_pain", "chest tightness", "angina"),
+    "shortness of breath": ("shortness of breath", "shortness_of_breath", "breathless", "difficulty breathing", "wheez"),
+    "palpitations": ("palpitation", "racing heart", "arrhythmia"),
+    "fever": ("fever", "febrile", "chills"),
+    "cough": ("cough",),
+    "headache": ("headache", "migraine"),
+    "dizziness": ("dizz", "lightheaded", "vertigo", "faint", "syncope"),
+    "abdominal pain": ("abdominal pain", "abdominal_pain", "stomach pain", "stomach ache"),
+    "nausea/vomiting": ("nausea", "vomit"),
+    "back pain": ("back pain", "back_pain"),
+    "injury": ("fracture", "sprain", "twisted", "fall", "fell", "injur", "wound"),
+    "bleeding": ("bleed", "blood in"),
+    "rash": ("rash", "hives", "itch"),
+    "neurological": ("seizure", "confusion", "numbness", "weakness on", "slurred", "stroke"),
+    "urinary": ("urinary", "urination", "dysuria"),
+}
+
+VITAL_LABELS = {
+    "heart_rate": "HR", "systolic": "SBP", "diastolic": "DBP",
+    "oxygen_saturation": "SpO2", "temperature": "Temp", "respiratory_rate": "RR",
+}
+
+def record_concerns(symptoms: Dict[str, Any]) -> List[str]:
+    text = " ".join(
+        [key.lower() for key, value in symptoms.items() if value is True]
+        + [value.lower() for value in symptoms.values() if isinstance(value, str)]
+    )
+    return [label for label, keywords in CONCERN_KEYWORDS.items() if any(keyword in text for keyword in keywords)]
+
+def fold_record(summary: Optional[Dict[str, Any]], record: dict) -> Dict[str, Any]:
+    """Return the summary with one more triage record applied; the input is not modified."""
+    summary = copy.deepcopy(summary) if summary else {
+        "visits": 0, "first_visit_at": record["created_at"], "recent": [], "baselines": {}, "concerns": {}, "version": 0
+    }
+    summary["visits"] += 1
+    summary["last_visit_at"] = record["created_at"]
+    summary["last_record_id"] = record["_id"]
+    summary["version"] += 1
+
+    summary["recent"] = (summary["recent"] + [{
+        "at": record["created_at"],
+        "risk_level": record.get("risk_level"),
+        "priority_score": record.get("priority_score")
+    }])[-RECENT_VISITS:]
+
+    for name, value in (record.get("vital_signs") or {}).items():
+        baseline = summary["baselines"].get(name)
+        if baseline is None:
+            summary["baselines"][name] = {"mean": value, "last": value, "count": 1}
+        else:
+            baseline["mean"] = round(BASELINE_ALPHA * value + (1 - BASELINE_ALPHA) * baseline["mean"], 2)
+            baseline["last"] = value
+            baseline["count"] += 1
+
+    # Bounded counter: when full, the least frequent concern makes room for a new one
+    concerns = Counter(summary["concerns"])
+    for label in record_concerns(record.get("symptoms") or {}):
+        concerns[label] += 1
+    summary["concerns"] = dict(concerns.most_common(MAX_CONCERNS))
+    return summary
+
+def render_summary(summary: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Compact prompt text; its size is bounded by RECENT_VISITS, the vital count and MAX_CONCERNS."""
+    if not summary or not summary.get("visits"):
+        return None
+    parts = [f"{summary['visits']} prior triage visit(s), last {summary['last_visit_at']:%Y-%m-%d}"]
+    if summary.get("recent"):
+        trend = ", ".join(f"{visit['risk_level']}/{visit['priority_score']}" for visit in summary["recent"])
+        parts.append(f"recent risk/priority oldest to newest: {trend}")
+    baselines = [
+        f"{VITAL_LABELS[name]} {summary['baselines'][name]['mean']:.3g} (last {summary['baselines'][name]['last']:.3g})"
+        for name in VITAL_NAMES if name in summary.get("baselines", {})
+    ]
+    if baselines:
+        parts.append(f"usual vitals: {', '.join(baselines)}")
+    if summary.get("concerns"):
+        concerns = ", ".join(f"{label} x{count}" for label, count in summary["concerns"].items())
+        parts.append(f"recurring concerns: {concerns}")
+    return "; ".join(parts)
+
+class PatientSummaryService:
+    """Per-patient triage summary embedded in the user's patient profile.
+
+    The summary is folded forward from each new triage record instead of
+    being recomputed from ``triage_records``, and it arrives with the user
+    document that authentication already loads, so building a prompt with
+    prior-visit context costs no extra query. Concurrent updates for the
+    same patient are serialized with an optimistic ``version`` check.
+    """
+
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+        self.updates = 0
+        self.conflicts = 0
+        self.failures = 0
+
+    async def record_visit(self, db: AsyncIOMotorDatabase, user_id: ObjectId, summary: Optional[dict], record: dict) -> Optional[dict]:
+        for _ in range(self.max_attempts):
+            if summary and summary.get("last_record_id") == record["_id"]:
+                return summary
+            updated = fold_record(summary, record)
+            version_filter = (
+                {f"{SUMMARY_FIELD}.version": summary["version"]} if summary else {SUMMARY_FIELD: {"$exists": False}}
+            )
+            # Only users with an embedded profile; $set would otherwise create a profile without patient_id
+            result = await db.users.update_one(
+                {"_id": user_id, "patient_profile.patient_id": {"$exists": True}, **version_filter},
+                {"$set": {SUMMARY_FIELD: updated}}
+            )
+            if result.modified_count:
+                self.updates += 1
+                return updated
+
+            user = await db.users.find_one({"_id": user_id}, {"patient_profile": 1})
+            if not user or not (user.get("patient_profile") or {}).get("patient_id"):
+                return None
+            self.conflicts += 1
+            summary = user["patient_profile"].get("triage_summary")
+
+        self.failures += 1
+        logger.warning(f"Could not update triage summary for user {user_id} after {self.max_attempts} attempts")
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"updates": self.updates, "conflicts": self.conflicts, "failures": self.failures}
+
+patient_summary_service = PatientSummaryService()
@@ -0,0 +1,211 @@
+import json
+import re
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Static instruction sections are assembled once at import time; only the
+# patient-specific data block changes between calls.
+_INSTRUCTIONS = (
+    "You are a medical AI assistant specialized in patient triage. "
+    "Analyze the following patient data and provide a structured assessment."
+)
+
+_RESPONSE_FORMAT = (
+    "Respond with JSON ONLY (no additional text) matching:\n"
+    '{"risk_level":"critical|high|moderate|low","priority_score":<integer 1-10>,'
+    '"ai_confidence":<float 0.0-1.0>,"primary_concerns":["concern1","concern2"],'
+    '"recommendations":"Detailed medical recommendations",'
+    '"reasoning":"Brief explanation of the assessment"}'
+)
+
+_BATCH_INSTRUCTIONS = (
+    "You are a medical AI assistant specialized in patient triage. "
+    "Assess each of the following independent patient cases separately; "
+    "never let one case influence another."
+)
+
+_BATCH_RESPONSE_FORMAT = (
+    "Respond with a JSON array ONLY (no additional text) containing exactly one object per case:\n"
+    '[{"case_id":<case_id from input>,"risk_level":"critical|high|moderate|low",'
+    '"priority_score":<integer 1-10>,"ai_confidence":<float 0.0-1.0>,'
+    '"primary_concerns":["concern1","concern2"],"recommendations":"Detailed medical recommendations",'
+    '"reasoning":"Brief explanation of the assessment"}]'
+)
+
+# Medical history fragments mentioning these terms are kept first when the
+# history has to be truncated to fit the budget.
+_PRIORITY_TERMS = (
+    "allerg", "anaphyla", "cardiac", "heart", "infarct", "stroke", "arrhythm",
+    "anticoag", "warfarin", "insulin", "diabet", "hypertens", "asthma", "copd",
+    "seizure", "epilep", "cancer", "chemo", "transplant", "immuno", "pregnan",
+    "kidney", "renal", "liver", "hepat", "surgery", "pacemaker",
+)
+
+_HISTORY_SPLIT = re.compile(r"[;\n]+|(?<=[.,])\s+")
+
+# Rough heuristic for Gemini tokenization of English/JSON text.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_json(data: Any) -> str:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class PromptBuilder:
+    def __init__(self, token_budget: int, history_max_tokens: int, context_max_tokens: int):
+        self.token_budget = token_budget
+        self.history_max_tokens = history_max_tokens
+        self.context_max_tokens = context_max_tokens
+        self._static_tokens = estimate_tokens(_INSTRUCTIONS) + estimate_tokens(_RESPONSE_FORMAT)
+        self.prompts_built = 0
+        self.total_prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.history_truncations = 0
+        self.prompts_with_context = 0
+
+    def _summarize_history(self, medical_history: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return "(omitted)"
+        if estimate_tokens(medical_history) <= max_tokens:
+            return medical_history
+
+        self.history_truncations += 1
+
+        fragments: List[str] = []
+        seen = set()
+        for fragment in _HISTORY_SPLIT.split(medical_history):
+            fragment = fragment.strip(" ,.")
+            key = fragment.lower()
+            if fragment and key not in seen:
+                seen.add(key)
+                fragments.append(fragment)
+
+        # Stable ordering: priority fragments first, then the rest in their original order
+        ranked = sorted(
+            range(len(fragments)),
+            key=lambda i: (not any(term in fragments[i].lower() for term in _PRIORITY_TERMS), i)
+        )
+
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        kept = []
+        used = 0
+        for i in ranked:
+            cost = len(fragments[i]) + 2
+            if used + cost > max_chars:
+                continue
+            kept.append(i)
+            used += cost
+
+        omitted = len(fragments) - len(kept)
+        summary = "; ".join(fragments[i] for i in sorted(kept))
+        if not summary:
+            summary = medical_history[:max_chars].rstrip()
+        if omitted:
+            summary += f" (+{omitted} more omitted)"
+        return summary
+
+    def _case_sections(
+        self,
+        symptoms: Dict[str, Any],
+        vitals: Dict[str, Any],
+        medical_history: Optional[str],
+        patient_context: Optional[str],
+        fixed_tokens: int
+    ) -> Tuple[str, str, str, Optional[str]]:
+        symptoms_text = compact_json(symptoms)
+        vitals_text = compact_json(vitals)
+        context_text = None
+        if patient_context:
+            # Prior-visit summaries are bounded when rendered; the cap only guards against growth
+            context_text = patient_context[:self.context_max_tokens * CHARS_PER_TOKEN]
+            self.prompts_with_context += 1
+
+        # Symptoms, vitals and the prior-visit summary are never dropped; the history gets whatever is left
+        used = fixed_tokens + estimate_tokens(symptoms_text) + estimate_tokens(vitals_text)
+        used += estimate_tokens(context_text) if context_text else 0
+        history_budget = min(self.history_max_tokens, self.token_budget - used)
+        history_text = self._summarize_history(medical_history, history_budget) if medical_history else "None provided"
+        return symptoms_text, vitals_text, history_text, context_text
+
+    def _record(self, prompt: str) -> int:
+        prompt_tokens = estimate_tokens(prompt)
+        self.prompts_built += 1
+        self.total_prompt_tokens += prompt_tokens
+        self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_tokens)
+        return prompt_tokens
+
+    def build(
+        self,
+        symptoms: Dict[str, Any],
+        vitals: Dict[str, Any],
+        medical_history: Optional[str] = None,
+        patient_context: Optional[str] = None
+    ) -> str:
+        symptoms_text, vitals_text, history_text, context_text = self._case_sections(
+            symptoms, vitals, medical_history, patient_context, self._static_tokens
+        )
+
+        prompt = (
+            f"{_INSTRUCTIONS}\n\n"
+            f"Symptoms: {symptoms_text}\n"
+            f"Vitals: {vitals_text}\n"
+            f"History: {history_text}\n"
+            + (f"Prior visits: {context_text}\n" if context_text else "")
+            + f"\n{_RESPONSE_FORMAT}"
+        )
+
+        prompt_tokens = self._record(prompt)
+        logger.info(f"Built triage prompt: ~{prompt_tokens} tokens")
+
+        return prompt
+
+    def build_batch(self, cases: List[Dict[str, Any]]) -> str:
+        """Build one prompt assessing several patients; each case carries its index as case_id."""
+        lines = []
+        for case_id, case in enumerate(cases):
+            # Instructions are shared by the batch, so each case gets the full per-case budget
+            symptoms_text, vitals_text, history_text, context_text = self._case_sections(
+                case["symptoms"], case["vitals"], case.get("medical_history"), case.get("patient_context"), 0
+            )
+            prior_visits = f',"prior_visits":{compact_json(context_text)}' if context_text else ""
+            lines.append(
+                f'{{"case_id":{case_id},"symptoms":{symptoms_text},"vitals":{vitals_text},'
+                f'"history":{compact_json(history_text)}{prior_visits}}}'
+            )
+
+        prompt = (
+            f"{_BATCH_INSTRUCTIONS}\n\n"
+            f"Cases:\n" + "\n".join(lines) + "\n\n"
+            f"{_BATCH_RESPONSE_FORMAT}"
+        )
+
+        prompt_tokens = self._record(prompt)
+        logger.info(f"Built batched triage prompt for {len(cases)} cases: ~{prompt_tokens} tokens")
+
+        return prompt
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "prompts_built": self.prompts_built,
+            "total_prompt_tokens": self.total_prompt_tokens,
+            "avg_prompt_tokens": (self.total_prompt_tokens / self.prompts_built) if self.prompts_built else 0.0,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "history_truncations": self.history_truncations,
+            "prompts_with_context": self.prompts_with_context,
+            "token_budget": self.token_budget
+        }
+
+
+prompt_builder = PromptBuilder(
+    token_budget=settings.PROMPT_TOKEN_BUDGET,
+    history_max_tokens=settings.PROMPT_HISTORY_MAX_TOKENS,
+    context_max_tokens=settings.PROMPT_CONTEXT_MAX_TOKENS
+)
@@ -0,0 +1,86 @@
+import math
+from typing import List, Optional, Tuple
+
+
+class TDigest:
+    """Mergeable streaming quantile sketch (merging t-digest, k1 scale function).
+
+    Memory is bounded by ``compression`` centroids regardless of how many
+    values were added, and two digests can be merged without the raw data.
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self._centroids: List[Tuple[float, float]] = []
+        self._buffer: List[Tuple[float, float]] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: float = 1.0):
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other: "TDigest"):
+        if not other.count:
+            return
+        other._compress()
+        self._buffer.extend(other._centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _compress(self):
+        if not self._buffer:
+            return
+
+        items = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        total = self.count
+
+        merged = []
+        cumulative = 0.0
+        mean, weight = items[0]
+        k_limit = self._k(0.0) + 1
+        for item_mean, item_weight in items[1:]:
+            if self._k((cumulative + weight + item_weight) / total) <= k_limit:
+                weight += item_weight
+                mean += (item_mean - mean) * item_weight / weight
+            else:
+                merged.append((mean, weight))
+                cumulative += weight
+                k_limit = self._k(cumulative / total) + 1
+                mean, weight = item_mean, item_weight
+        merged.append((mean, weight))
+        self._centroids = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        if not self._centroids:
+            return None
+        if len(self._centroids) == 1:
+            return self._centroids[0][0]
+
+        target = q * self.count
+        previous_mean, previous_center = self.min, 0.0
+        cumulative = 0.0
+        for mean, weight in self._centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0.0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_mean, previous_center = mean, center
+            cumulative += weight
+
+        span = self.count - previous_center
+        fraction = (target - previous_center) / span if span else 1.0
+        return previous_mean + (self.max - previous_mean) * min(fraction, 1.0)
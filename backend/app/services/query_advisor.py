@@ -0,0 +1,252 @@
+import asyncio
+import copy
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import monitoring
+
+from app.core.config import settings
+from app.services.quantile_sketch import TDigest
+
+logger = logging.getLogger(__name__)
+
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$exists", "$regex", "$not"}
+# Command fields added by the driver that explain rejects or ignores
+DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit", "startTransaction", "$audit"}
+
+def _filter_and_sort(command_name: str, command: dict) -> Tuple[dict, dict]:
+    if command_name == "find":
+        return command.get("filter") or {}, command.get("sort") or {}
+    if command_name == "findAndModify":
+        return command.get("query") or {}, command.get("sort") or {}
+    if command_name in ("count", "distinct"):
+        return command.get("query") or {}, {}
+    if command_name == "aggregate":
+        match, sort = {}, {}
+        for stage in command.get("pipeline") or []:
+            if "$match" in stage and not match and not sort:
+                match = stage["$match"]
+            elif "$sort" in stage and not sort:
+                sort = stage["$sort"]
+            elif "$match" not in stage:
+                break
+        return match, sort
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        return statements[0].get("q") or {}, {}
+    return {}, {}
+
+def query_shape(value: Any) -> Any:
+    """Replace literal values with '?' so queries differing only in values share a shape."""
+    if isinstance(value, dict):
+        return {key: ("?" if key in ("$in", "$nin") else query_shape(item)) for key, item in sorted(value.items())}
+    if isinstance(value, list):
+        return [query_shape(item) for item in value]
+    return "?"
+
+def suggest_index(query: dict, sort: dict) -> List[Tuple[str, int]]:
+    """Compound index following the Equality, Sort, Range rule."""
+    equality, ranges = [], []
+    for field, condition in query.items():
+        if field.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(operator in RANGE_OPERATORS for operator in condition):
+            ranges.append(field)
+        else:
+            equality.append(field)
+    keys = [(field, 1) for field in equality]
+    keys += [(field, direction if direction in (1, -1) else 1) for field, direction in sort.items() if field not in equality]
+    keys += [(field, 1) for field in ranges if field not in sort]
+    return keys
+
+def _plan_stages(plan: dict, stages: List[dict]):
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        stages.append(plan)
+    for key in ("inputStage", "queryPlan"):
+        _plan_stages(plan.get(key), stages)
+    for child in plan.get("inputStages", []):
+        _plan_stages(child, stages)
+    for shard in plan.get("shards", []):
+        _plan_stages(shard.get("winningPlan"), stages)
+
+def summarize_plan(explain: dict) -> Dict[str, Any]:
+    planner = explain.get("queryPlanner")
+    if planner is None:
+        # Aggregations report the plan of their leading $cursor stage
+        for stage in explain.get("stages", []):
+            if "$cursor" in stage:
+                planner = stage["$cursor"].get("queryPlanner")
+                break
+    stages: List[dict] = []
+    _plan_stages((planner or {}).get("winningPlan", {}), stages)
+    names = [stage["stage"] for stage in stages]
+    return {
+        "stages": names,
+        "collscan": "COLLSCAN" in names,
+        "in_memory_sort": "SORT" in names,
+        "indexes_used": sorted({stage["indexName"] for stage in stages if stage.get("indexName")})
+    }
+
+class _ShapeStats:
+    __slots__ = ("database", "collection", "operation", "shape", "digest", "count", "total_ms", "slow_count",
+                 "sample", "filter", "sort", "plan", "suggested_index", "explained_at")
+
+    def __init__(self, database: str, collection: str, operation: str, shape: str):
+        self.database = database
+        self.collection = collection
+        self.operation = operation
+        self.shape = shape
+        self.digest = TDigest(50)
+        self.count = 0
+        self.total_ms = 0.0
+        self.slow_count = 0
+        self.sample = None
+        self.filter = {}
+        self.sort = {}
+        self.plan = None
+        self.suggested_index = None
+        self.explained_at = None
+
+class QueryAdvisor(monitoring.CommandListener):
+    """Per-query-shape latency from pymongo command monitoring, plus periodic explain.
+
+    Listener callbacks run on Motor's executor threads, so stats are guarded
+    by a lock. The most recent command of each shape is kept (in memory only)
+    so the shapes with the highest total time can be explained; the report
+    itself never contains literal values.
+    """
+
+    ANALYZED_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+
+    def __init__(self, slow_ms: float, explain_top: int, interval_seconds: int, max_shapes: int = 500):
+        self.slow_ms = slow_ms
+        self.explain_top = explain_top
+        self.interval_seconds = interval_seconds
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._shapes: Dict[str, _ShapeStats] = {}
+        self._inflight: Dict[Tuple[Any, int], _ShapeStats] = {}
+
+    def started(self, event):
+        if event.command_name not in self.ANALYZED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            return
+        query, sort = _filter_and_sort(event.command_name, event.command)
+        shape = json.dumps({"filter": query_shape(query), "sort": sort}, default=str)
+        key = f"{event.database_name}.{collection}|{event.command_name}|{shape}"
+
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                if len(self._shapes) >= self.max_shapes:
+                    return
+                stats = self._shapes[key] = _ShapeStats(event.database_name, collection, event.command_name, shape)
+            stats.sample = event.command
+            stats.filter, stats.sort = query, sort
+            self._inflight[(event.connection_id, event.request_id)] = stats
+
+    def _finish(self, event):
+        with self._lock:
+            stats = self._inflight.pop((event.connection_id, event.request_id), None)
+            if stats is None:
+                return
+            duration_ms = event.duration_micros / 1000
+            stats.count += 1
+            stats.total_ms += duration_ms
+            stats.digest.add(duration_ms)
+            slow = duration_ms >= self.slow_ms
+            if slow:
+                stats.slow_count += 1
+        if slow:
+            logger.warning(
+                f"Slow query {duration_ms:.1f}ms: {stats.operation} on {stats.collection} shape={stats.shape}"
+            )
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    async def _existing_indexes(self, db: AsyncIOMotorDatabase, collection: str) -> List[List[Tuple[str, int]]]:
+        indexes = await db[collection].index_information()
+        return [[(field, direction) for field, direction in index["key"]] for index in indexes.values()]
+
+    async def explain_top_offenders(self, db: AsyncIOMotorDatabase):
+        with self._lock:
+            candidates = sorted(
+                (stats for stats in self._shapes.values() if stats.sample is not None and stats.database == db.name),
+                key=lambda stats: stats.total_ms, reverse=True
+            )[:self.explain_top]
+            commands = [
+                (stats, {key: value for key, value in copy.deepcopy(stats.sample).items() if key not in DRIVER_FIELDS})
+                for stats in candidates
+            ]
+
+        for stats, command in commands:
+            try:
+                explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+            except Exception as e:
+                logger.warning(f"Explain failed for {stats.operation} on {stats.collection}: {str(e)}")
+                continue
+            plan = summarize_plan(explain)
+            suggestion = None
+            if plan["collscan"] or plan["in_memory_sort"]:
+                keys = suggest_index(stats.filter, stats.sort)
+                existing = await self._existing_indexes(db, stats.collection)
+                if keys and not any(index[:len(keys)] == keys for index in existing):
+                    suggestion = keys
+            stats.plan = plan
+            stats.suggested_index = suggestion
+            stats.explained_at = datetime.utcnow()
+            if suggestion:
+                logger.warning(f"Index advice for {stats.collection}: {suggestion} ({', '.join(plan['stages'])})")
+
+    async def run(self, db: AsyncIOMotorDatabase):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.explain_top_offenders(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Query explain pass failed: {str(e)}")
+
+    def get_report(self, limit: int) -> Dict[str, Any]:
+        with self._lock:
+            shapes = sorted(self._shapes.values(), key=lambda stats: stats.total_ms, reverse=True)[:limit]
+            rows = [{
+                "collection": stats.collection,
+                "operation": stats.operation,
+                "shape": json.loads(stats.shape),
+                "count": stats.count,
+                "total_ms": round(stats.total_ms, 1),
+                "avg_ms": round(stats.total_ms / stats.count, 2) if stats.count else None,
+                "p95_ms": round(stats.digest.quantile(0.95), 2) if stats.count else None,
+                "max_ms": round(stats.digest.max, 2) if stats.count else None,
+                "slow_count": stats.slow_count,
+                "plan": stats.plan,
+                "suggested_index": [[field, direction] for field, direction in stats.suggested_index] if stats.suggested_index else None,
+                "explained_at": stats.explained_at.isoformat() if stats.explained_at else None
+            } for stats in shapes]
+        return {
+            "slow_threshold_ms": self.slow_ms,
+            "shapes_tracked": len(self._shapes),
+            "suggested_indexes": [
+                {"collection": row["collection"], "keys": row["suggested_index"]} for row in rows if row["suggested_index"]
+            ],
+            "shapes": rows
+        }
+
+query_advisor = QueryAdvisor(
+    slow_ms=settings.QUERY_SLOW_MS,
+    explain_top=settings.QUERY_EXPLAIN_TOP,
+    interval_seconds=settings.QUERY_EXPLAIN_INTERVAL_SECONDS
+)
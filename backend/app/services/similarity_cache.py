@@ -0,0 +1,158 @@
+import copy
+import logging
+import re
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.vitals import vital_readings
+
+logger = logging.getLogger(__name__)
+
+FEATURE_DIM = 1024
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "with", "in", "on", "at", "to", "for", "is", "are", "was", "were",
+    "has", "have", "had", "my", "i", "me", "it", "since", "very", "some", "feel", "feeling", "patient", "reports"
+}
+
+# Clinical bands per vital; a cached result is only reused when every vital falls in the same band
+VITAL_BANDS: Dict[str, Tuple[float, ...]] = {
+    "heart_rate": (50, 60, 101, 121),
+    "systolic": (90, 140, 180),
+    "diastolic": (60, 90, 110),
+    "oxygen_saturation": (90, 94),
+    "temperature": (35.0, 38.0, 39.0),
+    "respiratory_rate": (12, 21, 30),
+}
+# ...and within this absolute distance of the cached reading
+VITAL_TOLERANCES: Dict[str, float] = {
+    "heart_rate": 10, "systolic": 10, "diastolic": 8, "oxygen_saturation": 2, "temperature": 0.5, "respiratory_rate": 3
+}
+
+def _words(text: str) -> List[str]:
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+def _phrase_features(text: str) -> List[str]:
+    # Bigrams are joined with "_" so the phrase "chest pain" and the key "chest_pain" share features
+    words = _words(text)
+    return words + [f"{first}_{second}" for first, second in zip(words, words[1:])]
+
+def symptom_features(symptoms: Dict[str, Any]) -> List[str]:
+    features = []
+    for key, value in symptoms.items():
+        if value is True:
+            features += _phrase_features(key.replace("_", " "))
+        elif isinstance(value, str):
+            features += _phrase_features(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and value:
+            name = "_".join(_words(key.replace("_", " ")))
+            features += [name, f"{name}={round(float(value))}"]
+    return features
+
+def _band(name: str, value: float) -> int:
+    return sum(value >= edge for edge in VITAL_BANDS[name])
+
+def vitals_match(current: Dict[str, float], cached: Dict[str, float]) -> bool:
+    if current.keys() != cached.keys():
+        return False
+    return all(
+        _band(name, value) == _band(name, cached[name]) and abs(value - cached[name]) <= VITAL_TOLERANCES[name]
+        for name, value in current.items()
+    )
+
+def feature_vector(symptoms: Dict[str, Any], medical_history: Optional[str]) -> np.ndarray:
+    """Signed feature hashing into FEATURE_DIM dimensions, L2-normalized."""
+    vector = np.zeros(FEATURE_DIM, dtype=np.float32)
+    weighted = [(feature, 1.0) for feature in symptom_features(symptoms)]
+    weighted += [(f"history:{feature}", 0.5) for feature in _phrase_features(medical_history or "")]
+    for feature, weight in weighted:
+        digest = zlib.crc32(feature.encode())
+        vector[digest % FEATURE_DIM] += weight if digest & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SimilarityCache:
+    """Reuses recent AI assessments for near-duplicate presentations.
+
+    Symptoms (and history, at lower weight) are hashed into a fixed-size
+    vector; the index is a ring buffer of the last ``capacity`` assessments
+    searched exactly with one matrix-vector product. A hit needs cosine
+    similarity >= ``threshold`` and every vital in the same clinical band
+    and within tolerance. Reused results are flagged and their confidence
+    scaled by ``confidence_factor``. The key has no prior-visit summary, so
+    returning patients' assessments bypass the cache (``context_bypasses``).
+    """
+
+    def __init__(self, capacity: int, threshold: float, ttl_minutes: int, confidence_factor: float, candidates: int = 5):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_minutes * 60
+        self.confidence_factor = confidence_factor
+        self.candidates = candidates
+        self._vectors = np.zeros((capacity, FEATURE_DIM), dtype=np.float32)
+        self._stored_at = np.full(capacity, -np.inf)
+        self._entries: List[Optional[Tuple[Dict[str, float], Dict[str, Any]]]] = [None] * capacity
+        self._next = 0
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.vital_rejections = 0
+        self.context_bypasses = 0
+
+    def lookup(self, symptoms: Dict[str, Any], vitals: Dict[str, Any], medical_history: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        vector = feature_vector(symptoms, medical_history)
+        if self._size == 0 or not vector.any():
+            self.misses += 1
+            return None
+
+        scores = self._vectors[:self._size] @ vector
+        scores[self._stored_at[:self._size] < time.monotonic() - self.ttl_seconds] = -1.0
+        count = min(self.candidates, self._size)
+        top = np.argpartition(-scores, count - 1)[:count]
+        readings = vital_readings(vitals)
+        for index in top[np.argsort(-scores[top])]:
+            similarity = float(scores[index])
+            if similarity < self.threshold:
+                break
+            cached_readings, result = self._entries[index]
+            if not vitals_match(readings, cached_readings):
+                self.vital_rejections += 1
+                continue
+            self.hits += 1
+            reused = copy.deepcopy(result)
+            reused["ai_confidence"] = round(result["ai_confidence"] * self.confidence_factor, 2)
+            reused["assessment_source"] = "similarity_cache"
+            reused["similarity"] = round(similarity, 4)
+            return reused
+
+        self.misses += 1
+        return None
+
+    def add(self, symptoms: Dict[str, Any], vitals: Dict[str, Any], medical_history: Optional[str], result: Dict[str, Any]):
+        vector = feature_vector(symptoms, medical_history)
+        if not vector.any():
+            return
+        slot = self._next
+        self._vectors[slot] = vector
+        self._stored_at[slot] = time.monotonic()
+        self._entries[slot] = (vital_readings(vitals), copy.deepcopy(result))
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def record_bypass(self):
+        self.context_bypasses += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "vital_rejections": self.vital_rejections,
+            "context_bypasses": self.context_bypasses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,115 @@
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.facility import FACILITY_FIELD
+from app.models.vitals import NORMAL_RANGES, VITAL_NAMES
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+class VitalsAnalytics:
+    """Population-level vitals statistics over the typed ``vital_signs`` fields.
+
+    Records are streamed with a projection of only the typed vitals and
+    risk level into one float64 matrix (one column per vital, NaN where a
+    reading is missing); every statistic is then a column-wise NumPy
+    operation rather than per-record Python.
+    """
+
+    def __init__(self, max_records: int, batch_size: int = 5000):
+        self.max_records = max_records
+        self.batch_size = batch_size
+
+    async def load_columns(
+        self,
+        db: AsyncIOMotorDatabase,
+        since: datetime,
+        facility_id: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        query = {"created_at": {"$gte": since}, "vital_signs": {"$exists": True}}
+        if facility_id:
+            query[FACILITY_FIELD] = facility_id
+        cursor = db.triage_records.find(
+            query, {"_id": 0, "vital_signs": 1, "risk_level": 1}
+        ).sort("created_at", -1).limit(self.max_records).batch_size(self.batch_size)
+
+        rows: List[List[float]] = []
+        risk_levels: List[str] = []
+        async for record in cursor:
+            vital_signs = record.get("vital_signs") or {}
+            rows.append([np.nan if vital_signs.get(name) is None else vital_signs[name] for name in VITAL_NAMES])
+            risk_levels.append(record.get("risk_level") or "unknown")
+        values = np.array(rows, dtype=np.float64).reshape(-1, len(VITAL_NAMES))
+        return values, np.array(risk_levels, dtype=object)
+
+    @staticmethod
+    def _describe(column: np.ndarray, name: str) -> Dict[str, Any]:
+        present = column[~np.isnan(column)]
+        summary = {"count": int(present.size), "missing_rate": round(1 - present.size / column.size, 4) if column.size else None}
+        if not present.size:
+            return summary
+        low, high = NORMAL_RANGES[name]
+        percentiles = np.percentile(present, PERCENTILES)
+        summary.update({
+            "mean": round(float(present.mean()), 2),
+            "std": round(float(present.std()), 2),
+            "min": float(present.min()),
+            "max": float(present.max()),
+            **{f"p{p}": round(float(value), 2) for p, value in zip(PERCENTILES, percentiles)},
+            "below_normal_rate": round(float((present < low).mean()), 4),
+            "above_normal_rate": round(float((present > high).mean()), 4)
+        })
+        return summary
+
+    def summarize(self, values: np.ndarray, risk_levels: np.ndarray) -> Dict[str, Any]:
+        by_risk_level = {}
+        for level in sorted(set(risk_levels.tolist())):
+            rows = values[risk_levels == level]
+            counts = (~np.isnan(rows)).sum(axis=0)
+            # nanmedian warns on all-NaN columns; those are reported as None
+            medians = np.array([np.nanmedian(rows[:, i]) if counts[i] else np.nan for i in range(len(VITAL_NAMES))])
+            by_risk_level[level] = {
+                "count": int(rows.shape[0]),
+                "median": {
+                    name: (round(float(medians[i]), 2) if counts[i] else None) for i, name in enumerate(VITAL_NAMES)
+                }
+            }
+
+        # Shock index (heart rate / systolic) > 0.9 flags possible hemodynamic instability
+        heart_rate = values[:, VITAL_NAMES.index("heart_rate")]
+        systolic = values[:, VITAL_NAMES.index("systolic")]
+        both = ~np.isnan(heart_rate) & ~np.isnan(systolic)
+        shock_index = heart_rate[both] / systolic[both]
+
+        return {
+            "records": int(values.shape[0]),
+            "vitals": {name: self._describe(values[:, i], name) for i, name in enumerate(VITAL_NAMES)},
+            "by_risk_level": by_risk_level,
+            "shock_index": {
+                "count": int(shock_index.size),
+                "median": round(float(np.median(shock_index)), 3) if shock_index.size else None,
+                "elevated_rate": round(float((shock_index > 0.9).mean()), 4) if shock_index.size else None
+            }
+        }
+
+    async def get_report(self, db: AsyncIOMotorDatabase, since: datetime, facility_id: Optional[str] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        values, risk_levels = await self.load_columns(db, since, facility_id)
+        loaded = time.perf_counter()
+        report = self.summarize(values, risk_levels)
+        report["truncated"] = values.shape[0] >= self.max_records
+        report["timing_ms"] = {
+            "load": round((loaded - started) * 1000, 1),
+            "compute": round((time.perf_counter() - loaded) * 1000, 1)
+        }
+        logger.info(f"Vitals analytics over {values.shape[0]} records: {report['timing_ms']}")
+        return report
+
+vitals_analytics = VitalsAnalytics(max_records=settings.VITALS_ANALYTICS_MAX_RECORDS)
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.models.triage_record import TriageStatus
+from app.services.quantile_sketch import TDigest
+
+logger = logging.getLogger(__name__)
+
+# Metric recorded when a record reaches each status, measured from created_at
+TRANSITION_METRICS = {
+    TriageStatus.IN_PROGRESS.value: "time_to_assignment",
+    TriageStatus.COMPLETED.value: "time_to_resolution",
+}
+
+QUANTILES = (0.5, 0.9, 0.99)
+# Transitions newer than this are left for the next sync, so writes that commit out of
+# timestamp order are not skipped
+SETTLE_SECONDS = 5
+
+class WaitTimeAnalytics:
+    """Per-risk-level, per-hour t-digests of wait times fed by doctor status transitions.
+
+    Queries merge at most ``window_hours`` digests per risk level, so their
+    cost does not depend on how many triage records exist.
+
+    The digests are fed from Mongo, not from the worker that made a
+    transition, so every worker reports the same figures. Each sync reads
+    only records updated since the previous one and adds the transitions
+    whose ``status_changed_at`` falls in the new, non-overlapping interval,
+    so no transition is counted twice.
+    """
+
+    def __init__(self, retention_hours: int = 168, compression: int = 100):
+        self.retention_hours = retention_hours
+        self.compression = compression
+        self._digests: Dict[Tuple[str, str, int], TDigest] = {}
+        self._synced_until: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _hour(moment: datetime) -> int:
+        return int(moment.timestamp() // 3600)
+
+    def record(self, metric: str, risk_level: str, seconds: float, at: datetime):
+        key = (metric, risk_level, self._hour(at))
+        digest = self._digests.get(key)
+        if digest is None:
+            digest = self._digests[key] = TDigest(self.compression)
+            self._prune(at)
+        digest.add(seconds)
+
+    def record_transitions(self, record: dict, since: datetime, until: datetime) -> int:
+        """Feed a record's transitions with since < changed_at <= until; returns how many were added."""
+        if not record.get("created_at"):
+            return 0
+        added = 0
+        for status, changed_at in (record.get("status_changed_at") or {}).items():
+            metric = TRANSITION_METRICS.get(status)
+            if metric and since < changed_at <= until:
+                seconds = (changed_at - record["created_at"]).total_seconds()
+                self.record(metric, record.get("risk_level", "unknown"), max(seconds, 0.0), changed_at)
+                added += 1
+        return added
+
+    def _prune(self, now: datetime):
+        oldest = self._hour(now) - self.retention_hours
+        for key in [key for key in self._digests if key[2] < oldest]:
+            del self._digests[key]
+
+    async def _load(self, db: AsyncIOMotorDatabase, since: datetime, until: datetime) -> int:
+        # A transition sets updated_at to its own timestamp, so updated_at > since finds every candidate
+        cursor = db.triage_records.find(
+            {"updated_at": {"$gt": since}, "status_changed_at": {"$exists": True}},
+            {"created_at": 1, "risk_level": 1, "status_changed_at": 1}
+        ).batch_size(1000)
+        loaded = 0
+        async for record in cursor:
+            loaded += self.record_transitions(record, since, until)
+        return loaded
+
+    async def rebuild(self, db: AsyncIOMotorDatabase):
+        """Reload the retention window from triage_records (e.g. after a restart)."""
+        self._synced_until = None
+        await self.sync(db)
+
+    async def sync(self, db: AsyncIOMotorDatabase):
+        """Add transitions made (by any worker) since the last sync."""
+        async with self._lock:
+            until = datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)
+            if self._synced_until is None:
+                self._digests.clear()
+                loaded = await self._load(db, until - timedelta(hours=self.retention_hours), until)
+                logger.info(f"Wait-time analytics rebuilt from {loaded} status transitions")
+            elif until > self._synced_until:
+                await self._load(db, self._synced_until, until)
+            else:
+                return
+            self._synced_until = until
+
+    def get_wait_times(self, window_hours: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+        newest = self._hour(now or datetime.utcnow())
+        oldest = newest - window_hours + 1
+
+        merged: Dict[Tuple[str, str], TDigest] = {}
+        for (metric, risk_level, hour), digest in self._digests.items():
+            if oldest <= hour <= newest:
+                merged.setdefault((metric, risk_level), TDigest(self.compression)).merge(digest)
+
+        report: Dict[str, Any] = {metric: {} for metric in TRANSITION_METRICS.values()}
+        for (metric, risk_level), digest in merged.items():
+            summary = {"count": int(digest.count)}
+            for q in QUANTILES:
+                summary[f"p{int(q * 100)}_seconds"] = round(digest.quantile(q), 1)
+            report[metric][risk_level] = summary
+        return report
+
+wait_time_analytics = WaitTimeAnalytics()
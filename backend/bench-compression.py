@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Response Compression Benchmark
+
+Compresses synthetic payloads shaped like the list endpoints (pending cases,
+system logs, triage history) with each available encoder and level, and
+prints compression ratio and CPU time per response. Use it to pick the
+COMPRESSION_* levels in .env for the expected traffic mix.
+"""
+
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ROUNDS = 50
+
+def pending_cases(count: int = 100) -> list:
+    now = datetime.utcnow()
+    return [{
+        "_id": f"65f{random.getrandbits(84):021x}",
+        "patient_id": f"65f{random.getrandbits(84):021x}",
+        "symptoms": {"chest_pain": random.random() < 0.3, "shortness_of_breath": random.random() < 0.3,
+                     "fever": random.random() < 0.5, "description": "Patient reports pain radiating to the left arm"},
+        "vitals": {"heart_rate": random.randint(55, 140), "blood_pressure": f"{random.randint(100, 180)}/{random.randint(60, 110)}",
+                   "temperature": round(random.uniform(36.0, 40.0), 1), "oxygen_saturation": random.randint(85, 100)},
+        "risk_level": random.choice(["critical", "high", "moderate", "low"]),
+        "ai_confidence": round(random.random(), 2),
+        "priority_score": random.randint(1, 10),
+        "recommendations": "Immediate ECG and troponin; monitor vitals every 15 minutes.",
+        "status": "pending",
+        "created_at": (now - timedelta(minutes=i)).isoformat()
+    } for i in range(count)]
+
+def system_logs(count: int = 100) -> list:
+    now = datetime.utcnow()
+    return [{
+        "_id": f"65f{random.getrandbits(84):021x}",
+        "user_id": f"65f{random.getrandbits(84):021x}",
+        "action": random.choice(["USER_LOGIN", "TRIAGE_ANALYSIS", "USER_REGISTERED"]),
+        "details": f"Risk level: moderate, Priority: {random.randint(1, 10)}",
+        "ip_address": f"10.0.{random.randint(0, 255)}.{random.randint(0, 255)}",
+        "timestamp": (now - timedelta(seconds=i * 7)).isoformat()
+    } for i in range(count)]
+
+def encoders() -> dict:
+    available = {}
+    for level in (1, 5, 9):
+        available[f"gzip-{level}"] = lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0)
+    if brotli is not None:
+        for quality in (1, 4, 8):
+            available[f"br-{quality}"] = lambda body, quality=quality: brotli.compress(body, quality=quality)
+    if zstandard is not None:
+        for level in (1, 3, 9):
+            available[f"zstd-{level}"] = zstandard.ZstdCompressor(level=level).compress
+    return available
+
+def main():
+    random.seed(42)
+    payloads = {
+        "pending-cases (100)": json.dumps(pending_cases()).encode(),
+        "system-logs (100)": json.dumps(system_logs()).encode(),
+        "history (10)": json.dumps(pending_cases(10)).encode(),
+    }
+
+    print("=" * 60)
+    print("Response Compression Benchmark")
+    print("=" * 60)
+    for name, body in payloads.items():
+        print()
+        print(f"{name}: {len(body)} bytes")
+        print(f"  {'encoder':<10}{'bytes':>9}{'ratio':>8}{'ms/resp':>10}")
+        for encoder_name, compress in encoders().items():
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                compressed = compress(body)
+            elapsed = (time.perf_counter() - started) / ROUNDS
+            print(f"  {encoder_name:<10}{len(compressed):>9}{len(body) / len(compressed):>8.1f}{elapsed * 1000:>10.3f}")
+
+if __name__ == "__main__":
+    main()
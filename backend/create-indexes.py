@@ -29,29 +29,69 @@ async def create_indexes():
         print("Creating indexes for 'users' collection...")
         await db.users.create_index("email", unique=True)
         print("  ✅ email (unique)")
+        await db.users.create_index("patient_profile.patient_id", unique=True, sparse=True)
+        print("  ✅ patient_profile.patient_id (unique, sparse)")
+        await db.users.create_index([("role", 1), ("dispatch_available", 1)])
+        print("  ✅ role + dispatch_available")
         
-        # Patients collection indexes
+        # Legacy patients collection indexes (see migrate-patient-profiles.py)
         print("Creating indexes for 'patients' collection...")
         await db.patients.create_index("user_id", unique=True)
         print("  ✅ user_id (unique)")
         
-        # Triage records collection indexes
+        # Triage records collection indexes; every query is scoped by facility_id,
+        # so compound indexes lead with it (facility_id + created_at is the shard key)
         print("Creating indexes for 'triage_records' collection...")
-        await db.triage_records.create_index("patient_id")
-        print("  ✅ patient_id")
+        await db.triage_records.create_index([("facility_id", 1), ("created_at", 1)])
+        print("  ✅ facility_id + created_at (shard key)")
+        await db.triage_records.create_index([("facility_id", 1), ("status", 1), ("priority_score", -1)])
+        print("  ✅ facility_id + status + priority_score (descending)")
+        await db.triage_records.create_index([("facility_id", 1), ("patient_id", 1), ("created_at", -1)])
+        print("  ✅ facility_id + patient_id + created_at (descending)")
+        await db.triage_records.create_index([("facility_id", 1), ("patient_id", 1), ("updated_at", -1)])
+        print("  ✅ facility_id + patient_id + updated_at (descending)")
+        await db.triage_records.create_index([("facility_id", 1), ("updated_at", -1)])
+        print("  ✅ facility_id + updated_at (descending)")
+        await db.triage_records.create_index(
+            [("facility_id", 1), ("last_transition_id", 1)],
+            partialFilterExpression={"last_transition_id": {"$exists": True}}
+        )
+        print("  ✅ facility_id + last_transition_id (partial)")
+        await db.triage_records.create_index([("facility_id", 1), ("doctor_assigned", 1), ("status", 1)])
+        print("  ✅ facility_id + doctor_assigned + status")
+        # Numeric vitals range queries (e.g. SpO2 below 92 within a facility)
+        await db.triage_records.create_index(
+            [("facility_id", 1), ("vital_signs.oxygen_saturation", 1)],
+            partialFilterExpression={"vital_signs.oxygen_saturation": {"$exists": True}}
+        )
+        print("  ✅ facility_id + vital_signs.oxygen_saturation (partial)")
+        # Outbox relay poll: only records with undelivered events are indexed
+        await db.triage_records.create_index(
+            "outbox_pending",
+            partialFilterExpression={"outbox_pending": True}
+        )
+        print("  ✅ outbox_pending (partial)")
+        # Case dispatcher resync (open records across facilities)
         await db.triage_records.create_index("status")
         print("  ✅ status")
-        await db.triage_records.create_index([("priority_score", -1)])
-        print("  ✅ priority_score (descending)")
+        # Cross-facility admin views (exports, wait-time rebuild)
         await db.triage_records.create_index([("created_at", -1)])
         print("  ✅ created_at (descending)")
+        await db.triage_records.create_index("updated_at", sparse=True)
+        print("  ✅ updated_at (sparse)")
         
-        # Audit logs collection indexes
+        # Audit logs time-series collection (created by the app or migrate-audit-logs.py)
         print("Creating indexes for 'audit_logs' collection...")
-        await db.audit_logs.create_index([("timestamp", -1)])
-        print("  ✅ timestamp (descending)")
-        await db.audit_logs.create_index("user_id")
-        print("  ✅ user_id")
+        await db.audit_logs.create_index([("meta.user_id", 1), ("timestamp", -1)])
+        print("  ✅ meta.user_id + timestamp (descending)")
+        
+        # Per-minute AI usage buckets (upserted by every worker; /admin/ai-usage time ranges)
+        print("Creating indexes for 'ai_usage' collection...")
+        await db.ai_usage.create_index([("minute", 1), ("model", 1), ("purpose", 1)], unique=True)
+        print("  ✅ minute + model + purpose (unique)")
+        retention_days = int(os.getenv("AI_USAGE_RETENTION_DAYS", "90"))
+        await db.ai_usage.create_index("minute", expireAfterSeconds=retention_days * 86400)
+        print(f"  ✅ minute (expires after {retention_days} days)")
         
         print()
         print("=" * 60)
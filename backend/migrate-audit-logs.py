@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Migrate 'audit_logs' to a MongoDB time-series collection
+
+    python migrate-audit-logs.py              # migrate existing data
+    python migrate-audit-logs.py --bench 50000
+
+Migration renames the plain collection to 'audit_logs_legacy', creates the
+time-series 'audit_logs' (bucketed per user, compact action codes,
+automatic expiry) and copies the legacy documents across in batches.
+
+--bench inserts N synthetic events into scratch collections using the old
+and new layouts and prints insert throughput and storage size for each.
+"""
+
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+import os
+from dotenv import load_dotenv
+
+from app.models.audit_log import AUDIT_ACTION_CODES
+
+load_dotenv()
+
+BATCH_SIZE = 1000
+RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "365"))
+TIMESERIES_OPTIONS = {"timeField": "timestamp", "metaField": "meta", "granularity": "minutes"}
+
+def to_timeseries(document: dict) -> dict:
+    return {
+        "_id": document["_id"],
+        "timestamp": document["timestamp"],
+        "meta": {"user_id": document.get("user_id")},
+        "action": AUDIT_ACTION_CODES.get(document.get("action"), document.get("action")),
+        "details": document.get("details"),
+        "ip_address": document.get("ip_address")
+    }
+
+async def create_timeseries(db, name: str):
+    await db.create_collection(name, timeseries=TIMESERIES_OPTIONS, expireAfterSeconds=RETENTION_DAYS * 86400)
+    await db[name].create_index([("meta.user_id", 1), ("timestamp", -1)])
+
+async def migrate(db):
+    cursor = await db.list_collections(filter={"name": "audit_logs"})
+    existing = await cursor.to_list(length=1)
+    if existing and existing[0].get("type") == "timeseries":
+        print("  'audit_logs' is already a time-series collection; nothing to do")
+        return
+
+    if existing:
+        await db.audit_logs.rename("audit_logs_legacy")
+        print("  ✅ renamed 'audit_logs' -> 'audit_logs_legacy'")
+    await create_timeseries(db, "audit_logs")
+    print("  ✅ created time-series 'audit_logs'")
+
+    if not existing:
+        return
+
+    copied = 0
+    batch = []
+    # Events older than the retention window would expire immediately; skip them
+    cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+    async for document in db.audit_logs_legacy.find({"timestamp": {"$gte": cutoff}}).batch_size(BATCH_SIZE):
+        batch.append(to_timeseries(document))
+        if len(batch) >= BATCH_SIZE:
+            await db.audit_logs.insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+    if batch:
+        await db.audit_logs.insert_many(batch, ordered=False)
+        copied += len(batch)
+    print(f"  ✅ copied {copied} audit events (legacy collection kept for verification)")
+
+def synthetic_events(count: int, users: int):
+    user_ids = [ObjectId() for _ in range(users)]
+    actions = list(AUDIT_ACTION_CODES)
+    start = datetime.utcnow() - timedelta(days=7)
+    for i in range(count):
+        yield {
+            "_id": ObjectId(),
+            "user_id": random.choice(user_ids),
+            "action": random.choice(actions),
+            "details": f"Risk level: moderate, Priority: {random.randint(1, 10)}",
+            "ip_address": f"10.0.{random.randint(0, 255)}.{random.randint(0, 255)}",
+            "timestamp": start + timedelta(seconds=i * 604800 / count)
+        }
+
+async def bench(db, count: int):
+    events = list(synthetic_events(count, users=max(1, count // 50)))
+    layouts = {
+        "bench_audit_plain": lambda document: document,
+        "bench_audit_timeseries": to_timeseries,
+    }
+
+    await db.drop_collection("bench_audit_plain")
+    await db.drop_collection("bench_audit_timeseries")
+    await db.bench_audit_plain.create_index([("timestamp", -1)])
+    await db.bench_audit_plain.create_index("user_id")
+    await create_timeseries(db, "bench_audit_timeseries")
+
+    print(f"  {'layout':<26}{'inserts/s':>12}{'storage MB':>12}{'index MB':>10}")
+    for name, convert in layouts.items():
+        documents = [convert(dict(event)) for event in events]
+        started = time.perf_counter()
+        for i in range(0, len(documents), BATCH_SIZE):
+            await db[name].insert_many(documents[i:i + BATCH_SIZE], ordered=False)
+        elapsed = time.perf_counter() - started
+        stats = await db.command("collStats", name)
+        print(f"  {name:<26}{count / elapsed:>12.0f}"
+              f"{stats.get('storageSize', 0) / 1e6:>12.2f}{stats.get('totalIndexSize', 0) / 1e6:>10.2f}")
+        await db.drop_collection(name)
+
+async def main():
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DB_NAME", "triage_db")
+
+    print("=" * 60)
+    print("Audit Log Time-Series Migration")
+    print("=" * 60)
+    print()
+
+    try:
+        client = AsyncIOMotorClient(mongodb_url)
+        db = client[db_name]
+
+        if "--bench" in sys.argv:
+            count = int(sys.argv[sys.argv.index("--bench") + 1])
+            await bench(db, count)
+        else:
+            await migrate(db)
+
+        print()
+        print("=" * 60)
+        print("✅ Done!")
+        print("=" * 60)
+        print()
+
+        client.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Backfill facility_id and optionally shard triage data by facility
+
+    python migrate-facilities.py            # backfill facility_id
+    python migrate-facilities.py --shard    # backfill, then shard triage_records
+
+Users without a facility get DEFAULT_FACILITY_ID. Triage records inherit
+the facility of the patient who submitted them. Run create-indexes.py
+first so the facility-prefixed indexes exist; --shard requires a sharded
+cluster (connect through mongos).
+"""
+
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateMany
+import os
+from dotenv import load_dotenv
+
+from app.core.facility import TRIAGE_SHARD_KEY
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+async def migrate_facilities(shard: bool = False):
+    """Backfill facility_id on users and triage_records"""
+
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DB_NAME", "triage_db")
+    default_facility = os.getenv("DEFAULT_FACILITY_ID", "default")
+
+    print("=" * 60)
+    print("Facility Migration")
+    print("=" * 60)
+    print()
+
+    try:
+        client = AsyncIOMotorClient(mongodb_url)
+        db = client[db_name]
+
+        result = await db.users.update_many(
+            {"facility_id": {"$exists": False}},
+            {"$set": {"facility_id": default_facility}}
+        )
+        print(f"  ✅ users assigned to '{default_facility}': {result.modified_count}")
+
+        # Map each patient_id to its user's facility, then update records per patient in batches
+        operations = []
+        updated = 0
+        cursor = db.users.find(
+            {"patient_profile.patient_id": {"$exists": True}},
+            {"facility_id": 1, "patient_profile.patient_id": 1}
+        ).batch_size(BATCH_SIZE)
+        async for user in cursor:
+            operations.append(UpdateMany(
+                {"patient_id": user["patient_profile"]["patient_id"], "facility_id": {"$exists": False}},
+                {"$set": {"facility_id": user.get("facility_id", default_facility)}}
+            ))
+            if len(operations) >= BATCH_SIZE:
+                updated += (await db.triage_records.bulk_write(operations, ordered=False)).modified_count
+                operations = []
+        if operations:
+            updated += (await db.triage_records.bulk_write(operations, ordered=False)).modified_count
+
+        # Records whose patient could not be resolved (e.g. legacy profiles) go to the default facility
+        result = await db.triage_records.update_many(
+            {"facility_id": {"$exists": False}},
+            {"$set": {"facility_id": default_facility}}
+        )
+        print(f"  ✅ triage records backfilled: {updated + result.modified_count}")
+
+        if shard:
+            await client.admin.command("enableSharding", db_name)
+            await client.admin.command(
+                "shardCollection", f"{db_name}.triage_records", key=TRIAGE_SHARD_KEY
+            )
+            print(f"  ✅ triage_records sharded on {TRIAGE_SHARD_KEY}")
+
+        print()
+        print("=" * 60)
+        print("✅ Migration complete!")
+        print("=" * 60)
+        print()
+
+        client.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error migrating facilities: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    asyncio.run(migrate_facilities(shard="--shard" in sys.argv))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Backfill embedded patient profiles into the 'users' collection
+
+Copies each document from the legacy 'patients' collection into
+users.patient_profile, keeping the original patients._id as
+patient_profile.patient_id so existing triage_records stay linked.
+Safe to re-run: users that already have a profile are skipped.
+"""
+
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+async def migrate_patient_profiles(dry_run: bool = False):
+    """Embed patient profiles in user documents"""
+
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DB_NAME", "triage_db")
+
+    print("=" * 60)
+    print("Migrating Patient Profiles" + (" (dry run)" if dry_run else ""))
+    print("=" * 60)
+    print()
+
+    try:
+        client = AsyncIOMotorClient(mongodb_url)
+        db = client[db_name]
+
+        scanned = 0
+        migrated = 0
+        operations = []
+
+        async def flush():
+            nonlocal migrated
+            if not operations:
+                return
+            if not dry_run:
+                result = await db.users.bulk_write(operations, ordered=False)
+                migrated += result.modified_count
+            else:
+                migrated += len(operations)
+            operations.clear()
+
+        cursor = db.patients.find({}).batch_size(BATCH_SIZE)
+        async for patient in cursor:
+            scanned += 1
+            operations.append(UpdateOne(
+                {"_id": patient["user_id"], "patient_profile": {"$exists": False}},
+                {"$set": {"patient_profile": {
+                    "patient_id": patient["_id"],
+                    "age": patient.get("age"),
+                    "gender": patient.get("gender"),
+                    "medical_history": patient.get("medical_history")
+                }}}
+            ))
+            if len(operations) >= BATCH_SIZE:
+                await flush()
+        await flush()
+
+        print(f"  Patients scanned: {scanned}")
+        print(f"  Users updated:    {migrated}")
+
+        if not dry_run:
+            await db.users.create_index("patient_profile.patient_id", unique=True, sparse=True)
+            print("  ✅ users.patient_profile.patient_id index (unique, sparse)")
+
+        print()
+        print("=" * 60)
+        print("✅ Migration complete!")
+        print("=" * 60)
+        print()
+
+        client.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error migrating patient profiles: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    asyncio.run(migrate_patient_profiles(dry_run="--dry-run" in sys.argv))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Build prior-visit triage summaries for existing patients
+
+    python migrate-patient-summaries.py            # patients without a summary
+    python migrate-patient-summaries.py --rebuild  # recompute every summary
+
+Folds each patient's triage records, oldest first, into
+users.patient_profile.triage_summary. The API keeps summaries current from
+then on, so this only needs to run once (or after changing the summary format).
+Run migrate-vital-signs.py first so vitals baselines are included.
+"""
+
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+from dotenv import load_dotenv
+
+from app.services.patient_summary import SUMMARY_FIELD, fold_record
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+async def migrate_patient_summaries(rebuild: bool = False):
+    """Fold historical triage records into per-patient summaries"""
+
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DB_NAME", "triage_db")
+    default_facility = os.getenv("DEFAULT_FACILITY_ID", "default")
+
+    print("=" * 60)
+    print("Building Patient Triage Summaries" + (" (rebuild)" if rebuild else ""))
+    print("=" * 60)
+    print()
+
+    try:
+        client = AsyncIOMotorClient(mongodb_url)
+        db = client[db_name]
+
+        query = {"patient_profile.patient_id": {"$exists": True}}
+        if not rebuild:
+            query[SUMMARY_FIELD] = {"$exists": False}
+
+        operations = []
+        updated = 0
+        users = db.users.find(query, {"facility_id": 1, "patient_profile.patient_id": 1}).batch_size(BATCH_SIZE)
+        async for user in users:
+            summary = None
+            records = db.triage_records.find(
+                {
+                    "facility_id": user.get("facility_id", default_facility),
+                    "patient_id": user["patient_profile"]["patient_id"]
+                },
+                {"created_at": 1, "risk_level": 1, "priority_score": 1, "symptoms": 1, "vital_signs": 1}
+            ).sort("created_at", 1)
+            async for record in records:
+                summary = fold_record(summary, record)
+            if summary is None:
+                continue
+            operations.append(UpdateOne({"_id": user["_id"]}, {"$set": {SUMMARY_FIELD: summary}}))
+            if len(operations) >= BATCH_SIZE:
+                updated += (await db.users.bulk_write(operations, ordered=False)).modified_count
+                operations = []
+        if operations:
+            updated += (await db.users.bulk_write(operations, ordered=False)).modified_count
+
+        print(f"  ✅ patient summaries written: {updated}")
+
+        print()
+        print("=" * 60)
+        print("✅ Migration complete!")
+        print("=" * 60)
+        print()
+
+        client.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error building patient summaries: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    asyncio.run(migrate_patient_summaries(rebuild="--rebuild" in sys.argv))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Backfill typed vital_signs on triage records created before vitals were parsed at ingestion
+
+    python migrate-vital-signs.py
+
+Each record's free-form vitals are parsed with the same parser the API uses.
+Readings outside VITAL_LIMITS are left out (the raw vitals are kept
+unchanged), so one bad value does not drop the record from analytics.
+"""
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+from dotenv import load_dotenv
+
+from app.models.vitals import plausible_readings, vital_readings
+
+load_dotenv()
+
+BATCH_SIZE = 500
+
+async def migrate_vital_signs():
+    """Parse vitals into vital_signs for records that lack it"""
+
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DB_NAME", "triage_db")
+
+    print("=" * 60)
+    print("Vital Signs Migration")
+    print("=" * 60)
+    print()
+
+    try:
+        client = AsyncIOMotorClient(mongodb_url)
+        db = client[db_name]
+
+        operations = []
+        updated = 0
+        rejected = 0
+        cursor = db.triage_records.find(
+            {"vital_signs": {"$exists": False}},
+            {"facility_id": 1, "created_at": 1, "vitals": 1}
+        ).batch_size(BATCH_SIZE)
+        async for record in cursor:
+            vital_signs, dropped = plausible_readings(vital_readings(record.get("vitals") or {}))
+            rejected += len(dropped)
+            # Include the shard key so each update routes to a single shard
+            operations.append(UpdateOne(
+                {"_id": record["_id"], "facility_id": record.get("facility_id"), "created_at": record.get("created_at")},
+                {"$set": {"vital_signs": vital_signs}}
+            ))
+            if len(operations) >= BATCH_SIZE:
+                updated += (await db.triage_records.bulk_write(operations, ordered=False)).modified_count
+                operations = []
+        if operations:
+            updated += (await db.triage_records.bulk_write(operations, ordered=False)).modified_count
+
+        print(f"  ✅ triage records backfilled: {updated}")
+        if rejected:
+            print(f"  implausible readings left out: {rejected}")
+
+        print()
+        print("=" * 60)
+        print("✅ Migration complete!")
+        print("=" * 60)
+        print()
+
+        client.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error migrating vital signs: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    asyncio.run(migrate_vital_signs())
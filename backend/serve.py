@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Production server launcher
+
+Runs the API under gunicorn with one uvicorn worker process per core,
+uvloop + httptools, tuned keep-alive/backlog and the application preloaded
+in the master so read-only state is shared copy-on-write with the workers.
+
+    python serve.py
+
+Graceful rolling restart (new code): send USR2 to the master to start a new
+master + workers alongside the old ones, then WINCH and QUIT to the old
+master once the new workers are serving. HUP restarts workers gracefully
+but, because the app is preloaded, does not pick up code changes.
+
+Use start.py for local development (single worker with auto-reload).
+"""
+
+import multiprocessing
+import sys
+
+from app.core.config import settings
+
+def worker_count() -> int:
+    return settings.SERVER_WORKERS or multiprocessing.cpu_count()
+
+if sys.platform != "win32":
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.workers import UvicornWorker
+
+    class TriageUvicornWorker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+    class TriageServer(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    def run():
+        TriageServer({
+            "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+            "workers": worker_count(),
+            "worker_class": "serve.TriageUvicornWorker",
+            "preload_app": True,
+            "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+            "backlog": settings.SERVER_BACKLOG,
+            "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+            "timeout": settings.SERVER_WORKER_TIMEOUT,
+            # Recycle workers periodically; jitter keeps them from restarting together
+            "max_requests": settings.SERVER_MAX_REQUESTS,
+            "max_requests_jitter": settings.SERVER_MAX_REQUESTS // 10,
+            "pidfile": settings.SERVER_PIDFILE or None,
+            "accesslog": None,
+        }).run()
+else:
+    import uvicorn
+
+    def run():
+        # gunicorn and uvloop are unavailable on Windows; fall back to uvicorn's own process manager
+        uvicorn.run(
+            "app.main:app",
+            host=settings.SERVER_HOST,
+            port=settings.SERVER_PORT,
+            workers=worker_count(),
+            http="httptools",
+            timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+            backlog=settings.SERVER_BACKLOG,
+            access_log=False
+        )
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Train the local triage model from historical triage records
+
+    python train-local-model.py
+    python train-local-model.py --min-samples 500
+
+Fits risk level (logistic regression) and priority score (ridge regression)
+on records assessed by Gemini, holds out 20% to report accuracy, and writes
+LOCAL_MODEL_PATH. Restart the API (or let workers recycle) to load it.
+"""
+
+import asyncio
+import sys
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+import numpy as np
+import os
+from dotenv import load_dotenv
+
+from app.services.local_triage_model import LocalTriageModel, featurize, RISK_LEVELS
+from app.core.config import settings
+
+load_dotenv()
+
+HOLDOUT_FRACTION = 0.2
+
+async def load_medical_histories(db) -> dict:
+    """patient_id -> medical history, from the same profiles the API reads at inference time"""
+    histories = {}
+    # Legacy patients collection first; embedded profiles take precedence (see TriageService.get_patient_profile)
+    async for patient in db.patients.find({"medical_history": {"$nin": [None, ""]}}, {"medical_history": 1}):
+        histories[patient["_id"]] = patient["medical_history"]
+    async for user in db.users.find(
+        {"patient_profile.patient_id": {"$exists": True}},
+        {"patient_profile.patient_id": 1, "patient_profile.medical_history": 1}
+    ):
+        profile = user["patient_profile"]
+        if profile.get("medical_history"):
+            histories[profile["patient_id"]] = profile["medical_history"]
+        else:
+            histories.pop(profile["patient_id"], None)
+    return histories
+
+async def load_records(db):
+    # Only model assessments are labels: fallback, reused and local results would teach the model itself
+    cursor = db.triage_records.find(
+        {
+            "risk_level": {"$in": RISK_LEVELS},
+            "ai_confidence": {"$gt": 0},
+            "assessment_source": {"$nin": ["fallback", "similarity_cache", "local_model", "provisional"]}
+        },
+        {"patient_id": 1, "symptoms": 1, "vitals": 1, "risk_level": 1, "priority_score": 1, "ai_confidence": 1}
+    ).batch_size(1000)
+    # Inference hashes the patient's medical history into the same vector, so training must too
+    histories = await load_medical_histories(db)
+
+    features, labels, priorities, weights = [], [], [], []
+    async for record in cursor:
+        features.append(featurize(
+            record.get("symptoms") or {}, record.get("vitals") or {}, histories.get(record.get("patient_id"))
+        ))
+        labels.append(RISK_LEVELS.index(record["risk_level"]))
+        priorities.append(record.get("priority_score") or 5)
+        weights.append(record["ai_confidence"])
+    return np.array(features), np.array(labels), np.array(priorities, dtype=np.float64), np.array(weights)
+
+async def train(min_samples: int):
+    """Fit and save the local triage model"""
+
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DB_NAME", "triage_db")
+
+    print("=" * 60)
+    print("Training Local Triage Model")
+    print("=" * 60)
+    print()
+
+    try:
+        client = AsyncIOMotorClient(mongodb_url)
+        db = client[db_name]
+
+        features, labels, priorities, weights = await load_records(db)
+        client.close()
+        print(f"  Loaded {len(labels)} labelled records")
+        if len(labels) < min_samples:
+            print(f"❌ Need at least {min_samples} records to train")
+            return False
+
+        rng = np.random.default_rng(42)
+        order = rng.permutation(len(labels))
+        split = int(len(labels) * (1 - HOLDOUT_FRACTION))
+        train_idx, test_idx = order[:split], order[split:]
+
+        model = LocalTriageModel(settings.LOCAL_MODEL_PATH)
+        started = time.perf_counter()
+        model.fit(features[train_idx], labels[train_idx], priorities[train_idx], weights[train_idx])
+        print(f"  ✅ trained on {len(train_idx)} records in {time.perf_counter() - started:.1f}s")
+
+        prediction = model.predict_batch(features[test_idx])
+        predicted = prediction["probabilities"].argmax(axis=1)
+        accuracy = float((predicted == labels[test_idx]).mean())
+        recall = {}
+        for index, level in enumerate(RISK_LEVELS):
+            actual = labels[test_idx] == index
+            if actual.any():
+                recall[level] = round(float((predicted[actual] == index).mean()), 3)
+        priority_mae = float(np.abs(prediction["priorities"] - priorities[test_idx]).mean())
+        print(f"  holdout accuracy: {accuracy:.3f}")
+        print(f"  holdout recall per risk level: {recall}")
+        print(f"  holdout priority MAE: {priority_mae:.2f}")
+
+        started = time.perf_counter()
+        for index in test_idx[:1000]:
+            model.predict_batch(features[index][None, :])
+        per_prediction = (time.perf_counter() - started) / min(len(test_idx), 1000)
+        print(f"  inference: {per_prediction * 1e6:.0f}µs per case (excluding featurization)")
+
+        # Final model uses every record
+        model.fit(features, labels, priorities, weights)
+        model.save({
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "samples": int(len(labels)),
+            "holdout_accuracy": round(accuracy, 3),
+            "holdout_recall": recall,
+            "holdout_priority_mae": round(priority_mae, 2)
+        })
+        print(f"  ✅ saved to {settings.LOCAL_MODEL_PATH}")
+
+        print()
+        print("=" * 60)
+        print("✅ Training complete!")
+        print("=" * 60)
+        print()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error training model: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    min_samples = int(sys.argv[sys.argv.index("--min-samples") + 1]) if "--min-samples" in sys.argv else 200
+    asyncio.run(train(min_samples))
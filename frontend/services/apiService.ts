@@ -131,6 +131,13 @@ export const doctorAPI = {
       method: 'PATCH',
     });
   },
+
+  bulkUpdateStatus: async (triageIds: string[], status: string) => {
+    return apiCall('/doctor/bulk-update-status', {
+      method: 'PATCH',
+      body: JSON.stringify({ triage_ids: triageIds, status }),
+    });
+  },
 };
 
 // Admin API
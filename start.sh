@@ -19,7 +19,11 @@ trap cleanup INT TERM
 # Start Backend
 echo -e "\033[1;33m[1/3] Starting Backend Server...\033[0m"
 cd backend
-python start.py &
+if [ "$BACKEND_MODE" = "production" ]; then
+    python serve.py &
+else
+    python start.py &
+fi
 BACKEND_PID=$!
 cd ..
 